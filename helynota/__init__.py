@@ -1,18 +1,25 @@
 from __future__ import annotations
 
+from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+import click
 from flask import Flask
 
 from .database import db
-from .seed import seed_initial_data
-from .dashboard_routes import dashboard_bp
-from .main_routes import main_bp
+from .json_provider import FastJSONProvider
+from .rate_limit import DEFAULT_LIMITS, init_app as init_rate_limiting
 
 
 def create_app(test_config: Optional[Dict[str, Any]] = None) -> Flask:
-    """Application factory used by tests and runtime."""
+    """Application factory used by tests and runtime.
+
+    Only the web stack is imported here. Analytics (pandas, matplotlib,
+    openpyxl) is imported lazily by the handlers that need it, so workers
+    and CLI commands such as ``init-db`` boot without it; see
+    ``scripts/benchmark_importtime.py``.
+    """
     project_root = Path(__file__).resolve().parent.parent
     
     app = Flask(
@@ -20,29 +27,122 @@ def create_app(test_config: Optional[Dict[str, Any]] = None) -> Flask:
         template_folder=str(project_root / "templates"),
         static_folder=str(project_root / "static")
     )
+    app.json = FastJSONProvider(app)
     
     default_db_path = project_root / "hotel_reservas.db"
 
     app.config.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{default_db_path}")
     app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
     app.config.setdefault("SECRET_KEY", "hotel-reservas-secret")
+    app.config.setdefault("DASHBOARD_DIR", str(project_root / "dashboards"))
+    app.config.setdefault(
+        "METRICS_DATASET_PATH", str(project_root / "data" / "dataset_defectos.csv")
+    )
+    # Rate limiting and load shedding for login and room search
+    # (see helynota/rate_limit.py).
+    app.config.setdefault("RATELIMIT_ENABLED", True)
+    app.config.setdefault("RATELIMIT_STORAGE", "memory")
+    app.config.setdefault("RATELIMIT_LIMITS", dict(DEFAULT_LIMITS))
+    app.config.setdefault("ADMISSION_MAX_IN_FLIGHT", 32)
+    app.config.setdefault("ADMISSION_LATENCY_TARGET", 0.5)
+    # Room search result cache (see helynota/search_cache.py).
+    app.config.setdefault("SEARCH_CACHE_ENABLED", True)
+    app.config.setdefault("SEARCH_CACHE_TTL", 30.0)
+    app.config.setdefault("SEARCH_CACHE_MAX_ENTRIES", 1024)
+    app.config.setdefault("SEARCH_MAX_LIMIT", 100)
+    # Longest stay the API accepts; check-ins are also limited to
+    # PRICING_HORIZON_DAYS ahead (see booking.parse_stay).
+    app.config.setdefault("MAX_STAY_NIGHTS", 30)
+    # Dynamic pricing (see helynota/pricing.py).
+    app.config.setdefault("PRICING_HORIZON_DAYS", 730)
+    app.config.setdefault("PRICING_REFRESH_INTERVAL", 5.0)
+    # Reservation/payment change events (see helynota/outbox.py).
+    app.config.setdefault("OUTBOX_DISPATCHER", True)
+    app.config.setdefault("OUTBOX_SINKS", [])
+    app.config.setdefault("OUTBOX_BATCH_SIZE", 100)
+    app.config.setdefault("OUTBOX_POLL_INTERVAL", 1.0)
+    app.config.setdefault("OUTBOX_LEASE_SECONDS", 30.0)
+    # Pending reservations hold their room this long (see helynota/holds.py).
+    app.config.setdefault("RESERVATION_HOLD_SECONDS", 900)
+    app.config.setdefault("HOLD_EXPIRY_SCHEDULER", True)
+    app.config.setdefault("HOLD_EXPIRY_BATCH", 500)
+    # Read/write splitting (see helynota/replicas.py).
+    app.config.setdefault("READ_REPLICA_URI", None)
+    app.config.setdefault("READ_REPLICA_STICKY_SECONDS", 5.0)
+    # Occupancy forecasts (see helynota/forecast.py).
+    app.config.setdefault("FORECAST_HISTORY_DAYS", 1095)
+    app.config.setdefault("FORECAST_MAX_DAYS", 365)
+    app.config.setdefault("FORECAST_ALPHA", 0.3)
+    app.config.setdefault("FORECAST_GAMMA", 0.1)
+    # Request profiling, off by default (see helynota/profiling.py).
+    app.config.setdefault("PROFILING_ENABLED", False)
+    app.config.setdefault("PROFILING_DIR", str(project_root / "profiles"))
+    app.config.setdefault("PROFILING_SAMPLE_RATE", 0.01)
+    app.config.setdefault("PROFILING_SLOW_SECONDS", 1.0)
+    app.config.setdefault("PROFILING_SAMPLE_INTERVAL", 0.005)
+    app.config.setdefault("PROFILING_MAX_FILES", 200)
+    app.config.setdefault("PROFILING_ENDPOINTS", None)
+    # Bulk account creation (see helynota/provisioning.py).
+    app.config.setdefault("PROVISIONING_ADMINS", ["admin"])
+    app.config.setdefault("BULK_IMPORT_MAX_ROWS", 10000)
+    # Rows with a plaintext password are hashed inside the request (~150 ms
+    # each with scrypt); larger imports go through flask import-users.
+    app.config.setdefault("BULK_IMPORT_MAX_PLAINTEXT_ROWS", 100)
+    app.config.setdefault("BULK_IMPORT_CHUNK_SIZE", 1000)
+    app.config.setdefault("BULK_IMPORT_HASH_WORKERS", None)
+    app.config.setdefault("BULK_IMPORT_HASH_METHOD", "scrypt")
+    # flask archive-reservations (see helynota/archive.py).
+    app.config.setdefault("ARCHIVE_BATCH_SIZE", 1000)
+    # Email notifications (see helynota/notifications.py).
+    app.config.setdefault("NOTIFICATIONS_ENABLED", False)
+    app.config.setdefault("NOTIFICATIONS_WORKERS", 2)
+    app.config.setdefault("NOTIFICATIONS_BATCH_SIZE", 50)
+    app.config.setdefault("NOTIFICATIONS_MAX_RETRIES", 3)
+    app.config.setdefault("NOTIFICATIONS_RETRY_DELAY", 1.0)
+    app.config.setdefault("MAIL_SENDER", "reservas@hotel.test")
+    app.config.setdefault("SMTP_HOST", "localhost")
+    app.config.setdefault("SMTP_PORT", 1025)
+    app.config.setdefault("SMTP_POOL_SIZE", 2)
+    app.config.setdefault("SMTP_TIMEOUT", 10.0)
+    app.config.setdefault("SMTP_USERNAME", None)
+    app.config.setdefault("SMTP_PASSWORD", None)
+    app.config.setdefault("SMTP_STARTTLS", False)
 
     if test_config:
         app.config.update(test_config)
 
     db.init_app(app)
 
+    from .dashboard_routes import dashboard_bp
+    from .main_routes import main_bp
     from .routes import api_bp
+    from .holds import init_app as init_holds
+    from .notifications import init_app as init_notifications
+    from .outbox import init_app as init_outbox
+    from .pricing import init_app as init_pricing
+    from .profiling import init_app as init_profiling
+    from .replicas import init_app as init_replicas
+    from .search_cache import init_app as init_search_cache
 
     # Registrar blueprints
     app.register_blueprint(main_bp)  # Rutas principales
     app.register_blueprint(api_bp)   # API
     app.register_blueprint(dashboard_bp, url_prefix='/dashboards')  # Dashboards
 
+    init_rate_limiting(app)
+    init_replicas(app)
+    init_search_cache(app)
+    init_pricing(app)
+    init_outbox(app)
+    init_notifications(app)
+    init_holds(app)
+    init_profiling(app)
+
     @app.cli.command("init-db")
     def init_db_command() -> None:
         """Create database schema and seed sample data."""
         from .models import BaseModel  # noqa: F401
+        from .seed import seed_initial_data
 
         db_path = Path(app.config["SQLALCHEMY_DATABASE_URI"].replace("sqlite:///", ""))
         db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -52,4 +152,85 @@ def create_app(test_config: Optional[Dict[str, Any]] = None) -> Flask:
         seed_initial_data()
         print(f"Database initialised at {db_path}")
 
+    @app.cli.command("archive-reservations")
+    @click.option(
+        "--before",
+        required=True,
+        type=click.DateTime(formats=["%Y-%m-%d"]),
+        help="Archive finished reservations checked out before this date (YYYY-MM-DD).",
+    )
+    @click.option("--batch-size", type=click.IntRange(min=1), default=None)
+    def archive_reservations_command(before: datetime, batch_size: Optional[int]) -> None:
+        """Move past reservations and their payments to the archive tables."""
+        from .archive import archive_reservations
+
+        try:
+            result = archive_reservations(
+                db.session, before.date(), batch_size or app.config["ARCHIVE_BATCH_SIZE"]
+            )
+        except ValueError as exc:
+            raise click.BadParameter(str(exc), param_hint="--before")
+        print(
+            f"Archived {result.reservations} reservations and {result.payments} payments"
+            f" in {result.batches} batches"
+        )
+
+    @app.cli.command("forecast-occupancy")
+    @click.option("--days", type=click.IntRange(min=1), default=14, show_default=True)
+    @click.option("--method", type=click.Choice(["ets", "naive"]), default="ets", show_default=True)
+    @click.option("--room-type", default=None, help="Only this room type (exact name).")
+    def forecast_occupancy_command(days: int, method: str, room_type: Optional[str]) -> None:
+        """Print the forecast occupancy per room type (booked so far in brackets)."""
+        from .forecast import forecaster_for, occupancy_table
+
+        forecast = forecaster_for(app).forecast(db.session, days, method, room_type)
+        rows = occupancy_table(forecast)
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        for row in rows:
+            print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+    @app.cli.command("import-users")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "json"]), default=None,
+                  help="Defaults to the file extension.")
+    def import_users_command(path: str, fmt: Optional[str]) -> None:
+        """Create the user accounts listed in a CSV or JSON file."""
+        import json
+
+        from .provisioning import import_users, parse_csv, parse_json
+
+        text = Path(path).read_text(encoding="utf-8-sig")
+        try:
+            if (fmt or Path(path).suffix.lstrip(".").lower()) == "json":
+                records = parse_json(json.loads(text))
+            else:
+                records = parse_csv(text)
+        except ValueError as exc:
+            raise click.BadParameter(str(exc), param_hint="PATH")
+        result = import_users(
+            db.session,
+            records,
+            app.config["BULK_IMPORT_CHUNK_SIZE"],
+            app.config["BULK_IMPORT_HASH_WORKERS"],
+            app.config["BULK_IMPORT_HASH_METHOD"],
+        )
+        for error in result.errors:
+            print(f"row {error.row} ({error.username or '-'}): {error.error}")
+        print(f"Created {result.created} users, {len(result.errors)} rows failed")
+
+    @app.cli.command("profiles-report")
+    @click.option("--dir", "directory", type=click.Path(file_okay=False), default=None)
+    @click.option("--endpoint", default=None, help="Only this endpoint, e.g. api.search_rooms.")
+    @click.option("--top", type=click.IntRange(min=1), default=15, show_default=True)
+    def profiles_report_command(directory: Optional[str], endpoint: Optional[str], top: int) -> None:
+        """Hottest functions per endpoint in the captured request profiles."""
+        from .profiling import aggregate, report_lines
+
+        reports = aggregate(Path(directory or app.config["PROFILING_DIR"]), endpoint)
+        if not reports:
+            print("No profiles captured")
+            return
+        for line in report_lines(reports, top):
+            print(line)
+
     return app
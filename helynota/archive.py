@@ -0,0 +1,98 @@
+"""Archival of past reservations.
+
+``reservations`` is what availability checks, holds and the reservation
+list query, so it should only hold reservations that can still change.
+``flask archive-reservations --before DATE`` moves finished reservations
+(confirmed, cancelled or expired, checked out before ``DATE``) and their
+payments to ``archived_reservations`` and ``archived_payments``.
+
+Rows move in batches of ``ARCHIVE_BATCH_SIZE``, each batch in its own
+transaction: ``INSERT ... SELECT`` into the archive, then ``DELETE`` from
+the hot tables, so a batch is either fully moved or not at all and the
+write lock is only held briefly. Ids are kept, and the hot tables never
+reuse them (``sqlite_autoincrement``), so an id names the same reservation
+in both places.
+
+The reservation list reads both tables: ``booking.user_reservations_stmt``
+and ``booking.archived_reservations_stmt`` merged by ``booking.merge_history``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import List
+
+from sqlalchemy import Select, delete, insert, literal, select
+from sqlalchemy.orm import Session
+
+from .database import utcnow
+from .models import ArchivedPayment, ArchivedReservation, Payment, Reservation
+
+ARCHIVABLE_STATUSES = ("confirmed", "cancelled", "expired")
+
+RESERVATION_COLUMNS = (
+    "id", "created_at", "updated_at", "user_id", "room_id", "check_in", "check_out",
+    "status", "total_price", "hold_expires_at",
+)
+PAYMENT_COLUMNS = (
+    "id", "created_at", "updated_at", "reservation_id", "amount", "status", "method",
+    "transaction_reference", "processed_at",
+)
+
+
+@dataclass
+class ArchiveResult:
+    reservations: int = 0
+    payments: int = 0
+    batches: int = 0
+
+
+def archivable_ids_stmt(before: date, batch_size: int) -> Select:
+    return (
+        select(Reservation.id)
+        .where(Reservation.check_out < before, Reservation.status.in_(ARCHIVABLE_STATUSES))
+        .order_by(Reservation.id)
+        .limit(batch_size)
+    )
+
+
+def _move_batch(session: Session, ids: List[int]) -> int:
+    now = literal(utcnow())
+    session.execute(
+        insert(ArchivedReservation).from_select(
+            [*RESERVATION_COLUMNS, "archived_at"],
+            select(*(getattr(Reservation, c) for c in RESERVATION_COLUMNS), now).where(
+                Reservation.id.in_(ids)
+            ),
+        )
+    )
+    payments = session.execute(
+        insert(ArchivedPayment).from_select(
+            PAYMENT_COLUMNS,
+            select(*(getattr(Payment, c) for c in PAYMENT_COLUMNS)).where(Payment.reservation_id.in_(ids)),
+        )
+    ).rowcount
+    session.execute(delete(Payment).where(Payment.reservation_id.in_(ids)))
+    session.execute(delete(Reservation).where(Reservation.id.in_(ids)))
+    return payments
+
+
+def archive_reservations(session: Session, before: date, batch_size: int = 1000) -> ArchiveResult:
+    """Move finished reservations checked out before ``before`` to the archive."""
+    if before > date.today():
+        raise ValueError("before cannot be in the future")
+    result = ArchiveResult()
+    while True:
+        ids = session.scalars(archivable_ids_stmt(before, batch_size)).all()
+        if not ids:
+            return result
+        try:
+            result.payments += _move_batch(session, ids)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        result.reservations += len(ids)
+        result.batches += 1
+        if len(ids) < batch_size:
+            return result
@@ -0,0 +1,562 @@
+"""Optional ASGI serving mode.
+
+``create_asgi_app`` serves the ``/api`` endpoints on an event loop through
+SQLAlchemy's asyncio extension (aiosqlite for SQLite), so a request waiting
+on the database awaits instead of pinning an OS thread. Validation, SQL and
+payloads come from :mod:`helynota.booking`, shared with the Flask blueprint;
+any other path (pages, dashboards) is handed to the Flask app in a worker
+thread. Run it with any ASGI server, e.g. ``uvicorn asgi:app``.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from http import HTTPStatus
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from urllib.parse import parse_qsl
+
+from flask import Flask
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from . import create_app
+from .booking import (
+    ApiError,
+    archived_reservations_stmt,
+    available_count_stmt,
+    available_counts_stmt,
+    available_rooms_stmt,
+    check_payable,
+    login_payload,
+    new_reservation,
+    parse_booking,
+    parse_credentials,
+    parse_payment,
+    parse_registration,
+    parse_search,
+    payable_reservation_stmt,
+    payment_payload,
+    registered_payload,
+    reservation_created_payload,
+    reservation_event,
+    reservation_payload,
+    room_type_payload,
+    room_types_stmt,
+    search_payload,
+    search_results,
+    search_rooms_stmt,
+    session_token_stmt,
+    settle_payment,
+    stats_payload,
+    token_expired,
+    user_by_name_stmt,
+    user_exists_stmt,
+    user_payload,
+    user_reservations_stmt,
+)
+from .database import AsyncRoutingSession
+from .json_provider import STREAM_BATCH
+from .models import ArchivedReservation, Reservation, RoomType, SessionToken, User
+from .replicas import SAFE_METHODS, client_keys, configure_sqlite
+from .search_cache import search_key
+
+# Sync driver -> asyncio driver used when ASYNC_DATABASE_URI is not set.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite"}
+
+
+@dataclass
+class AsyncRequest:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes
+    extensions: Dict[str, Any]
+    client_ip: str = ""
+    user: Optional[User] = None
+    config: Mapping[str, Any] = field(default_factory=dict)
+
+    def json(self) -> Dict[str, Any]:
+        """Request body as a dict; ``{}`` when missing or not a JSON object."""
+        try:
+            payload = json.loads(self.body) if self.body else None
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+
+@dataclass
+class JsonArray:
+    """Handler result sent as a JSON array, chunk by chunk, while the session is open."""
+
+    items: AsyncIterable[Any]
+
+
+JsonResponse = Tuple[Any, int]
+Handler = Callable[[AsyncRequest, AsyncSession], Awaitable[JsonResponse]]
+
+ROUTES: Dict[Tuple[str, str], Handler] = {}
+
+
+def route(method: str, path: str) -> Callable[[Handler], Handler]:
+    def register(handler: Handler) -> Handler:
+        ROUTES[(method, path)] = handler
+        return handler
+
+    return register
+
+
+async def get_current_user(request: AsyncRequest, session: AsyncSession) -> Optional[User]:
+    auth_header = request.headers.get("authorization", "")
+    if not auth_header.startswith("Bearer "):
+        return None
+    token = await session.scalar(session_token_stmt(auth_header.split(" ", 1)[1].strip()))
+    if not token:
+        return None
+    if token_expired(token):
+        await session.delete(token)
+        await session.commit()
+        return None
+    return token.user
+
+
+def login_required(handler: Handler) -> Handler:
+    @wraps(handler)
+    async def wrapper(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+        request.user = await get_current_user(request, session)
+        if not request.user:
+            return {"error": "Authentication required"}, HTTPStatus.UNAUTHORIZED
+        return await handler(request, session)
+
+    return wrapper
+
+
+def reads_from_replica(handler: Handler) -> Handler:
+    """Async counterpart of :func:`helynota.replicas.reads_from_replica`."""
+
+    @wraps(handler)
+    async def wrapper(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+        router = request.extensions.get("read_replica")
+        replica = session.info.get("replica_engine")
+        if router is not None and replica is not None and router.use_replica(
+            client_keys(request.client_ip, request.headers.get("authorization", ""))
+        ):
+            session.info["replica"] = replica
+        return await handler(request, session)
+
+    return wrapper
+
+
+@route("GET", "/api/health")
+async def healthcheck(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    return {"status": "ok"}, HTTPStatus.OK
+
+
+@route("POST", "/api/auth/register")
+async def register(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    username, email, password = parse_registration(request.json())
+    if await session.scalar(user_exists_stmt(username, email)):
+        return {"error": "User already exists"}, HTTPStatus.CONFLICT
+
+    user = User(username=username, email=email)
+    # Password hashing is CPU-bound; keep it off the event loop.
+    await asyncio.to_thread(user.set_password, password)
+    token = user.refresh_token()
+    session.add(user)
+    await session.commit()
+    return registered_payload(token), HTTPStatus.CREATED
+
+
+@route("POST", "/api/auth/login")
+async def login(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    username, password = parse_credentials(request.json())
+    user = await session.scalar(user_by_name_stmt(username))
+    if not user or not await asyncio.to_thread(user.check_password, password):
+        return {"error": "Invalid credentials"}, HTTPStatus.UNAUTHORIZED
+
+    session_token = SessionToken.generate(user)
+    session.add(session_token)
+    token = user.refresh_token()
+    await session.commit()
+    return login_payload(token, session_token), HTTPStatus.OK
+
+
+@route("GET", "/api/stats")
+async def stats(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    return stats_payload(request.extensions), HTTPStatus.OK
+
+
+@route("GET", "/api/room-types")
+@reads_from_replica
+async def list_room_types(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    return [room_type_payload(rt) for rt in await session.scalars(room_types_stmt())], HTTPStatus.OK
+
+
+@route("GET", "/api/rooms/search")
+@reads_from_replica
+async def search_rooms(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    check_in, check_out, filters = parse_search(request.query, request.config)
+    cache = request.extensions.get("search_cache")
+    if cache is not None:
+        key = search_key(check_in, check_out, filters)
+        available, generation = cache.lookup(key)
+        if available is not None:
+            return search_payload(available), HTTPStatus.OK
+
+    rows = (await session.execute(search_rooms_stmt(check_in, check_out, filters))).all()
+    pricing = request.extensions["pricing"]
+    room_type_ids = {room_type.id for _, room_type in rows}
+    if pricing.due(room_type_ids):
+        await session.run_sync(pricing.refresh, room_type_ids)
+    free = None
+    if filters.splits_room_types and any(pricing.has_occupancy_rules(i) for i in room_type_ids):
+        free = dict((await session.execute(available_counts_stmt(check_in, check_out, room_type_ids))).all())
+    available = search_results(rows, check_in, check_out, pricing, free)
+    if cache is not None and "replica" not in session.info:
+        cache.store(key, available, generation)
+    return search_payload(available), HTTPStatus.OK
+
+
+@route("POST", "/api/reservations")
+@login_required
+async def create_reservation(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    room_type_id, check_in, check_out = parse_booking(request.json(), request.config)
+    room_type = await session.get(RoomType, room_type_id)
+    if not room_type:
+        return {"error": "Room type not found"}, HTTPStatus.NOT_FOUND
+
+    available_room = await session.scalar(
+        available_rooms_stmt(check_in, check_out, room_type_id=room_type.id, only_bookable=True)
+        .limit(1)
+    )
+    if not available_room:
+        return {"error": "No rooms available for the selected criteria"}, HTTPStatus.CONFLICT
+
+    pricing = request.extensions["pricing"]
+    if pricing.due([room_type.id]):
+        await session.run_sync(pricing.refresh, [room_type.id])
+    occupancy = 0.0
+    if pricing.has_occupancy_rules(room_type.id):
+        free = await session.scalar(available_count_stmt(check_in, check_out, room_type.id))
+        occupancy = pricing.occupancy(room_type.id, free)
+
+    holds = request.extensions["holds"]
+    reservation = new_reservation(
+        request.user.id,  # type: ignore[union-attr]
+        available_room,
+        check_in,
+        check_out,
+        pricing.stay_total(room_type.id, check_in, check_out, occupancy),
+        holds.hold_seconds,
+    )
+    session.add(reservation)
+    await session.flush()
+    session.add(reservation_event("reservation.created", reservation))
+    await session.commit()
+    holds.schedule(reservation.id, reservation.hold_expires_at)
+    return reservation_created_payload(reservation), HTTPStatus.CREATED
+
+
+async def merge_history(
+    reservations: AsyncIterable[Reservation], archived: AsyncIterable[ArchivedReservation]
+) -> AsyncIterator[Any]:
+    """Async :func:`helynota.booking.merge_history`: newest first, consumed lazily."""
+    hot, old = reservations.__aiter__(), archived.__aiter__()
+    left, right = await anext(hot, None), await anext(old, None)
+    while left is not None or right is not None:
+        if right is None or (left is not None and left.created_at >= right.created_at):
+            yield left
+            left = await anext(hot, None)
+        else:
+            yield right
+            right = await anext(old, None)
+
+
+@route("GET", "/api/reservations")
+@login_required
+@reads_from_replica
+async def list_reservations(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    user_id = request.user.id  # type: ignore[union-attr]
+    # Like the Flask route: rows are fetched and encoded batch by batch while
+    # the response is sent.
+    reservations = await session.stream_scalars(
+        user_reservations_stmt(user_id).execution_options(yield_per=STREAM_BATCH)
+    )
+    archived = await session.stream_scalars(
+        archived_reservations_stmt(user_id).execution_options(yield_per=STREAM_BATCH)
+    )
+    history = merge_history(reservations, archived)
+    return JsonArray(reservation_payload(r) async for r in history), HTTPStatus.OK
+
+
+@route("POST", "/api/payments/simulate")
+@login_required
+async def simulate_payment(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    reservation_id, method, force_failure = parse_payment(request.json())
+    reservation = check_payable(
+        await session.scalar(payable_reservation_stmt(reservation_id)),
+        request.user.id,  # type: ignore[union-attr]
+    )
+    payment, event = settle_payment(reservation, method, force_failure)
+    session.add_all([payment, event])
+    await session.commit()
+    return payment_payload(reservation, payment), HTTPStatus.OK
+
+
+@route("GET", "/api/users/me")
+@login_required
+async def current_user(request: AsyncRequest, session: AsyncSession) -> JsonResponse:
+    return user_payload(request.user), HTTPStatus.OK  # type: ignore[arg-type]
+
+
+class AsyncBookingApp:
+    """ASGI application: async ``/api`` routes, Flask for everything else."""
+
+    def __init__(
+        self, flask_app: Flask, engine: AsyncEngine, replica_engine: Optional[AsyncEngine] = None
+    ) -> None:
+        self.flask_app = flask_app
+        self.engine = engine
+        self.replica_engine = replica_engine
+        if replica_engine is not None:
+            configure_sqlite(engine.sync_engine, replica_engine.sync_engine)
+        # The search cache, pricing and outbox hooks find their target
+        # through session.info, there is no app context here.
+        self.sessions = async_sessionmaker(
+            engine,
+            expire_on_commit=False,
+            sync_session_class=AsyncRoutingSession,
+            info={
+                "search_cache": flask_app.extensions.get("search_cache"),
+                "pricing": flask_app.extensions["pricing"],
+                "outbox": flask_app.extensions["outbox"],
+                "replica_engine": replica_engine.sync_engine if replica_engine is not None else None,
+            },
+        )
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = await self._read_body(receive)
+        handler = ROUTES.get((scope["method"], scope["path"]))
+        if handler is None:
+            await self._call_flask(scope, body, send)
+            return
+
+        headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        query: Dict[str, str] = {}
+        for key, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True):
+            query.setdefault(key, value)
+        client_ip = scope["client"][0] if scope.get("client") else ""
+        request = AsyncRequest(
+            scope["method"],
+            scope["path"],
+            query,
+            headers,
+            body,
+            self.flask_app.extensions,
+            client_ip,
+            config=self.flask_app.config,
+        )
+
+        # Same rate limiting and load shedding as the Flask app, keyed by the
+        # blueprint endpoint name.
+        guard = self.flask_app.extensions.get("request_guard")
+        endpoint = f"api.{handler.__name__}"
+        guarded = guard is not None and guard.protects(endpoint)
+        if guarded:
+            rejection = guard.admit(endpoint, client_ip, headers.get("authorization", ""))
+            if rejection:
+                retry_after = (b"retry-after", str(rejection.retry_after).encode("latin-1"))
+                await self._send_json(send, {"error": rejection.error}, rejection.status, [retry_after])
+                return
+        started = time.perf_counter()
+        streamed = False
+
+        try:
+            async with self.sessions() as session:
+                payload, status = await handler(request, session)
+                if isinstance(payload, JsonArray):
+                    streamed = True
+                    await self._send_array(send, payload.items, status)
+        except ApiError as exc:
+            payload, status = exc.payload(), exc.status
+        except Exception:
+            self.flask_app.logger.exception("Unhandled error in %s %s", request.method, request.path)
+            if streamed:
+                # Headers are out: let the server abort the response.
+                raise
+            payload, status = {"error": "Internal Server Error"}, HTTPStatus.INTERNAL_SERVER_ERROR
+        finally:
+            if guarded:
+                guard.done(time.perf_counter() - started)
+
+        router = self.flask_app.extensions.get("read_replica")
+        if router is not None and request.method not in SAFE_METHODS and status < 400:
+            router.mark_write(client_keys(client_ip, headers.get("authorization", "")))
+        if not streamed:
+            await self._send_json(send, payload, status)
+
+    async def _send_json(
+        self, send: Callable, payload: Any, status: int, headers: Sequence[Tuple[bytes, bytes]] = ()
+    ) -> None:
+        content = self.flask_app.json.dumps_bytes(payload) + b"\n"
+        await send(
+            {
+                "type": "http.response.start",
+                "status": int(status),
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(content)).encode("latin-1")),
+                    *headers,
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    async def _send_array(self, send: Callable, items: AsyncIterable[Any], status: int) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": int(status),
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        async for chunk in self.flask_app.json.aiter_array(items):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.flask_app.extensions["holds"].start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.to_thread(self.flask_app.extensions["outbox"].stop)
+                await asyncio.to_thread(self.flask_app.extensions["holds"].stop)
+                notifications = self.flask_app.extensions.get("notifications")
+                if notifications is not None:
+                    await asyncio.to_thread(notifications.stop)
+                await self.engine.dispose()
+                if self.replica_engine is not None:
+                    await self.replica_engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive: Callable) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _call_flask(self, scope: Dict[str, Any], body: bytes, send: Callable) -> None:
+        """Serve a non-async route through the Flask WSGI app in a worker thread."""
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        environ: Dict[str, Any] = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": scope["path"],
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+        for name, value in scope.get("headers", []):
+            key = name.decode("latin-1").upper().replace("-", "_")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = f"HTTP_{key}"
+            environ[key] = value.decode("latin-1")
+
+        def run() -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+            started: Dict[str, Any] = {}
+
+            def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> None:
+                started["status"] = int(status.split(" ", 1)[0])
+                started["headers"] = [
+                    (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+                ]
+
+            result = self.flask_app(environ, start_response)
+            try:
+                content = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            return started["status"], started["headers"], content
+
+        status, headers, content = await asyncio.to_thread(run)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content})
+
+
+def async_database_uri(uri: str) -> str:
+    """Swap the sync driver in ``uri`` for its asyncio counterpart."""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Each async connection would open its own, empty in-memory database.
+        raise ValueError("The async serving mode needs a file-based SQLite database")
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.drivername!r}; set ASYNC_DATABASE_URI")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def create_asgi_app(test_config: Optional[Dict[str, Any]] = None) -> AsyncBookingApp:
+    """ASGI counterpart of :func:`helynota.create_app`, sharing its configuration.
+
+    ``ASYNC_DATABASE_URI`` overrides the async engine URL (by default the
+    Flask URI with the asyncio driver), ``ASYNC_READ_REPLICA_URI`` likewise
+    for ``READ_REPLICA_URI``, and ``ASYNC_ENGINE_OPTIONS`` is passed to
+    ``create_async_engine``.
+    """
+    flask_app = create_app(test_config)
+    uri = flask_app.config.get("ASYNC_DATABASE_URI") or async_database_uri(
+        flask_app.config["SQLALCHEMY_DATABASE_URI"]
+    )
+    options = flask_app.config.get("ASYNC_ENGINE_OPTIONS", {})
+    engine = create_async_engine(uri, **options)
+    replica_engine = None
+    if flask_app.config["READ_REPLICA_URI"]:
+        replica_uri = flask_app.config.get("ASYNC_READ_REPLICA_URI") or async_database_uri(
+            flask_app.config["READ_REPLICA_URI"]
+        )
+        replica_engine = create_async_engine(replica_uri, **options)
+    return AsyncBookingApp(flask_app, engine, replica_engine)
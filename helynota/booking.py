@@ -0,0 +1,556 @@
+"""Booking logic shared by the WSGI blueprint and the ASGI app.
+
+Every ``/api`` handler is split into steps that live here: parse the
+request (``parse_*``, raising :class:`ApiError`), build the statements
+(``*_stmt``) and the new rows, and shape the response (``*_payload``).
+The handlers in ``routes.py`` and ``asgi.py`` only run the statements on
+their session, so both serving modes return the same data. Nothing in
+this module touches a session, so the statements run unchanged on
+``db.session`` and on an ``AsyncSession``.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.orm import joinedload
+
+from .database import utcnow
+from .models import (
+    ArchivedReservation,
+    OutboxEvent,
+    Payment,
+    Reservation,
+    Room,
+    RoomType,
+    SessionToken,
+    User,
+)
+
+ACTIVE_RESERVATION_STATUSES = ("pending", "confirmed")
+# Largest integer filter SQLite (and any 64-bit column) can bind.
+MAX_INTEGER_FILTER = 2**63 - 1
+
+
+class ApiError(Exception):
+    """An error response: both front ends send ``{"error": message}`` with ``status``."""
+
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST) -> None:
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def payload(self) -> Dict[str, str]:
+        return {"error": self.message}
+
+
+def parse_date(value: str, field_name: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (ValueError, TypeError):
+        raise ValueError(f"{field_name} must follow YYYY-MM-DD format")
+
+
+def parse_stay(
+    check_in_raw: Any,
+    check_out_raw: Any,
+    max_nights: Optional[int] = None,
+    horizon_days: Optional[int] = None,
+) -> Tuple[date, date]:
+    """Parse and validate a stay; raises ``ValueError`` with the API message.
+
+    The API passes ``MAX_STAY_NIGHTS`` and ``PRICING_HORIZON_DAYS``, which
+    bound the work a single search can ask for (rate tables, overlap scans).
+    """
+    check_in = parse_date(check_in_raw, "check_in")
+    check_out = parse_date(check_out_raw, "check_out")
+    if check_in >= check_out:
+        raise ValueError("check_out must be after check_in")
+    if max_nights is not None and (check_out - check_in).days > max_nights:
+        raise ValueError(f"stays are limited to {max_nights} nights")
+    if horizon_days is not None and check_in > date.today() + timedelta(days=horizon_days):
+        raise ValueError(f"check_in must be within {horizon_days} days from today")
+    return check_in, check_out
+
+
+def _text(payload: Mapping[str, Any], name: str) -> str:
+    return (payload.get(name) or "").strip()
+
+
+def parse_registration(payload: Mapping[str, Any]) -> Tuple[str, str, str]:
+    """``(username, email, password)`` from a register body."""
+    username, email, password = (_text(payload, name) for name in ("username", "email", "password"))
+    if not username or not email or not password:
+        raise ApiError("username, email and password are required")
+    return username, email, password
+
+
+def parse_credentials(payload: Mapping[str, Any]) -> Tuple[str, str]:
+    """``(username, password)`` from a login body; blanks fail as bad credentials."""
+    return _text(payload, "username"), _text(payload, "password")
+
+
+def parse_search(args: Mapping[str, Any], config: Mapping[str, Any]) -> Tuple[date, date, SearchFilters]:
+    """Stay and filters of a room search."""
+    check_in_raw = args.get("check_in")
+    check_out_raw = args.get("check_out")
+    if not check_in_raw or not check_out_raw:
+        raise ApiError("check_in and check_out are required")
+    try:
+        check_in, check_out = parse_stay(
+            check_in_raw, check_out_raw, config["MAX_STAY_NIGHTS"], config["PRICING_HORIZON_DAYS"]
+        )
+        filters = SearchFilters.from_args(args, config["SEARCH_MAX_LIMIT"])
+    except ValueError as exc:
+        raise ApiError(str(exc))
+    return check_in, check_out, filters
+
+
+def parse_booking(payload: Mapping[str, Any], config: Mapping[str, Any]) -> Tuple[int, date, date]:
+    """``(room_type_id, check_in, check_out)`` from a reservation body."""
+    check_in_raw = payload.get("check_in")
+    check_out_raw = payload.get("check_out")
+    room_type_id = payload.get("room_type_id")
+    if not all([check_in_raw, check_out_raw, room_type_id]):
+        raise ApiError("room_type_id, check_in and check_out are required")
+    try:
+        check_in, check_out = parse_stay(
+            check_in_raw, check_out_raw, config["MAX_STAY_NIGHTS"], config["PRICING_HORIZON_DAYS"]
+        )
+    except ValueError as exc:
+        raise ApiError(str(exc))
+    try:
+        return int(room_type_id), check_in, check_out
+    except (TypeError, ValueError):
+        raise ApiError("room_type_id must be an integer")
+
+
+def parse_payment(payload: Mapping[str, Any]) -> Tuple[Any, str, bool]:
+    """``(reservation_id, method, force_failure)`` from a simulated payment body."""
+    reservation_id = payload.get("reservation_id")
+    if not reservation_id:
+        raise ApiError("reservation_id is required")
+    method = _text(payload, "method") or "credit_card"
+    return reservation_id, method, bool(payload.get("force_failure", False))
+
+
+def available_rooms_stmt(
+    check_in: date,
+    check_out: date,
+    room_type_id: Optional[int] = None,
+    only_bookable: bool = False,
+) -> Select:
+    """Rooms with no active reservation overlapping the stay, as ``(Room, RoomType)`` rows.
+
+    Availability is a correlated ``NOT EXISTS`` so the whole search is a
+    single query instead of one overlap count per room.
+    """
+    overlapping = select(Reservation.id).where(
+        Reservation.room_id == Room.id,
+        Reservation.status.in_(ACTIVE_RESERVATION_STATUSES),
+        Reservation.check_in < check_out,
+        Reservation.check_out > check_in,
+    )
+    stmt = select(Room, RoomType).join(Room.room_type).where(~overlapping.exists())
+    if room_type_id is not None:
+        stmt = stmt.where(Room.room_type_id == room_type_id)
+    if only_bookable:
+        stmt = stmt.where(Room.status == "available")
+    return stmt.order_by(Room.id)
+
+
+# Search ``sort`` values -> ORDER BY; every order ends on the room id so
+# pages are stable. "fit" puts the smallest room type that takes the party
+# first, then the cheapest.
+SEARCH_SORTS = {
+    "room": (Room.id,),
+    "price": (RoomType.base_price, Room.id),
+    "-price": (RoomType.base_price.desc(), Room.id),
+    "fit": (RoomType.capacity, RoomType.base_price, Room.id),
+    "floor": (Room.floor, Room.id),
+}
+
+
+def _parse_number(args: Mapping[str, Any], name: str, kind: type, minimum: float) -> Any:
+    raw = args.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = kind(raw)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or value < minimum or not (
+        math.isfinite(value) if kind is float else value <= MAX_INTEGER_FILTER
+    ):
+        label = "an integer" if kind is int else "a number"
+        raise ValueError(f"{name} must be {label} >= {minimum}")
+    return value
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Room search filters; hashable, so they are part of the search cache key."""
+
+    room_type: Optional[str] = None
+    guests: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    floor: Optional[int] = None
+    sort: str = "room"
+    limit: Optional[int] = None
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, Any], max_limit: int) -> "SearchFilters":
+        """Parse query arguments; raises ``ValueError`` with the API message."""
+        guests = _parse_number(args, "guests", int, 1)
+        sort = args.get("sort") or ("fit" if guests else "room")
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(SEARCH_SORTS)}")
+        limit = _parse_number(args, "limit", int, 1)
+        if limit is not None and limit > max_limit:
+            raise ValueError(f"limit must be at most {max_limit}")
+        return cls(
+            room_type=args.get("room_type") or None,
+            guests=guests,
+            min_price=_parse_number(args, "min_price", float, 0),
+            max_price=_parse_number(args, "max_price", float, 0),
+            floor=_parse_number(args, "floor", int, 0),
+            sort=sort,
+            limit=limit,
+        )
+
+    @property
+    def splits_room_types(self) -> bool:
+        """True when results may leave out free rooms of a returned type."""
+        return self.floor is not None or self.limit is not None
+
+
+def search_rooms_stmt(check_in: date, check_out: date, filters: SearchFilters) -> Select:
+    """``available_rooms_stmt`` narrowed, sorted and limited in SQL.
+
+    The room type is an exact match on its unique name; prices are the
+    nightly base rate (``RoomType.base_price``), which is what SQL can
+    filter and sort on.
+    """
+    stmt = available_rooms_stmt(check_in, check_out).order_by(None)
+    if filters.room_type:
+        stmt = stmt.where(RoomType.name == filters.room_type)
+    if filters.guests is not None:
+        stmt = stmt.where(RoomType.capacity >= filters.guests)
+    if filters.min_price is not None:
+        stmt = stmt.where(RoomType.base_price >= filters.min_price)
+    if filters.max_price is not None:
+        stmt = stmt.where(RoomType.base_price <= filters.max_price)
+    if filters.floor is not None:
+        stmt = stmt.where(Room.floor == filters.floor)
+    stmt = stmt.order_by(*SEARCH_SORTS[filters.sort])
+    if filters.limit is not None:
+        stmt = stmt.limit(filters.limit)
+    return stmt
+
+
+def available_count_stmt(check_in: date, check_out: date, room_type_id: int) -> Select:
+    """Number of rooms of a type free for the whole stay (the occupancy input)."""
+    stays = available_rooms_stmt(check_in, check_out, room_type_id=room_type_id)
+    return select(func.count()).select_from(stays.order_by(None).subquery())
+
+
+def available_counts_stmt(check_in: date, check_out: date, room_type_ids: Iterable[int]) -> Select:
+    """``(room_type_id, free rooms)`` for several types in one query."""
+    stays = available_rooms_stmt(check_in, check_out).order_by(None)
+    free = stays.where(Room.room_type_id.in_(list(room_type_ids))).subquery()
+    return select(free.c.room_type_id, func.count()).group_by(free.c.room_type_id)
+
+
+def user_exists_stmt(username: str, email: str) -> Select:
+    return select(User.id).where((User.username == username) | (User.email == email)).limit(1)
+
+
+def user_by_name_stmt(username: str) -> Select:
+    return select(User).where(User.username == username)
+
+
+def room_types_stmt() -> Select:
+    return select(RoomType).order_by(RoomType.name)
+
+
+def payable_reservation_stmt(reservation_id: Any) -> Select:
+    return (
+        select(Reservation)
+        .options(joinedload(Reservation.payment))
+        .where(Reservation.id == reservation_id)
+    )
+
+
+def session_token_stmt(token_value: str) -> Select:
+    return (
+        select(SessionToken)
+        .options(joinedload(SessionToken.user))
+        .where(SessionToken.token == token_value)
+    )
+
+
+def token_expired(token: SessionToken) -> bool:
+    return token.expires_at < utcnow()
+
+
+def user_reservations_stmt(user_id: int) -> Select:
+    return (
+        select(Reservation)
+        .options(
+            joinedload(Reservation.room).joinedload(Room.room_type),
+            joinedload(Reservation.payment),
+        )
+        .where(Reservation.user_id == user_id)
+        .order_by(Reservation.created_at.desc())
+    )
+
+
+def archived_reservations_stmt(user_id: int) -> Select:
+    """``user_reservations_stmt`` for the archive (helynota/archive.py)."""
+    return (
+        select(ArchivedReservation)
+        .options(
+            joinedload(ArchivedReservation.room).joinedload(Room.room_type),
+            joinedload(ArchivedReservation.payment),
+        )
+        .where(ArchivedReservation.user_id == user_id)
+        .order_by(ArchivedReservation.created_at.desc())
+    )
+
+
+def merge_history(
+    reservations: Iterable[Reservation], archived: Iterable[ArchivedReservation]
+) -> Iterator[Any]:
+    """Both newest-first lists as one, still newest first; consumes them lazily."""
+    return heapq.merge(reservations, archived, key=lambda r: r.created_at, reverse=True)
+
+
+def room_type_payload(room_type: RoomType) -> Dict[str, Any]:
+    return {
+        "id": room_type.id,
+        "name": room_type.name,
+        "capacity": room_type.capacity,
+        "base_price": room_type.base_price,
+        "description": room_type.description,
+    }
+
+
+def available_room_payload(room: Room, room_type: RoomType, stay_total: float) -> Dict[str, Any]:
+    return {
+        "room_id": room.id,
+        "room_number": room.room_number,
+        "floor": room.floor,
+        "room_type": room_type.name,
+        "capacity": room_type.capacity,
+        "nightly_rate": room_type.base_price,
+        "stay_total": stay_total,
+    }
+
+
+def search_results(
+    rows: Sequence[Row],
+    check_in: date,
+    check_out: date,
+    pricing: Any,
+    free: Optional[Mapping[int, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Payloads for ``search_rooms_stmt`` rows, priced by the pricing engine.
+
+    Occupancy pricing needs the free rooms per type. Unless the search left
+    some out (``SearchFilters.splits_room_types``), the rows already tell;
+    otherwise pass ``free`` from ``available_counts_stmt``.
+    """
+    counts = Counter(room_type.id for _, room_type in rows)
+    if free is not None:
+        counts = Counter({room_type_id: free.get(room_type_id, count) for room_type_id, count in counts.items()})
+    totals = {
+        room_type_id: pricing.stay_total(
+            room_type_id, check_in, check_out, pricing.occupancy(room_type_id, count)
+        )
+        for room_type_id, count in counts.items()
+    }
+    return [available_room_payload(room, room_type, totals[room_type.id]) for room, room_type in rows]
+
+
+def search_payload(available: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"available_rooms": available, "count": len(available)}
+
+
+def reservation_payload(reservation: Reservation | ArchivedReservation) -> Dict[str, Any]:
+    return {
+        "id": reservation.id,
+        "room_number": reservation.room.room_number,
+        "room_type": reservation.room.room_type.name,
+        "status": reservation.status,
+        # Dates are encoded by the JSON provider (helynota/json_provider.py).
+        "check_in": reservation.check_in,
+        "check_out": reservation.check_out,
+        "total_price": reservation.total_price,
+        "hold_expires_at": reservation.hold_expires_at,
+        "payment_status": reservation.payment.status if reservation.payment else "unpaid",
+    }
+
+
+def history_payloads(
+    reservations: Iterable[Reservation], archived: Iterable[ArchivedReservation]
+) -> Iterator[Dict[str, Any]]:
+    """A user's reservations, archived ones included, newest first."""
+    return (reservation_payload(r) for r in merge_history(reservations, archived))
+
+
+def registered_payload(token: str) -> Dict[str, Any]:
+    return {"message": "User registered successfully", "token": token}
+
+
+def login_payload(token: str, session_token: SessionToken) -> Dict[str, Any]:
+    return {"message": "Login successful", "token": token, "session_token": session_token.token}
+
+
+def user_payload(user: User) -> Dict[str, Any]:
+    return {"id": user.id, "username": user.username, "email": user.email, "token": user.api_token}
+
+
+def stats_payload(extensions: Mapping[str, Any]) -> Dict[str, Any]:
+    """Per-process counters of the optional components (``/api/stats``)."""
+    payload = {}
+    cache = extensions.get("search_cache")
+    if cache is not None:
+        payload["search_cache"] = cache.stats()
+    guard = extensions.get("request_guard")
+    if guard is not None:
+        payload["admission"] = guard.admission.stats()
+    payload["outbox"] = extensions["outbox"].stats()
+    payload["holds"] = extensions["holds"].stats()
+    router = extensions.get("read_replica")
+    if router is not None:
+        payload["read_replica"] = router.stats()
+    notifications = extensions.get("notifications")
+    if notifications is not None:
+        payload["notifications"] = notifications.stats()
+    profiler = extensions.get("profiler")
+    if profiler is not None:
+        payload["profiling"] = profiler.stats()
+    return payload
+
+
+def new_reservation(
+    user_id: int,
+    room: Room,
+    check_in: date,
+    check_out: date,
+    total_price: float,
+    hold_seconds: float,
+) -> Reservation:
+    """A pending reservation holding ``room``.
+
+    Foreign keys rather than relationships: assigning a relationship would
+    lazy-load the other side's collection, which AsyncSession cannot do.
+    """
+    return Reservation(
+        user_id=user_id,
+        room_id=room.id,
+        check_in=check_in,
+        check_out=check_out,
+        status="pending",
+        total_price=total_price,
+        hold_expires_at=hold_expires_at(hold_seconds),
+    )
+
+
+def reservation_created_payload(reservation: Reservation) -> Dict[str, Any]:
+    return {
+        "message": "Reservation created",
+        "reservation_id": reservation.id,
+        "status": reservation.status,
+        "total_price": reservation.total_price,
+        "hold_expires_at": reservation.hold_expires_at,
+    }
+
+
+def check_payable(reservation: Optional[Reservation], user_id: int) -> Reservation:
+    """The reservation from ``payable_reservation_stmt``, if ``user_id`` can pay it now."""
+    if not reservation or reservation.user_id != user_id:
+        raise ApiError("Reservation not found", HTTPStatus.NOT_FOUND)
+    if reservation.payment:
+        raise ApiError("Reservation already paid", HTTPStatus.CONFLICT)
+    if hold_expired(reservation):
+        raise ApiError("Reservation hold expired", HTTPStatus.CONFLICT)
+    return reservation
+
+
+def settle_payment(reservation: Reservation, method: str, failed: bool) -> Tuple[Payment, OutboxEvent]:
+    """Record a simulated payment: confirms or cancels ``reservation``.
+
+    Returns the payment and its outbox event, both to add to the session.
+    """
+    payment = Payment(
+        reservation_id=reservation.id,
+        amount=reservation.total_price,
+        method=method,
+        status="failed" if failed else "success",
+        transaction_reference=f"SIM-{reservation.id}-{int(time.time())}",
+        processed_at=utcnow(),
+    )
+    reservation.status = "cancelled" if failed else "confirmed"
+    reservation.hold_expires_at = None
+    return payment, reservation_event(f"reservation.{reservation.status}", reservation, payment)
+
+
+def payment_payload(reservation: Reservation, payment: Payment) -> Dict[str, Any]:
+    return {
+        "message": "Payment processed",
+        "reservation_status": reservation.status,
+        "payment_status": payment.status,
+        "transaction_reference": payment.transaction_reference,
+    }
+
+
+def hold_expires_at(hold_seconds: float) -> datetime:
+    return utcnow() + timedelta(seconds=hold_seconds)
+
+
+def hold_expired(reservation: Reservation) -> bool:
+    """True once a pending reservation's hold ran out, even before the expirer ran."""
+    if reservation.status == "expired":
+        return True
+    return (
+        reservation.status == "pending"
+        and reservation.hold_expires_at is not None
+        and reservation.hold_expires_at <= utcnow()
+    )
+
+
+def reservation_event(
+    topic: str, reservation: Reservation, payment: Optional[Payment] = None
+) -> OutboxEvent:
+    """Outbox event for a reservation change; add it to the session that commits the change.
+
+    ``reservation`` must be flushed (it needs an id).
+    """
+    data: Dict[str, Any] = {
+        "reservation_id": reservation.id,
+        "user_id": reservation.user_id,
+        "room_id": reservation.room_id,
+        "status": reservation.status,
+        "check_in": reservation.check_in.isoformat(),
+        "check_out": reservation.check_out.isoformat(),
+        "total_price": reservation.total_price,
+    }
+    if payment is not None:
+        data["payment"] = {
+            "status": payment.status,
+            "method": payment.method,
+            "amount": payment.amount,
+            "transaction_reference": payment.transaction_reference,
+        }
+    return OutboxEvent(
+        topic=topic, aggregate_type="reservation", aggregate_id=reservation.id, payload=data
+    )
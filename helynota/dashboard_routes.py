@@ -1,14 +1,60 @@
+import threading
+from datetime import datetime
 from pathlib import Path
-from flask import Blueprint, send_from_directory, redirect, current_app
+from flask import Blueprint, send_from_directory, redirect, current_app, jsonify, request
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/')
 
+# Chart assets carry a content hash in their file name, so a changed chart
+# always gets a new URL and the old one can be cached "forever".
+ASSET_MAX_AGE = 60 * 60 * 24 * 365
+
+
+_service_lock = threading.Lock()
+
+
+def _dashboards_path() -> Path:
+    return Path(current_app.config['DASHBOARD_DIR'])
+
+
+def _metrics_service():
+    """Return the app-wide metrics service, creating it on first use."""
+    # Imported here: metrics.sistema_metricas imports helynota.database, so a
+    # module-level import would be circular when metrics is imported first.
+    from metrics.servicio_metricas import ServicioMetricas
+
+    service = current_app.extensions.get('metricas_en_vivo')
+    if service is None:
+        with _service_lock:
+            service = current_app.extensions.get('metricas_en_vivo')
+            if service is None:
+                service = ServicioMetricas(current_app.config['METRICS_DATASET_PATH'])
+                current_app.extensions['metricas_en_vivo'] = service
+    return service
+
+
+def _parse_day(value, field_name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{field_name} must follow YYYY-MM-DD format")
+
+
 @dashboard_bp.route('/dashboards/<path:filename>')
 def serve_static(filename):
     """Serve static files from the dashboards directory."""
-    project_root = Path(current_app.root_path).parent
-    dashboards_path = project_root / 'dashboards'
-    return send_from_directory(dashboards_path, filename)
+    return send_from_directory(_dashboards_path(), filename)
+
+@dashboard_bp.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve fingerprinted chart images with long-lived cache headers."""
+    response = send_from_directory(
+        _dashboards_path() / 'assets', filename, max_age=ASSET_MAX_AGE
+    )
+    response.cache_control.immutable = True
+    return response
 
 @dashboard_bp.route('/')
 def index():
@@ -17,9 +63,34 @@ def index():
 
 @dashboard_bp.route('/dashboard/<int:day>')
 def serve_dashboard(day):
-    """Serve the dashboard HTML files."""
-    if not (1 <= day <= 5):
+    """Serve the dashboard HTML files.
+
+    Responses carry an ETag and ``Cache-Control: no-cache`` so browsers
+    revalidate and get a 304 while the file is unchanged.
+    """
+    if day < 1:
         return "Dashboard not found", 404
-    project_root = Path(__file__).resolve().parent.parent
-    dashboards_path = project_root / 'dashboards'
-    return send_from_directory(dashboards_path, f'dashboard_dia_{day}.html')
\ No newline at end of file
+    return send_from_directory(
+        _dashboards_path(), f'dashboard_dia_{day}.html', max_age=0
+    )
+
+@dashboard_bp.route('/api/metrics')
+def metrics_series():
+    """Return the metrics snapshot series for an optional day range."""
+    try:
+        start = _parse_day(request.args.get('from'), 'from')
+        end = _parse_day(request.args.get('to'), 'to')
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if start and end and start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+
+    snapshots = _metrics_service().serie(start, end)
+    return jsonify(
+        {
+            "from": start.isoformat() if start else None,
+            "to": end.isoformat() if end else None,
+            "count": len(snapshots),
+            "snapshots": snapshots,
+        }
+    )
@@ -1,11 +1,42 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from typing import Any
 
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 
 
-db = SQLAlchemy()
+class ReplicaReads:
+    """Session mixin: plain SELECTs go to ``info["replica"]`` when it is set.
+
+    Writes, flushes and ``SELECT ... FOR UPDATE`` keep using the primary;
+    see helynota/replicas.py for when a session reads from the replica.
+    """
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, bind: Any = None, **kwargs: Any) -> Any:
+        replica = self.info.get("replica")  # type: ignore[attr-defined]
+        if (
+            replica is not None
+            and bind is None
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)  # type: ignore[misc]
+
+
+class RoutingSession(ReplicaReads, FlaskSession):
+    pass
+
+
+class AsyncRoutingSession(ReplicaReads, Session):
+    """Sync session class behind the ASGI mode's ``AsyncSession``."""
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 def utcnow() -> datetime:
@@ -0,0 +1,254 @@
+"""Daily occupancy forecasts per room type.
+
+``OccupancyForecaster`` turns the confirmed reservations (hot and
+archived, see helynota/archive.py) into one occupancy series per room
+type: every stay adds +1 on its check-in night and -1 on its check-out
+night of a difference array (``np.add.at``), and a cumulative sum gives
+the occupied rooms per night for all types at once.
+
+Two models are fitted on that history, both with a weekly season:
+
+* ``naive``: seasonal naive, each weekday repeats its last observed value;
+* ``ets``: additive exponential smoothing (level + weekday seasonality),
+  updated one day at a time for all room types in a single vector step.
+
+The fitted state is kept between calls. When the date moves on only the
+new days are aggregated and fed to the models; a full refit happens on
+the first call, when the number of rooms of a type changes, or on
+``refit()``. Forecasts also report the occupancy already on the books.
+
+NumPy is imported here and only here; this module is loaded on first use
+so the web app starts without it (see ``create_app``).
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from flask import Flask
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from .models import ArchivedReservation, Reservation, Room, RoomType
+
+METHODS = ("ets", "naive")
+SEASON = 7
+
+
+def room_counts(session: Session) -> Dict[int, int]:
+    rows = session.execute(select(Room.room_type_id, func.count()).group_by(Room.room_type_id))
+    return {room_type_id: count for room_type_id, count in rows}
+
+
+def occupied_rooms(session: Session, room_type_ids: np.ndarray, start: date, end: date) -> np.ndarray:
+    """Occupied rooms per room type (rows) and night in ``[start, end)`` (columns)."""
+    stays = [
+        select(Room.room_type_id, model.check_in, model.check_out)
+        .join(model.room)
+        .where(model.status == "confirmed", model.check_in < end, model.check_out > start)
+        for model in (Reservation, ArchivedReservation)
+    ]
+    rows = session.execute(union_all(*stays)).all()
+    nights = (end - start).days
+    diff = np.zeros((len(room_type_ids), nights + 1), dtype=np.int32)
+    if rows:
+        type_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        check_in = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+        check_out = np.fromiter((row[2].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+        # A room type added since the counts were taken is left out.
+        known = np.isin(type_ids, room_type_ids)
+        index = np.searchsorted(room_type_ids, type_ids)
+        first = start.toordinal()
+        np.add.at(diff, (index[known], np.clip(check_in[known] - first, 0, nights)), 1)
+        np.add.at(diff, (index[known], np.clip(check_out[known] - first, 0, nights)), -1)
+    return np.cumsum(diff[:, :-1], axis=1)
+
+
+@dataclass
+class FittedModels:
+    """Model state for ``room_type_ids``, fitted on the nights before ``through``."""
+
+    room_type_ids: np.ndarray
+    rooms: np.ndarray
+    through: date
+    level: np.ndarray
+    season: np.ndarray  # (types, 7), indexed by weekday
+    last: np.ndarray  # (types, 7), last observed occupancy per weekday
+    days_fitted: int = 0
+
+    def room_counts(self) -> Dict[int, int]:
+        return dict(zip(self.room_type_ids.tolist(), self.rooms.astype(int).tolist()))
+
+    def copy(self) -> "FittedModels":
+        """A snapshot that later in-place updates do not touch."""
+        return replace(self, level=self.level.copy(), season=self.season.copy(), last=self.last.copy())
+
+    def update(self, series: np.ndarray, first: date, alpha: float, gamma: float) -> None:
+        for offset in range(series.shape[1]):
+            weekday = (first + timedelta(days=offset)).weekday()
+            observed = series[:, offset]
+            season = self.season[:, weekday]
+            level = alpha * (observed - season) + (1 - alpha) * self.level
+            self.season[:, weekday] = gamma * (observed - level) + (1 - gamma) * season
+            self.level = level
+            self.last[:, weekday] = observed
+        self.through = first + timedelta(days=series.shape[1])
+        self.days_fitted += series.shape[1]
+
+    def predict(self, start: date, days: int, method: str) -> np.ndarray:
+        weekdays = [(start + timedelta(days=offset)).weekday() for offset in range(days)]
+        if method == "naive":
+            return self.last[:, weekdays]
+        return np.clip(self.level[:, None] + self.season[:, weekdays], 0.0, 1.0)
+
+
+@dataclass
+class Forecast:
+    start: date
+    method: str
+    fitted_through: date
+    series: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class OccupancyForecaster:
+    def __init__(
+        self,
+        history_days: int = 1095,
+        alpha: float = 0.3,
+        gamma: float = 0.1,
+        clock: Callable[[], date] = date.today,
+    ) -> None:
+        self.history_days = history_days
+        self.alpha = alpha
+        self.gamma = gamma
+        self.clock = clock
+        self.full_fits = 0
+        self.incremental_fits = 0
+        self._models: Optional[FittedModels] = None
+        self._lock = threading.Lock()
+
+    def refit(self, session: Session) -> FittedModels:
+        with self._lock:
+            self._models = None
+        return self.refresh(session)
+
+    def refresh(self, session: Session) -> FittedModels:
+        """Fit the models on every night before today, reusing what was fitted.
+
+        Returns a copy taken under the lock: a concurrent refresh updates the
+        shared models in place.
+        """
+        today = self.clock()
+        counts = room_counts(session)
+        with self._lock:
+            models = self._models
+            if models is not None and counts == models.room_counts():
+                if models.through < today:
+                    series = occupied_rooms(session, models.room_type_ids, models.through, today)
+                    models.update(series / models.rooms[:, None], models.through, self.alpha, self.gamma)
+                    self.incremental_fits += 1
+                return models.copy()
+            self._models = models = self._fit(session, counts, today)
+            self.full_fits += 1
+            return models.copy()
+
+    def _fit(self, session: Session, counts: Dict[int, int], today: date) -> FittedModels:
+        room_type_ids = np.array(sorted(i for i, n in counts.items() if n), dtype=np.int64)
+        rooms = np.array([counts[i] for i in room_type_ids.tolist()], dtype=np.float64)
+        start = today - timedelta(days=self.history_days)
+        series = occupied_rooms(session, room_type_ids, start, today) / rooms[:, None]
+
+        # Start from the first week: its mean as level, the rest as season.
+        warmup = series[:, :SEASON]
+        level = warmup.mean(axis=1) if warmup.size else np.zeros(len(room_type_ids))
+        season = np.zeros((len(room_type_ids), SEASON))
+        last = np.zeros((len(room_type_ids), SEASON))
+        for offset in range(warmup.shape[1]):
+            weekday = (start + timedelta(days=offset)).weekday()
+            season[:, weekday] = warmup[:, offset] - level
+            last[:, weekday] = warmup[:, offset]
+        through = start + timedelta(days=warmup.shape[1])
+        models = FittedModels(room_type_ids, rooms, through, level, season, last)
+        models.update(series[:, SEASON:], models.through, self.alpha, self.gamma)
+        return models
+
+    def forecast(
+        self, session: Session, days: int, method: str = "ets", room_type: Optional[str] = None
+    ) -> Forecast:
+        if method not in METHODS:
+            raise ValueError(f"method must be one of: {', '.join(METHODS)}")
+        models = self.refresh(session)
+        start = models.through
+        predicted = models.predict(start, days, method)
+        booked = occupied_rooms(session, models.room_type_ids, start, start + timedelta(days=days))
+        booked = booked / models.rooms[:, None]
+        names = dict(session.execute(select(RoomType.id, RoomType.name)).all())
+
+        result = Forecast(start, method, start - timedelta(days=1))
+        dates = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+        for row, room_type_id in enumerate(models.room_type_ids.tolist()):
+            name = names.get(room_type_id)
+            if room_type and name != room_type:
+                continue
+            result.series.append(
+                {
+                    "room_type": name,
+                    "rooms": int(models.rooms[row]),
+                    "days": [
+                        {"date": day, "occupancy": round(float(p), 3), "booked": round(float(b), 3)}
+                        for day, p, b in zip(dates, predicted[row], booked[row])
+                    ],
+                }
+            )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = self._models
+            through = models.through if models else None
+        return {
+            "full_fits": self.full_fits,
+            "incremental_fits": self.incremental_fits,
+            "fitted_through": (through - timedelta(days=1)).isoformat() if through else None,
+        }
+
+
+_forecaster_lock = threading.Lock()
+
+
+def forecaster_for(app: Flask) -> OccupancyForecaster:
+    """The app's forecaster, created on first use."""
+    forecaster = app.extensions.get("forecast")
+    if forecaster is None:
+        with _forecaster_lock:
+            forecaster = app.extensions.get("forecast")
+            if forecaster is None:
+                forecaster = OccupancyForecaster(
+                    app.config["FORECAST_HISTORY_DAYS"],
+                    app.config["FORECAST_ALPHA"],
+                    app.config["FORECAST_GAMMA"],
+                )
+                app.extensions["forecast"] = forecaster
+    return forecaster
+
+
+def forecast_payload(forecast: Forecast) -> Dict[str, Any]:
+    return {
+        "start": forecast.start,
+        "method": forecast.method,
+        "fitted_through": forecast.fitted_through,
+        "room_types": forecast.series,
+    }
+
+
+def occupancy_table(forecast: Forecast) -> List[List[str]]:
+    """Rows for the CLI: the date, then "forecast (booked)" per room type."""
+    header = ["date", *(series["room_type"] for series in forecast.series)]
+    columns = [series["days"] for series in forecast.series]
+    rows = [header]
+    for days in zip(*columns):
+        rows.append([days[0]["date"], *(f"{d['occupancy']:.0%} ({d['booked']:.0%})" for d in days)])
+    return rows
@@ -0,0 +1,209 @@
+"""Expiry of pending reservations (holds).
+
+A new reservation holds its room for ``RESERVATION_HOLD_SECONDS``. If it is
+not paid by then, ``HoldExpirer`` marks it ``expired``, which frees the room
+(only pending and confirmed reservations block availability).
+
+Expiry never scans the reservations table on requests: every hold goes
+into a min-heap ordered by expiry time, and a scheduler thread sleeps until
+the earliest one is due. All holds due by then are released in one
+``UPDATE ... RETURNING`` that only matches reservations still pending, so a
+payment that got there first (or another process's expirer) simply wins.
+The same transaction writes ``reservation.expired`` outbox events, and the
+freed stays are evicted from the search cache once it commits.
+
+The heap is per process. When the scheduler starts (first request or first
+hold, after any fork) it loads the pending holds already in the database,
+which covers holds created before a restart or reload.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy import select, update
+
+from .booking import reservation_event
+from .database import db, utcnow
+from .models import Reservation
+
+logger = logging.getLogger(__name__)
+
+
+class HoldExpirer:
+    def __init__(
+        self,
+        app: Flask,
+        hold_seconds: float = 900.0,
+        batch_size: int = 500,
+        clock: Callable[[], datetime] = utcnow,
+    ) -> None:
+        self.app = app
+        self.hold_seconds = hold_seconds
+        self.batch_size = batch_size
+        self.clock = clock
+        self.expired = 0
+        self._heap: List[Tuple[datetime, int]] = []
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -- heap ----------------------------------------------------------
+
+    def schedule(self, reservation_id: int, expires_at: datetime) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (expires_at, reservation_id))
+            if self._heap[0][1] == reservation_id:
+                # New earliest expiry: the scheduler must sleep less.
+                self._cond.notify()
+        self.start()
+
+    @property
+    def next_expiry(self) -> Optional[datetime]:
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now: datetime) -> List[Tuple[datetime, int]]:
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._heap))
+        return due
+
+    def load_pending(self) -> int:
+        """Schedule the pending holds recorded in the database."""
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(Reservation.hold_expires_at, Reservation.id).where(
+                    Reservation.status == "pending", Reservation.hold_expires_at.is_not(None)
+                )
+            ).all()
+        with self._cond:
+            # Entries already known are harmless duplicates: expiry is idempotent.
+            self._heap.extend((expires_at, reservation_id) for expires_at, reservation_id in rows)
+            heapq.heapify(self._heap)
+            self._cond.notify()
+        return len(rows)
+
+    # -- expiry --------------------------------------------------------
+
+    def expire_due(self, now: Optional[datetime] = None) -> int:
+        """Release every hold due by ``now``; returns how many were expired."""
+        now = now or self.clock()
+        total = 0
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                return total
+            try:
+                total += self._expire([reservation_id for _, reservation_id in due], now)
+            except Exception:
+                # Put the batch back for the next attempt.
+                with self._cond:
+                    for entry in due:
+                        heapq.heappush(self._heap, entry)
+                raise
+
+    def _expire(self, reservation_ids: List[int], now: datetime) -> int:
+        with self.app.app_context():
+            expired_ids = db.session.scalars(
+                update(Reservation)
+                .where(
+                    Reservation.id.in_(reservation_ids),
+                    Reservation.status == "pending",
+                    Reservation.hold_expires_at <= now,
+                )
+                .values(status="expired", hold_expires_at=None)
+                .returning(Reservation.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if not expired_ids:
+                db.session.rollback()
+                return 0
+            reservations = db.session.scalars(
+                select(Reservation).where(Reservation.id.in_(expired_ids))
+            ).all()
+            for reservation in reservations:
+                db.session.add(reservation_event("reservation.expired", reservation))
+            db.session.commit()
+            stays = [(r.check_in, r.check_out) for r in reservations]
+
+        # The bulk UPDATE bypasses the ORM flush hooks the search cache
+        # listens to.
+        cache = self.app.extensions.get("search_cache")
+        if cache is not None:
+            cache.invalidate(stays)
+        self.expired += len(expired_ids)
+        logger.info("Expired %s reservation holds", len(expired_ids))
+        return len(expired_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        next_expiry = self.next_expiry
+        with self._cond:
+            scheduled = len(self._heap)
+        return {
+            "scheduled": scheduled,
+            "expired": self.expired,
+            "next_expiry": next_expiry.isoformat() if next_expiry else None,
+        }
+
+    # -- scheduler thread ----------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running or not self.app.config["HOLD_EXPIRY_SCHEDULER"]:
+            return
+        with self._cond:
+            if self.running:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="hold-expirer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            self.load_pending()
+        except Exception:
+            logger.exception("Could not load pending reservation holds")
+        while True:
+            with self._cond:
+                while not self._stop:
+                    if self._heap:
+                        wait = (self._heap[0][0] - self.clock()).total_seconds()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._stop:
+                    return
+            try:
+                self.expire_due()
+            except Exception:
+                logger.exception("Expiring reservation holds failed")
+                with self._cond:
+                    self._cond.wait(1.0)
+
+
+def init_app(app: Flask) -> HoldExpirer:
+    expirer = HoldExpirer(app, app.config["RESERVATION_HOLD_SECONDS"], app.config["HOLD_EXPIRY_BATCH"])
+    app.extensions["holds"] = expirer
+    # Threads do not survive a fork: the first request of each process
+    # starts the scheduler (a cheap check afterwards).
+    app.before_request(expirer.start)
+    return expirer
@@ -0,0 +1,112 @@
+"""JSON encoding for API responses.
+
+``FastJSONProvider`` replaces Flask's default provider. It encodes with
+orjson when it is installed and falls back to the stdlib encoder otherwise;
+both write ``date``/``datetime`` values as ISO 8601, so payload builders can
+hand dates over as they are instead of calling ``isoformat()`` per row.
+
+``stream_list`` turns an iterable into a response that is encoded and sent
+in batches, so long lists (reservation history) never sit in memory as one
+document; the ASGI mode streams ``aiter_array`` chunks the same way. See ``scripts/benchmark_json.py`` for encode times.
+"""
+from __future__ import annotations
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator
+
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib encoder is used instead
+    orjson = None
+
+# Items encoded per chunk when streaming a list.
+STREAM_BATCH = 256
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is not None and not kwargs:
+            return self.dumps_bytes(obj).decode("utf-8")
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Compact UTF-8 encoding of ``obj``, the form responses are sent in."""
+        if orjson is None:
+            return self.dumps(obj).encode("utf-8")
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # Indented output for debugging, same as Flask's provider.
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+    def iter_array(self, items: Iterable[Any], batch_size: int = STREAM_BATCH) -> Iterator[bytes]:
+        """Encode ``items`` as a JSON array, yielding one chunk per batch."""
+        yield b"["
+        separator = b""
+        batch = []
+        for item in items:
+            batch.append(self.dumps_bytes(item))
+            if len(batch) >= batch_size:
+                yield separator + b",".join(batch)
+                separator, batch = b",", []
+        if batch:
+            yield separator + b",".join(batch)
+        yield b"]\n"
+
+    async def aiter_array(
+        self, items: AsyncIterable[Any], batch_size: int = STREAM_BATCH
+    ) -> AsyncIterator[bytes]:
+        """:meth:`iter_array` for an async iterable, e.g. an ``AsyncSession`` stream."""
+        yield b"["
+        separator = b""
+        batch = []
+        async for item in items:
+            batch.append(self.dumps_bytes(item))
+            if len(batch) >= batch_size:
+                yield separator + b",".join(batch)
+                separator, batch = b",", []
+        if batch:
+            yield separator + b",".join(batch)
+        yield b"]\n"
+
+
+def stream_list(items: Iterable[Any]) -> Response:
+    """Response streaming ``items`` as a JSON array.
+
+    ``items`` is consumed while the response is sent, inside the request
+    context, so it can be a lazy query result.
+    """
+    provider = current_app.json
+    return current_app.response_class(
+        stream_with_context(provider.iter_array(items)), mimetype=provider.mimetype
+    )
@@ -41,20 +41,41 @@ class RoomType(BaseModel):
 
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=False)
-    capacity = db.Column(db.Integer, nullable=False)
-    base_price = db.Column(db.Float, nullable=False)
+    # Indexed for the search filters and sorts (booking.search_rooms_stmt).
+    capacity = db.Column(db.Integer, nullable=False, index=True)
+    base_price = db.Column(db.Float, nullable=False, index=True)
 
     rooms = db.relationship("Room", back_populates="room_type", cascade="all, delete-orphan")
+    rate_rules = db.relationship(
+        "RateRule", back_populates="room_type", cascade="all, delete-orphan"
+    )
+
+
+class RateRule(BaseModel):
+    """Multiplier on a room type's base price; see helynota/pricing.py."""
+
+    __tablename__ = "rate_rules"
+
+    room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), nullable=False)
+    name = db.Column(db.String(80), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # season | weekday | occupancy
+    multiplier = db.Column(db.Float, nullable=False)
+    start_date = db.Column(db.Date, nullable=True)  # season
+    end_date = db.Column(db.Date, nullable=True)  # season, inclusive
+    weekdays = db.Column(db.String(20), nullable=True)  # weekday: "4,5" = Fri, Sat
+    min_occupancy = db.Column(db.Float, nullable=True)  # occupancy: 0..1
+
+    room_type = db.relationship("RoomType", back_populates="rate_rules")
 
 
 class Room(BaseModel):
     __tablename__ = "rooms"
 
     room_number = db.Column(db.String(10), unique=True, nullable=False)
-    floor = db.Column(db.Integer, nullable=False)
+    floor = db.Column(db.Integer, nullable=False, index=True)
     status = db.Column(db.String(20), default="available", nullable=False)
 
-    room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), nullable=False)
+    room_type_id = db.Column(db.Integer, db.ForeignKey("room_types.id"), nullable=False, index=True)
     room_type = db.relationship("RoomType", back_populates="rooms")
 
     reservations = db.relationship(
@@ -64,13 +85,24 @@ class Room(BaseModel):
 
 class Reservation(BaseModel):
     __tablename__ = "reservations"
+    __table_args__ = (
+        # Serves the availability check: overlapping stays of one room.
+        # check_out comes first so a stay only reads the room's reservations
+        # ending after its check-in, not the room's whole history.
+        db.Index("ix_reservations_room_stay", "room_id", "check_out", "check_in"),
+        # Ids must never be reused once rows move to archived_reservations
+        # (helynota/archive.py); plain SQLite rowids would reuse the highest.
+        {"sqlite_autoincrement": True},
+    )
 
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     room_id = db.Column(db.Integer, db.ForeignKey("rooms.id"), nullable=False)
     check_in = db.Column(db.Date, nullable=False)
     check_out = db.Column(db.Date, nullable=False)
     status = db.Column(db.String(20), default="pending", nullable=False)
     total_price = db.Column(db.Float, nullable=False)
+    # Pending reservations release their room at this time (helynota/holds.py).
+    hold_expires_at = db.Column(db.DateTime, nullable=True, index=True)
 
     user = db.relationship("User", back_populates="reservations")
     room = db.relationship("Room", back_populates="reservations")
@@ -84,6 +116,7 @@ class Reservation(BaseModel):
 
 class Payment(BaseModel):
     __tablename__ = "payments"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     reservation_id = db.Column(
         db.Integer, db.ForeignKey("reservations.id"), unique=True, nullable=False
@@ -97,6 +130,60 @@ class Payment(BaseModel):
     reservation = db.relationship("Reservation", back_populates="payment")
 
 
+class ArchivedReservation(BaseModel):
+    """Past reservation moved out of ``reservations``; see helynota/archive.py.
+
+    Same columns and ids as ``Reservation``, so history payloads read both.
+    """
+
+    __tablename__ = "archived_reservations"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    room_id = db.Column(db.Integer, db.ForeignKey("rooms.id"), nullable=False)
+    check_in = db.Column(db.Date, nullable=False)
+    check_out = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    hold_expires_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=utcnow, nullable=False)
+
+    room = db.relationship("Room")
+    payment = db.relationship("ArchivedPayment", back_populates="reservation", uselist=False)
+
+    def duration_nights(self) -> int:
+        return (self.check_out - self.check_in).days
+
+
+class ArchivedPayment(BaseModel):
+    __tablename__ = "archived_payments"
+
+    reservation_id = db.Column(
+        db.Integer, db.ForeignKey("archived_reservations.id"), unique=True, nullable=False
+    )
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    method = db.Column(db.String(30), nullable=False)
+    transaction_reference = db.Column(db.String(60), unique=True, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    reservation = db.relationship("ArchivedReservation", back_populates="payment")
+
+
+class OutboxEvent(BaseModel):
+    """Change event written in the same transaction as the change; see helynota/outbox.py."""
+
+    __tablename__ = "outbox_events"
+
+    topic = db.Column(db.String(80), nullable=False)  # e.g. reservation.created
+    aggregate_type = db.Column(db.String(40), nullable=False)
+    aggregate_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    claimed_by = db.Column(db.String(32), nullable=True)
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    dispatched_at = db.Column(db.DateTime, nullable=True, index=True)
+
+
 class SessionToken(BaseModel):
     __tablename__ = "session_tokens"
 
@@ -0,0 +1,405 @@
+"""Email notifications for confirmed and cancelled reservations.
+
+``NotificationService`` is an outbox sink (helynota/outbox.py), so
+``simulate_payment`` only writes an event; the email is built and sent
+later, on the dispatcher and worker threads, off the request path:
+
+* events are queued and picked up by a small pool of worker threads in
+  batches of up to ``NOTIFICATIONS_BATCH_SIZE``;
+* each batch loads its recipients in one query and fetches each template
+  once, then sends everything over one connection from
+  ``SMTPConnectionPool``, which keeps connections open between batches;
+* a message the server rejects for good (a 5xx reply, refused recipients)
+  is counted as failed and the batch goes on with the next one;
+* when the connection fails (or the server answers 4xx), the unsent rest
+  of the batch is retried with exponential backoff on a fresh connection,
+  up to ``NOTIFICATIONS_MAX_RETRIES`` times.
+
+The sink returns only once the workers acknowledged every message: sent,
+rejected, or given up on. If any was given up on, it raises, so the outbox
+keeps the events pending and delivers them again later; a crash before
+that loses nothing either. Delivery is therefore at least once, and event
+ids already handled by this process are skipped.
+``stats()`` reports throughput in messages per second; see
+``scripts/benchmark_notifications.py``. For local testing, point
+``SMTP_HOST``/``SMTP_PORT`` at a debugging server such as
+``python -m aiosmtpd -n -l localhost:1025``.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask
+from sqlalchemy import select
+
+from .database import db
+from .models import Reservation, Room, RoomType, User
+from .outbox import Event, Sink
+
+logger = logging.getLogger(__name__)
+
+# Outbox topic -> (template, subject).
+TEMPLATES = {
+    "reservation.confirmed": ("email/reserva_confirmada.txt", "Reserva #{reservation_id} confirmada"),
+    "reservation.cancelled": ("email/reserva_cancelada.txt", "Reserva #{reservation_id} cancelada"),
+}
+
+
+class NotificationsPending(RuntimeError):
+    """Some emails of an outbox batch were not sent yet; the batch is retried."""
+
+
+@dataclass(eq=False)
+class Notification:
+    event_id: int
+    topic: str
+    payload: Dict[str, Any]
+    # Set by the worker once the message is handled; ``retry`` if it gave up.
+    done: threading.Event = field(default_factory=threading.Event)
+    retry: bool = False
+
+
+class SMTPConnectionPool:
+    """Up to ``size`` SMTP connections, kept open and reused between batches."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int = 2,
+        timeout: float = 10.0,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.opened = 0
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except Exception:
+                # The connection is in an unknown state: drop it.
+                self._discard(conn)
+                raise
+            self._idle.put(conn)
+
+    @staticmethod
+    def _discard(conn: smtplib.SMTP) -> None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except (OSError, smtplib.SMTPException):
+                self._discard(conn)
+
+
+class NotificationService(Sink):
+    def __init__(
+        self,
+        app: Flask,
+        pool: SMTPConnectionPool,
+        sender: str,
+        workers: int = 2,
+        batch_size: int = 50,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        ack_timeout: float = 15.0,
+    ) -> None:
+        self.app = app
+        self.pool = pool
+        self.sender = sender
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.ack_timeout = ack_timeout
+        self.sent = 0
+        self.failed = 0
+        self.deferred = 0
+        self.retries = 0
+        self._first_send: Optional[float] = None
+        self._last_send: Optional[float] = None
+        self._queue: "queue.Queue[Notification]" = queue.Queue()
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._inflight: Dict[int, Notification] = {}
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # -- producer side -------------------------------------------------
+
+    def deliver(self, events: Sequence[Event]) -> None:
+        """Outbox sink: queue the batch's emails and wait until they are handled."""
+        waiting: List[Notification] = []
+        queued: List[Notification] = []
+        with self._lock:
+            for item in events:
+                if item.topic not in TEMPLATES or item.id in self._seen:
+                    continue
+                notification = self._inflight.get(item.id)
+                if notification is None:
+                    # Not still queued from an earlier, timed out delivery.
+                    notification = Notification(item.id, item.topic, item.payload)
+                    self._inflight[item.id] = notification
+                    queued.append(notification)
+                waiting.append(notification)
+        for notification in queued:
+            self.enqueue(notification)
+
+        deadline = time.monotonic() + self.ack_timeout
+        for notification in waiting:
+            if not notification.done.wait(max(deadline - time.monotonic(), 0.0)):
+                raise NotificationsPending(f"Timed out waiting for {len(waiting)} notifications")
+        retry = sum(notification.retry for notification in waiting)
+        if retry:
+            raise NotificationsPending(f"{retry} of {len(waiting)} notifications could not be sent yet")
+
+    def enqueue(self, notification: Notification) -> None:
+        self.start()
+        self._queue.put(notification)
+
+    def _ack(self, notification: Notification, retry: bool = False) -> None:
+        with self._lock:
+            self._inflight.pop(notification.event_id, None)
+            if not retry:
+                self._seen[notification.event_id] = None
+                if len(self._seen) > 10_000:
+                    self._seen.popitem(last=False)
+        notification.retry = retry
+        notification.done.set()
+
+    # -- workers -------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        # Threads do not survive a fork: started on first use, per process.
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"notifications-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.pool.close()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until every queued notification was handled; False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send_batch(batch)
+            except Exception:
+                logger.exception("Notification batch of %s failed", len(batch))
+                with self._lock:
+                    self.deferred += sum(not n.done.is_set() for n in batch)
+            finally:
+                for notification in batch:
+                    if not notification.done.is_set():
+                        self._ack(notification, retry=True)
+                    self._queue.task_done()
+
+    def _render(self, batch: List[Notification]) -> List[Tuple[Notification, EmailMessage]]:
+        ids = {n.payload["reservation_id"] for n in batch}
+        with self.app.app_context():
+            rows = db.session.execute(
+                select(Reservation.id, User.username, User.email, Room.room_number, RoomType.name)
+                .join(Reservation.user)
+                .join(Reservation.room)
+                .join(Room.room_type)
+                .where(Reservation.id.in_(ids))
+            ).all()
+        recipients = {row[0]: row[1:] for row in rows}
+
+        messages = []
+        templates: Dict[str, Any] = {}
+        for notification in batch:
+            recipient = recipients.get(notification.payload["reservation_id"])
+            if recipient is None:
+                self._ack(notification)  # reservation deleted since
+                continue
+            username, email, room_number, room_type = recipient
+            template_name, subject = TEMPLATES[notification.topic]
+            if template_name not in templates:
+                templates[template_name] = self.app.jinja_env.get_template(template_name)
+            message = EmailMessage()
+            message["From"] = self.sender
+            message["To"] = email
+            message["Subject"] = subject.format(**notification.payload)
+            message.set_content(
+                templates[template_name].render(
+                    username=username, room_number=room_number, room_type=room_type, **notification.payload
+                )
+            )
+            messages.append((notification, message))
+        return messages
+
+    def _send_batch(self, batch: List[Notification]) -> None:
+        remaining: Deque[Tuple[Notification, EmailMessage]] = deque(self._render(batch))
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+                with self._lock:
+                    self.retries += 1
+            try:
+                with self.pool.connection() as conn:
+                    while remaining:
+                        notification, message = remaining[0]
+                        try:
+                            conn.send_message(message)
+                        except smtplib.SMTPRecipientsRefused:
+                            self._rejected(message, "recipient refused")
+                        except smtplib.SMTPResponseException as exc:
+                            if exc.smtp_code < 500:
+                                raise  # transient: retry the rest on a new connection
+                            self._rejected(message, f"{exc.smtp_code} {exc.smtp_error!r}")
+                        else:
+                            with self._lock:
+                                self.sent += 1
+                        self._ack(notification)
+                        remaining.popleft()
+                break
+            except (OSError, smtplib.SMTPException) as exc:
+                logger.warning(
+                    "SMTP send failed (attempt %s of %s, %s messages left): %s",
+                    attempt + 1, self.max_retries + 1, len(remaining), exc,
+                )
+        if remaining:
+            logger.error(
+                "Leaving %s notifications to the outbox after %s retries", len(remaining), self.max_retries
+            )
+            with self._lock:
+                self.deferred += len(remaining)
+            for notification, _ in remaining:
+                self._ack(notification, retry=True)
+        with self._lock:
+            if self._first_send is None:
+                self._first_send = started
+            self._last_send = time.monotonic()
+
+    def _rejected(self, message: EmailMessage, reason: str) -> None:
+        """A message the server will never take: count it and go on with the batch."""
+        logger.warning("Notification to %s rejected: %s", message["To"], reason)
+        with self._lock:
+            self.failed += 1
+
+    # -- reporting -----------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = (
+                self._last_send - self._first_send
+                if self._first_send is not None and self._last_send is not None
+                else 0.0
+            )
+            return {
+                "queued": self._queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "deferred": self.deferred,
+                "retries": self.retries,
+                "connections_opened": self.pool.opened,
+                "messages_per_second": round(self.sent / elapsed, 1) if elapsed else 0.0,
+            }
+
+
+def init_app(app: Flask) -> Optional[NotificationService]:
+    """Create the notification service and subscribe it to the outbox."""
+    if not app.config["NOTIFICATIONS_ENABLED"]:
+        return None
+    pool = SMTPConnectionPool(
+        app.config["SMTP_HOST"],
+        app.config["SMTP_PORT"],
+        size=app.config["SMTP_POOL_SIZE"],
+        timeout=app.config["SMTP_TIMEOUT"],
+        username=app.config["SMTP_USERNAME"],
+        password=app.config["SMTP_PASSWORD"],
+        starttls=app.config["SMTP_STARTTLS"],
+    )
+    service = NotificationService(
+        app,
+        pool,
+        app.config["MAIL_SENDER"],
+        workers=app.config["NOTIFICATIONS_WORKERS"],
+        batch_size=app.config["NOTIFICATIONS_BATCH_SIZE"],
+        max_retries=app.config["NOTIFICATIONS_MAX_RETRIES"],
+        retry_delay=app.config["NOTIFICATIONS_RETRY_DELAY"],
+        # Answer the outbox well before its claim on the batch runs out.
+        ack_timeout=app.config["OUTBOX_LEASE_SECONDS"] / 2,
+    )
+    app.extensions["notifications"] = service
+    app.extensions["outbox"].add_sink(service)
+    return service
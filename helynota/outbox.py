@@ -0,0 +1,336 @@
+"""Transactional outbox for reservation and payment changes.
+
+Handlers add an ``OutboxEvent`` (see ``booking.reservation_event``) to the
+session that commits the change, so an event exists exactly when its change
+does. ``OutboxDispatcher`` delivers pending events in batches, in id order,
+to its sinks:
+
+* ``SubscriberSink``: in-process callbacks, always present
+  (``dispatcher.subscribe``);
+* ``NDJSONFileSink``: one JSON line per event appended to a file
+  (``"ndjson:<path>"`` in ``OUTBOX_SINKS``);
+* ``LocalBroker``: bounded per-subscriber queues standing in for a message
+  broker (``"broker"``).
+
+Delivery is at least once: a batch is marked dispatched only after every
+sink took it, and a failed batch is retried with backoff, so consumers
+deduplicate on the event id. Batches are claimed with a lease before
+delivery, so several processes (pre-forked workers) can run dispatchers
+against one database without delivering the same batch twice.
+
+The dispatcher thread starts with the first event committed by the process
+(after any fork) and is woken by every later commit, so delivery is near
+real time; events written by other processes are picked up every
+``OUTBOX_POLL_INTERVAL`` seconds.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from .database import db, utcnow
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    topic: str
+    aggregate_type: str
+    aggregate_id: int
+    payload: Dict[str, Any]
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, row: OutboxEvent) -> "Event":
+        return cls(row.id, row.topic, row.aggregate_type, row.aggregate_id, row.payload, row.created_at)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "aggregate_type": self.aggregate_type,
+            "aggregate_id": self.aggregate_id,
+            "payload": self.payload,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class Sink(ABC):
+    @abstractmethod
+    def deliver(self, events: Sequence[Event]) -> None:
+        """Take a batch; raising leaves the whole batch pending for a retry."""
+
+
+Subscriber = Callable[[Event], None]
+
+
+class SubscriberSink(Sink):
+    """Calls in-process subscribers, on the dispatcher thread."""
+
+    def __init__(self) -> None:
+        self._subscribers: List[Tuple[str, Subscriber]] = []
+
+    def subscribe(self, callback: Subscriber, topic_prefix: str = "") -> None:
+        self._subscribers.append((topic_prefix, callback))
+
+    def deliver(self, events: Sequence[Event]) -> None:
+        for item in events:
+            for prefix, callback in self._subscribers:
+                if item.topic.startswith(prefix):
+                    callback(item)
+
+
+class NDJSONFileSink(Sink):
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def deliver(self, events: Sequence[Event]) -> None:
+        lines = "".join(json.dumps(item.as_dict()) + "\n" for item in events)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+class BrokerFull(RuntimeError):
+    pass
+
+
+class LocalBroker(Sink):
+    """Topic fan-out to bounded queues, standing in for a message broker."""
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = maxsize
+        self._queues: List[Tuple[str, "queue.Queue[Event]"]] = []
+
+    def subscribe(self, topic_prefix: str = "") -> "queue.Queue[Event]":
+        consumer: "queue.Queue[Event]" = queue.Queue(self.maxsize)
+        self._queues.append((topic_prefix, consumer))
+        return consumer
+
+    def deliver(self, events: Sequence[Event]) -> None:
+        for prefix, consumer in self._queues:
+            matching = [item for item in events if item.topic.startswith(prefix)]
+            # All or nothing per consumer, so a retry does not reorder it.
+            if consumer.maxsize and consumer.qsize() + len(matching) > consumer.maxsize:
+                raise BrokerFull(f"Consumer queue for {prefix!r} is full")
+            for item in matching:
+                consumer.put_nowait(item)
+
+
+def make_sink(spec: str) -> Sink:
+    if spec == "broker":
+        return LocalBroker()
+    if spec.startswith("ndjson:"):
+        return NDJSONFileSink(spec[len("ndjson:") :])
+    raise ValueError(f"Unsupported OUTBOX_SINKS entry {spec!r}")
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        app: Flask,
+        sinks: Sequence[Sink] = (),
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        lease: float = 30.0,
+    ) -> None:
+        self.app = app
+        self.subscribers = SubscriberSink()
+        self.sinks: List[Sink] = [self.subscribers, *sinks]
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.dispatched = 0
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber, topic_prefix: str = "") -> None:
+        self.subscribers.subscribe(callback, topic_prefix)
+
+    def add_sink(self, sink: Sink) -> None:
+        self.sinks.append(sink)
+
+    def sink(self, kind: type) -> Optional[Sink]:
+        return next((sink for sink in self.sinks if isinstance(sink, kind)), None)
+
+    def notify(self) -> None:
+        """Wake the dispatcher (starting it if needed): events were committed."""
+        self.start()
+        self._wake.set()
+
+    def dispatch_once(self) -> int:
+        """Claim and deliver one batch; returns the number of events delivered."""
+        with self.app.app_context():
+            claim = uuid4().hex
+            now = utcnow()
+            pending = (
+                select(OutboxEvent.id)
+                .where(
+                    OutboxEvent.dispatched_at.is_(None),
+                    or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now),
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )
+            # Idle polls stay read-only.
+            if db.session.scalar(pending.limit(1)) is None:
+                return 0
+            db.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(pending.scalar_subquery()))
+                .values(
+                    claimed_by=claim,
+                    claimed_until=now + timedelta(seconds=self.lease),
+                    attempts=OutboxEvent.attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            rows = db.session.scalars(
+                select(OutboxEvent).where(OutboxEvent.claimed_by == claim).order_by(OutboxEvent.id)
+            ).all()
+            if not rows:
+                return 0
+            ids = [row.id for row in rows]
+            events = [Event.from_model(row) for row in rows]
+
+            try:
+                for sink in self.sinks:
+                    sink.deliver(events)
+            except Exception:
+                self.failures += 1
+                logger.exception("Outbox delivery of %s events failed", len(events))
+                # Retry with backoff instead of waiting for the lease to run out.
+                delay = min(2 ** max(row.attempts for row in rows), self.lease)
+                values: Dict[str, Any] = {"claimed_until": utcnow() + timedelta(seconds=delay)}
+                delivered = 0
+            else:
+                values = {"dispatched_at": utcnow(), "claimed_by": None, "claimed_until": None}
+                delivered = len(events)
+                self.dispatched += delivered
+            db.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return delivered
+
+    def pending(self) -> int:
+        with self.app.app_context():
+            return db.session.scalar(
+                select(func.count(OutboxEvent.id)).where(OutboxEvent.dispatched_at.is_(None))
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dispatched": self.dispatched,
+            "failures": self.failures,
+            "running": self.running,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        # A forked worker inherits the attribute but not the thread.
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                delivered = self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatcher failed")
+                delivered = 0
+            if delivered < self.batch_size:
+                self._wake.wait(self.poll_interval)
+
+
+# ----------------------------------------------------------------------
+# Committed events wake the dispatcher.
+
+PENDING_KEY = "outbox_pending"
+
+
+def _dispatcher_for(session: Session) -> Optional[OutboxDispatcher]:
+    dispatcher = session.info.get("outbox")
+    if dispatcher is None and has_app_context():
+        dispatcher = current_app.extensions.get("outbox")
+    return dispatcher
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    if any(isinstance(obj, OutboxEvent) for obj in session.new):
+        session.info[PENDING_KEY] = True
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(PENDING_KEY, False):
+        dispatcher = _dispatcher_for(session)
+        if dispatcher is not None and dispatcher.app.config["OUTBOX_DISPATCHER"]:
+            dispatcher.notify()
+
+
+def _after_transaction_end(session: Session, transaction: Any) -> None:
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def _register_listeners() -> None:
+    for name, listener in (
+        ("before_flush", _before_flush),
+        ("after_commit", _after_commit),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def init_app(app: Flask) -> OutboxDispatcher:
+    dispatcher = OutboxDispatcher(
+        app,
+        [make_sink(spec) for spec in app.config["OUTBOX_SINKS"]],
+        app.config["OUTBOX_BATCH_SIZE"],
+        app.config["OUTBOX_POLL_INTERVAL"],
+        app.config["OUTBOX_LEASE_SECONDS"],
+    )
+    app.extensions["outbox"] = dispatcher
+    _register_listeners()
+    return dispatcher
@@ -0,0 +1,296 @@
+"""Dynamic pricing: rate rules compiled into per-day rate tables.
+
+Every ``RateRule`` scales its room type's ``base_price``:
+
+* ``season``: nights from ``start_date`` to ``end_date`` (inclusive);
+* ``weekday``: nights whose weekday is listed in ``weekdays`` (``"4,5"`` =
+  Friday and Saturday);
+* ``occupancy``: the whole stay, once the room type's occupancy for that
+  stay reaches ``min_occupancy``; the highest threshold reached wins.
+
+Season and weekday rules multiply together and are compiled, per room type,
+into a nightly rate table with prefix sums, so a stay total is two lookups
+and a subtraction whatever its length. Occupancy depends on live bookings,
+so it is applied at quote time as a single multiplier for the stay.
+
+Tables cover yesterday to ``PRICING_HORIZON_DAYS + MAX_STAY_NIGHTS`` days
+ahead, i.e. every stay the API accepts, and the first refresh of each day
+recompiles them all so the window rolls with the date. Otherwise only room
+types whose rules, base price or room count changed are recompiled. Commits made in this process mark the engine stale straight
+away; changes made elsewhere are caught by a signature query run at most
+every ``PRICING_REFRESH_INTERVAL`` seconds.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import accumulate, chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import Select, event, func, select
+from sqlalchemy.orm import Session
+
+from .models import RateRule, Room, RoomType
+
+RULE_KINDS = ("season", "weekday", "occupancy")
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    kind: str
+    multiplier: float
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    weekdays: Tuple[int, ...] = ()
+    min_occupancy: float = 0.0
+
+    @classmethod
+    def from_model(cls, rule: RateRule) -> "CompiledRule":
+        if rule.kind not in RULE_KINDS:
+            raise ValueError(f"Unknown rate rule kind {rule.kind!r} in rule {rule.id}")
+        weekdays = tuple(int(day) for day in (rule.weekdays or "").split(",") if day.strip())
+        return cls(
+            rule.kind,
+            rule.multiplier,
+            rule.start_date,
+            rule.end_date,
+            weekdays,
+            rule.min_occupancy or 0.0,
+        )
+
+
+class RateTable:
+    """Nightly rates of one room type for ``[start, end)`` with prefix sums."""
+
+    def __init__(
+        self, base_price: float, rules: Sequence[CompiledRule], rooms: int, start: date, end: date
+    ) -> None:
+        self.base_price = base_price
+        self.rules = tuple(rules)
+        self.rooms = rooms
+        self.start = start
+        self.end = end
+
+        nightly = [float(base_price)] * (end - start).days
+        for rule in self.rules:
+            if rule.kind == "season" and rule.start_date and rule.end_date:
+                first = max((rule.start_date - start).days, 0)
+                last = min((rule.end_date - start).days + 1, len(nightly))
+                for index in range(first, last):
+                    nightly[index] *= rule.multiplier
+            elif rule.kind == "weekday":
+                for weekday in rule.weekdays:
+                    for index in range((weekday - start.weekday()) % 7, len(nightly), 7):
+                        nightly[index] *= rule.multiplier
+        self.nightly = nightly
+        self.prefix = [0.0, *accumulate(nightly)]
+        # Highest threshold first.
+        self.occupancy_tiers = sorted(
+            ((r.min_occupancy, r.multiplier) for r in self.rules if r.kind == "occupancy"),
+            reverse=True,
+        )
+
+    def covers(self, check_in: date, check_out: date) -> bool:
+        return self.start <= check_in and check_out <= self.end
+
+    def occupancy_multiplier(self, occupancy: float) -> float:
+        for threshold, multiplier in self.occupancy_tiers:
+            if occupancy >= threshold:
+                return multiplier
+        return 1.0
+
+    def total(self, check_in: date, check_out: date, occupancy: float = 0.0) -> float:
+        nights = self.prefix[(check_out - self.start).days] - self.prefix[(check_in - self.start).days]
+        return round(nights * self.occupancy_multiplier(occupancy), 2)
+
+
+def signature_stmt() -> Select:
+    """One row per room type with everything its rate table depends on."""
+    rules = (
+        select(
+            RateRule.room_type_id,
+            func.count(RateRule.id).label("rule_count"),
+            func.sum(RateRule.id).label("rule_ids"),
+            func.max(RateRule.updated_at).label("rules_updated"),
+        )
+        .group_by(RateRule.room_type_id)
+        .subquery()
+    )
+    rooms = (
+        select(Room.room_type_id, func.count(Room.id).label("room_count"))
+        .group_by(Room.room_type_id)
+        .subquery()
+    )
+    return (
+        select(
+            RoomType.id,
+            RoomType.base_price,
+            rooms.c.room_count,
+            rules.c.rule_count,
+            rules.c.rule_ids,
+            rules.c.rules_updated,
+        )
+        .outerjoin(rules, rules.c.room_type_id == RoomType.id)
+        .outerjoin(rooms, rooms.c.room_type_id == RoomType.id)
+    )
+
+
+class PricingEngine:
+    def __init__(
+        self,
+        horizon_days: int = 730,
+        refresh_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+        max_stay_nights: int = 0,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self.horizon_days = horizon_days
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.max_stay_nights = max_stay_nights
+        self.today = today
+        self.compilations = 0
+        self._compiled_on: Optional[date] = None
+        self._tables: Dict[int, RateTable] = {}
+        self._signatures: Dict[int, Tuple[Any, ...]] = {}
+        self._stale = True
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    def due(self, room_type_ids: Iterable[int] = ()) -> bool:
+        """Whether :meth:`refresh` would query, e.g. for a room type never seen."""
+        return (
+            self._stale
+            or self.today() != self._compiled_on
+            or self.clock() - self._checked_at >= self.refresh_interval
+            or any(rt_id not in self._tables for rt_id in room_type_ids)
+        )
+
+    def refresh(self, session: Session, room_type_ids: Iterable[int] = ()) -> List[int]:
+        """Recompile the tables whose inputs changed; returns their room type ids.
+
+        Cheap when nothing is due; call it before quoting ``room_type_ids``.
+        """
+        if not self.due(room_type_ids):
+            return []
+        # No lock around the queries: under AsyncSession.run_sync concurrent
+        # refreshes share the event loop thread. Racing refreshes only
+        # duplicate work.
+        self._stale = False
+        self._checked_at = self.clock()
+        today = self.today()
+        signatures = {row[0]: tuple(row[1:]) for row in session.execute(signature_stmt())}
+        if today != self._compiled_on:
+            # A new day: move every table's window.
+            changed = list(signatures)
+        else:
+            changed = [rt_id for rt_id, sig in signatures.items() if self._signatures.get(rt_id) != sig]
+        rules: Dict[int, List[CompiledRule]] = {rt_id: [] for rt_id in changed}
+        if changed:
+            for rule in session.scalars(select(RateRule).where(RateRule.room_type_id.in_(changed))):
+                rules[rule.room_type_id].append(CompiledRule.from_model(rule))
+
+        start = today - timedelta(days=1)
+        end = today + timedelta(days=self.horizon_days + self.max_stay_nights)
+        compiled = {
+            rt_id: RateTable(signatures[rt_id][0], rules[rt_id], signatures[rt_id][1] or 0, start, end)
+            for rt_id in changed
+        }
+        with self._lock:
+            tables = {rt_id: t for rt_id, t in self._tables.items() if rt_id in signatures}
+            tables.update(compiled)
+            self.compilations += len(compiled)
+            self._tables = tables
+            self._signatures = signatures
+            self._compiled_on = today
+        return changed
+
+    def _table(self, room_type_id: int, check_in: date, check_out: date) -> RateTable:
+        table = self._tables[room_type_id]
+        if not table.covers(check_in, check_out):
+            # Outside the compiled window (the API rejects such stays, see
+            # booking.parse_stay, except past ones): price this stay alone and keep the cached
+            # table as it is, so no request can make it grow.
+            table = RateTable(table.base_price, table.rules, table.rooms, check_in, check_out)
+        return table
+
+    def has_occupancy_rules(self, room_type_id: int) -> bool:
+        return bool(self._tables[room_type_id].occupancy_tiers)
+
+    def occupancy(self, room_type_id: int, available_rooms: int) -> float:
+        """Share of the room type's rooms that are taken for a stay."""
+        rooms = self._tables[room_type_id].rooms
+        return 1.0 - available_rooms / rooms if rooms else 0.0
+
+    def stay_total(
+        self, room_type_id: int, check_in: date, check_out: date, occupancy: float = 0.0
+    ) -> float:
+        return self._table(room_type_id, check_in, check_out).total(check_in, check_out, occupancy)
+
+    def nightly_rates(self, room_type_id: int, check_in: date, check_out: date) -> List[float]:
+        table = self._table(room_type_id, check_in, check_out)
+        offset = (check_in - table.start).days
+        return table.nightly[offset : offset + (check_out - check_in).days]
+
+
+# ----------------------------------------------------------------------
+# Commits that touch rules, room types or rooms mark the engine stale.
+
+STALE_KEY = "pricing_stale"
+
+
+def _engine_for(session: Session) -> Optional[PricingEngine]:
+    engine = session.info.get("pricing")
+    if engine is None and has_app_context():
+        engine = current_app.extensions.get("pricing")
+    return engine
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    for obj in chain(session.new, session.deleted):
+        if isinstance(obj, (RateRule, RoomType, Room)):
+            session.info[STALE_KEY] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, (RateRule, RoomType)) and session.is_modified(obj, include_collections=False):
+            session.info[STALE_KEY] = True
+            return
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(STALE_KEY, False):
+        engine = _engine_for(session)
+        if engine is not None:
+            engine.mark_stale()
+
+
+def _after_transaction_end(session: Session, transaction: Any) -> None:
+    if transaction.parent is None:
+        session.info.pop(STALE_KEY, None)
+
+
+def _register_listeners() -> None:
+    for name, listener in (
+        ("before_flush", _before_flush),
+        ("after_commit", _after_commit),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def init_app(app: Flask) -> PricingEngine:
+    engine = PricingEngine(
+        app.config["PRICING_HORIZON_DAYS"],
+        app.config["PRICING_REFRESH_INTERVAL"],
+        max_stay_nights=app.config["MAX_STAY_NIGHTS"],
+    )
+    app.extensions["pricing"] = engine
+    _register_listeners()
+    return engine
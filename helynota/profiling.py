@@ -0,0 +1,412 @@
+"""On-demand profiling of API requests.
+
+Off by default (``PROFILING_ENABLED``). When on, ``RequestProfiler`` keeps
+a profile of:
+
+* a random ``PROFILING_SAMPLE_RATE`` fraction of the requests, run under
+  ``cProfile`` (exact call counts, but it slows the request down);
+* any request slower than ``PROFILING_SLOW_SECONDS``. Slowness is only
+  known at the end, so every request is watched by ``StackSampler``: one
+  background thread per process that records the stack of the watched
+  request threads every ``PROFILING_SAMPLE_INTERVAL`` seconds. It costs a
+  few microseconds per sample and nothing inside the request itself; fast
+  requests throw their samples away.
+
+``PROFILING_ENDPOINTS`` limits both to some endpoints (all when None).
+Each kept profile is a JSON file in ``PROFILING_DIR`` with the endpoint,
+status, wall time, the number and time of its SQL statements (primary and
+replica) and the hottest functions. Only the newest
+``PROFILING_MAX_FILES`` are kept. ``flask profiles-report`` aggregates
+them into the hottest functions per endpoint.
+
+These are Flask hooks: in the asynchronous mode (helynota/asgi.py) only
+the endpoints that fall back to Flask are profiled.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from types import FrameType
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional
+
+from flask import Flask, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+# Functions kept per profile, by self and by cumulative time.
+TOP_FUNCTIONS = 60
+
+
+def function_name(filename: str, lineno: int, name: str) -> str:
+    """``name (path:line)``, with the path relative to the project or site-packages."""
+    for prefix in sys.path:
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1 :]
+            break
+    return f"{name} ({filename}:{lineno})" if lineno else name
+
+
+@dataclass
+class FunctionStats:
+    name: str
+    self_seconds: float = 0.0
+    cumulative_seconds: float = 0.0
+    calls: int = 0
+
+
+def _top(functions: Iterable[FunctionStats]) -> List[FunctionStats]:
+    functions = list(functions)
+    keep = {id(f) for f in sorted(functions, key=lambda f: -f.self_seconds)[:TOP_FUNCTIONS]}
+    keep.update(id(f) for f in sorted(functions, key=lambda f: -f.cumulative_seconds)[:TOP_FUNCTIONS])
+    return sorted((f for f in functions if id(f) in keep), key=lambda f: -f.self_seconds)
+
+
+def cprofile_functions(profile: cProfile.Profile) -> List[FunctionStats]:
+    stats = pstats.Stats(profile).stats  # type: ignore[attr-defined]
+    return _top(
+        FunctionStats(function_name(*key), tottime, cumtime, calls)
+        for key, (_, calls, tottime, cumtime, _) in stats.items()
+    )
+
+
+class StackSamples:
+    """Samples of one thread: leaf counts (self) and in-stack counts (cumulative)."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.leaf: Counter = Counter()
+        self.anywhere: Counter = Counter()
+
+    def add(self, frame: FrameType) -> None:
+        self.count += 1
+        code = frame.f_code
+        self.leaf[code] += 1
+        seen = set()
+        while frame is not None:
+            if frame.f_code not in seen:
+                seen.add(frame.f_code)
+                self.anywhere[frame.f_code] += 1
+            frame = frame.f_back  # type: ignore[assignment]
+
+    def functions(self, interval: float) -> List[FunctionStats]:
+        return _top(
+            FunctionStats(
+                function_name(code.co_filename, code.co_firstlineno, code.co_name),
+                self.leaf[code] * interval,
+                samples * interval,
+            )
+            for code, samples in self.anywhere.items()
+        )
+
+
+class StackSampler:
+    """Background thread sampling the stacks of the threads being watched."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self._watched: Dict[int, StackSamples] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, thread_id: int) -> StackSamples:
+        samples = StackSamples()
+        with self._cond:
+            self._watched[thread_id] = samples
+            # Threads do not survive a fork: (re)started on demand.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return samples
+
+    def unwatch(self, thread_id: int) -> None:
+        with self._cond:
+            self._watched.pop(thread_id, None)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._watched:
+                    self._cond.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._cond:
+                for thread_id, samples in self._watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        samples.add(frame)
+            del frames
+
+
+@dataclass
+class Capture:
+    """One request being profiled."""
+
+    started: float
+    trigger: str  # "sample" (cProfile) or "slow" (stack samples)
+    profile: Optional[cProfile.Profile] = None
+    samples: Optional[StackSamples] = None
+    sql_queries: int = 0
+    sql_seconds: float = 0.0
+    _sql_started: List[float] = field(default_factory=list)
+
+
+_current = threading.local()
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: Any, parameters: Any, context: Any, executemany: bool) -> None:
+    capture: Optional[Capture] = getattr(_current, "capture", None)
+    if capture is not None:
+        capture.sql_queries += 1
+        capture._sql_started.append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: Any, parameters: Any, context: Any, executemany: bool) -> None:
+    capture: Optional[Capture] = getattr(_current, "capture", None)
+    if capture is not None and capture._sql_started:
+        capture.sql_seconds += time.perf_counter() - capture._sql_started.pop()
+
+
+def count_queries(engine: Engine) -> None:
+    """Count the statements run on ``engine`` against the current capture."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        directory: Path,
+        sample_rate: float = 0.0,
+        slow_seconds: Optional[float] = 1.0,
+        max_files: int = 200,
+        interval: float = 0.005,
+        endpoints: Optional[Collection[str]] = None,
+        rng: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_files = max_files
+        self.endpoints = set(endpoints) if endpoints is not None else None
+        self.sampler = StackSampler(interval)
+        self.rng = rng
+        self.clock = clock
+        self.sampled = 0
+        self.slow = 0
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def watches(self, endpoint: Optional[str]) -> bool:
+        if endpoint is None or endpoint == "static":
+            return False
+        return self.endpoints is None or endpoint in self.endpoints
+
+    def start(self) -> Optional[Capture]:
+        """Start profiling the current thread's request, if it is picked."""
+        if self.sample_rate and self.rng() < self.sample_rate:
+            capture = Capture(self.clock(), "sample", profile=cProfile.Profile())
+        elif self.slow_seconds is not None:
+            capture = Capture(self.clock(), "slow")
+        else:
+            return None
+        _current.capture = capture
+        if capture.profile is not None:
+            try:
+                capture.profile.enable()
+            except ValueError:
+                # Another profiler is already active on this thread.
+                capture.profile = None
+                capture.trigger = "slow"
+        if capture.profile is None:
+            capture.samples = self.sampler.watch(threading.get_ident())
+        return capture
+
+    def finish(self, capture: Capture, details: Dict[str, Any]) -> Optional[Path]:
+        """Stop ``capture``; write it if it was sampled or slow. Returns the file."""
+        elapsed = self.clock() - capture.started
+        _current.capture = None
+        if capture.profile is not None:
+            capture.profile.disable()
+        else:
+            self.sampler.unwatch(threading.get_ident())
+        if capture.trigger == "slow" and (self.slow_seconds is None or elapsed < self.slow_seconds):
+            return None
+
+        if capture.profile is not None:
+            functions = cprofile_functions(capture.profile)
+            profiler = "cprofile"
+        else:
+            functions = capture.samples.functions(self.sampler.interval) if capture.samples else []
+            profiler = "sampling"
+        record = {
+            **details,
+            "trigger": capture.trigger,
+            "profiler": profiler,
+            "captured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "elapsed_seconds": round(elapsed, 6),
+            "sql_queries": capture.sql_queries,
+            "sql_seconds": round(capture.sql_seconds, 6),
+            "samples": capture.samples.count if capture.samples else None,
+            "functions": [
+                {
+                    "function": f.name,
+                    "self_seconds": round(f.self_seconds, 6),
+                    "cumulative_seconds": round(f.cumulative_seconds, 6),
+                    "calls": f.calls,
+                }
+                for f in functions
+            ],
+        }
+        with self._lock:
+            if capture.trigger == "sample":
+                self.sampled += 1
+            else:
+                self.slow += 1
+        try:
+            path = self._write(record)
+        except OSError:
+            logger.exception("Could not write the request profile")
+            return None
+        with self._lock:
+            self.written += 1
+        return path
+
+    def _write(self, record: Dict[str, Any]) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        endpoint = str(record.get("endpoint") or "unknown").replace(".", "-")
+        path = self.directory / f"{time.time_ns()}-{os.getpid()}-{endpoint}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record), encoding="utf-8")
+        os.replace(tmp, path)
+        # Names start with the time, so the oldest sort first.
+        files = sorted(self.directory.glob("*.json"))
+        for old in files[: max(len(files) - self.max_files, 0)]:
+            old.unlink(missing_ok=True)
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sampled": self.sampled, "slow": self.slow, "written": self.written}
+
+    # Flask hooks
+
+    def before_request(self) -> None:
+        if self.watches(request.endpoint):
+            g.profile_capture = self.start()
+
+    def after_request(self, response: Any) -> Any:
+        if g.get("profile_capture") is not None:
+            g.profile_status = response.status_code
+        return response
+
+    def teardown_request(self, exc: Optional[BaseException]) -> None:
+        capture = g.pop("profile_capture", None)
+        if capture is not None:
+            self.finish(
+                capture,
+                {
+                    "endpoint": request.endpoint,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": g.pop("profile_status", 500),
+                },
+            )
+
+
+@dataclass
+class EndpointReport:
+    endpoint: str
+    captures: int = 0
+    elapsed: List[float] = field(default_factory=list)
+    sql_queries: List[int] = field(default_factory=list)
+    functions: Dict[str, FunctionStats] = field(default_factory=dict)
+
+    @property
+    def median_seconds(self) -> float:
+        return median(self.elapsed) if self.elapsed else 0.0
+
+    def hottest(self, top: int) -> List[FunctionStats]:
+        return sorted(self.functions.values(), key=lambda f: -f.self_seconds)[:top]
+
+
+def aggregate(directory: Path, endpoint: Optional[str] = None) -> Dict[str, EndpointReport]:
+    """Sum the captured profiles in ``directory`` per endpoint."""
+    reports: Dict[str, EndpointReport] = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue  # rotated away or not a profile
+        name = record.get("endpoint") or "unknown"
+        if endpoint and name != endpoint:
+            continue
+        report = reports.setdefault(name, EndpointReport(name))
+        report.captures += 1
+        report.elapsed.append(record["elapsed_seconds"])
+        report.sql_queries.append(record["sql_queries"])
+        for f in record["functions"]:
+            stats = report.functions.setdefault(f["function"], FunctionStats(f["function"]))
+            stats.self_seconds += f["self_seconds"]
+            stats.cumulative_seconds += f["cumulative_seconds"]
+            stats.calls += f["calls"]
+    return reports
+
+
+def report_lines(reports: Dict[str, EndpointReport], top: int = 15) -> List[str]:
+    lines: List[str] = []
+    for report in sorted(reports.values(), key=lambda r: -sum(r.elapsed)):
+        lines.append(
+            f"{report.endpoint}: {report.captures} profiles, median {report.median_seconds * 1000:.1f} ms,"
+            f" max {max(report.elapsed) * 1000:.1f} ms,"
+            f" {sum(report.sql_queries) / report.captures:.1f} SQL statements per request"
+        )
+        lines.append(f"  {'self s':>9} {'cum s':>9}  function")
+        for f in report.hottest(top):
+            lines.append(f"  {f.self_seconds:9.4f} {f.cumulative_seconds:9.4f}  {f.name}")
+        lines.append("")
+    return lines
+
+
+def init_app(app: Flask) -> Optional[RequestProfiler]:
+    """Register the profiling hooks when ``PROFILING_ENABLED`` is set."""
+    if not app.config["PROFILING_ENABLED"]:
+        return None
+    endpoints = app.config["PROFILING_ENDPOINTS"]
+    profiler = RequestProfiler(
+        Path(app.config["PROFILING_DIR"]),
+        app.config["PROFILING_SAMPLE_RATE"],
+        app.config["PROFILING_SLOW_SECONDS"],
+        app.config["PROFILING_MAX_FILES"],
+        app.config["PROFILING_SAMPLE_INTERVAL"],
+        endpoints,
+    )
+    app.extensions["profiler"] = profiler
+    with app.app_context():
+        count_queries(db.engine)
+    router = app.extensions.get("read_replica")
+    if router is not None:
+        count_queries(router.engine)
+    app.before_request(profiler.before_request)
+    app.after_request(profiler.after_request)
+    app.teardown_request(profiler.teardown_request)
+    return profiler
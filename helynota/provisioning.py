@@ -0,0 +1,222 @@
+"""Bulk creation of user accounts (``POST /api/users/bulk``, ``flask import-users``).
+
+``import_users`` takes a list of user records (from JSON or CSV) and:
+
+1. validates every row, including duplicates inside the list itself;
+2. finds the usernames and emails already taken with one ``IN`` query per
+   ``chunk_size`` rows, instead of one lookup per user;
+3. hashes the passwords in a thread pool. The hashing functions behind
+   ``werkzeug.security`` (``hashlib.scrypt``/``pbkdf2_hmac``) release the
+   GIL, so the pool scales with the CPU cores. Rows that already carry a
+   werkzeug ``password_hash`` (a migration from another system) skip
+   hashing;
+4. inserts the accounts ``chunk_size`` at a time, one transaction per
+   chunk. If a chunk collides with accounts created in the meantime, it
+   is rolled back, re-checked and inserted again without them; if that
+   collides too, its rows are reported as failed.
+
+Rows that cannot be created are reported with their (1-based) row number;
+the others are created regardless.
+
+A deliberately slow password hash is the bottleneck: werkzeug's default
+scrypt takes ~150 ms per password and core, so thousands of accounts per
+second are reached with pre-hashed passwords or many cores, not by
+weakening ``BULK_IMPORT_HASH_METHOD``. For the same reason the HTTP
+endpoint takes at most ``BULK_IMPORT_MAX_PLAINTEXT_ROWS`` rows to hash per
+request; larger imports go through ``flask import-users``.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from werkzeug.security import generate_password_hash
+
+from .models import User
+
+FIELDS = ("username", "email", "password", "password_hash")
+HASH_PREFIXES = ("scrypt:", "pbkdf2:")
+USERNAME_MAX = User.__table__.c.username.type.length
+EMAIL_MAX = User.__table__.c.email.type.length
+
+
+@dataclass(frozen=True)
+class RowError:
+    row: int
+    username: str
+    error: str
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    chunks: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "created": self.created,
+            "failed": len(self.errors),
+            "errors": [{"row": e.row, "username": e.username, "error": e.error} for e in self.errors],
+        }
+
+
+@dataclass
+class _Row:
+    row: int
+    username: str
+    email: str
+    password: str
+    password_hash: str
+
+
+def parse_csv(text: str) -> List[Dict[str, str]]:
+    """Records from CSV with a header row naming the columns in ``FIELDS``."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {"username", "email"} <= set(reader.fieldnames):
+        raise ValueError("CSV header must include username and email")
+    return [dict(record) for record in reader]
+
+
+def parse_json(payload: Any) -> List[Dict[str, Any]]:
+    """Records from a JSON list, or an object with a ``users`` list."""
+    records = payload.get("users") if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        raise ValueError("users must be a list")
+    return records
+
+
+def plaintext_passwords(records: Sequence[Any]) -> int:
+    """How many records carry a password to hash (and no ``password_hash``)."""
+    return sum(
+        1
+        for record in records
+        if isinstance(record, dict) and record.get("password") and not record.get("password_hash")
+    )
+
+
+def _validate(records: Sequence[Any]) -> Tuple[List[_Row], List[RowError]]:
+    rows: List[_Row] = []
+    errors: List[RowError] = []
+    usernames: Set[str] = set()
+    emails: Set[str] = set()
+    for number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append(RowError(number, "", "row must be an object"))
+            continue
+        values = {name: str(record.get(name) or "").strip() for name in FIELDS}
+        username, email = values["username"], values["email"]
+        error = None
+        if not username or not email or not (values["password"] or values["password_hash"]):
+            error = "username, email and password are required"
+        elif len(username) > USERNAME_MAX or len(email) > EMAIL_MAX:
+            error = f"username must be at most {USERNAME_MAX} and email {EMAIL_MAX} characters"
+        elif "@" not in email:
+            error = "email is not valid"
+        elif values["password_hash"] and not values["password_hash"].startswith(HASH_PREFIXES):
+            error = "password_hash must be a werkzeug scrypt or pbkdf2 hash"
+        elif username in usernames:
+            error = "duplicate username in the import"
+        elif email in emails:
+            error = "duplicate email in the import"
+        if error:
+            errors.append(RowError(number, username, error))
+            continue
+        usernames.add(username)
+        emails.add(email)
+        rows.append(_Row(number, username, email, values["password"], values["password_hash"]))
+    return rows, errors
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _taken(session: Session, rows: Sequence[_Row]) -> Tuple[Set[str], Set[str]]:
+    """Usernames and emails of ``rows`` that already exist, in one query."""
+    usernames = [row.username for row in rows]
+    emails = [row.email for row in rows]
+    existing = session.execute(
+        select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    ).all()
+    return {username for username, _ in existing}, {email for _, email in existing}
+
+
+def _drop_taken(session: Session, rows: Sequence[_Row], errors: List[RowError]) -> List[_Row]:
+    usernames, emails = _taken(session, rows)
+    free = []
+    for row in rows:
+        if row.username in usernames:
+            errors.append(RowError(row.row, row.username, "username already exists"))
+        elif row.email in emails:
+            errors.append(RowError(row.row, row.username, "email already exists"))
+        else:
+            free.append(row)
+    return free
+
+
+def import_users(
+    session: Session,
+    records: Sequence[Any],
+    chunk_size: int = 1000,
+    hash_workers: Optional[int] = None,
+    hash_method: str = "scrypt",
+) -> ImportResult:
+    result = ImportResult()
+    rows, result.errors = _validate(records)
+
+    free: List[_Row] = []
+    for chunk in _chunks(rows, chunk_size):
+        free.extend(_drop_taken(session, chunk, result.errors))
+    session.rollback()  # end the read transaction before the slow part
+
+    to_hash = [row for row in free if not row.password_hash]
+    if to_hash:
+        with ThreadPoolExecutor(max_workers=hash_workers or os.cpu_count() or 1) as pool:
+            hashes = pool.map(
+                lambda password: generate_password_hash(password, method=hash_method),
+                [row.password for row in to_hash],
+                chunksize=16,
+            )
+            for row, password_hash in zip(to_hash, hashes):
+                row.password_hash = password_hash
+
+    for chunk in _chunks(free, chunk_size):
+        result.chunks += 1
+        try:
+            result.created += _insert(session, chunk)
+        except IntegrityError:
+            # Someone registered one of these meanwhile: drop them and retry once.
+            session.rollback()
+            free_rows = _drop_taken(session, chunk, result.errors)
+            try:
+                result.created += _insert(session, free_rows)
+            except IntegrityError:
+                session.rollback()
+                result.errors.extend(
+                    RowError(row.row, row.username, "account was taken during the import, try again")
+                    for row in free_rows
+                )
+    result.errors.sort(key=lambda e: e.row)
+    return result
+
+
+def _insert(session: Session, rows: Sequence[_Row]) -> int:
+    if rows:
+        session.execute(
+            insert(User),
+            [
+                {"username": row.username, "email": row.email, "password_hash": row.password_hash, "is_active": True}
+                for row in rows
+            ],
+        )
+    session.commit()
+    return len(rows)
@@ -0,0 +1,287 @@
+"""Rate limiting and load shedding for the expensive API endpoints.
+
+Two guards run in front of the protected endpoints (login and room search
+by default, see ``RATELIMIT_LIMITS``):
+
+* ``RateLimiter``: token buckets keyed by client IP and, when the request
+  carries one, by bearer token, so a single client cannot monopolise the
+  workers. Buckets live in a ``MemoryBucketStore`` (per process) or in a
+  ``SQLiteBucketStore`` file shared by every worker of the pre-forking
+  server (``RATELIMIT_STORAGE = "sqlite:///path"``).
+* ``AdmissionController``: answers 503 straight away once the requests in
+  flight in this process, or their recent latency, cross a threshold, so
+  excess load fails fast instead of queueing behind slow requests.
+
+Rejections carry a ``Retry-After`` header. Set ``RATELIMIT_ENABLED`` to
+``False`` to turn both guards off.
+"""
+from __future__ import annotations
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from flask import Flask, g, jsonify, request
+
+DEFAULT_LIMITS = {
+    "api.login": "10/minute",
+    "api.search_rooms": "20/second",
+}
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float  # tokens added per second
+    burst: int  # bucket capacity
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """Parse ``"<requests>/<second|minute|hour>"``; the burst is ``<requests>``."""
+        try:
+            amount, period = value.split("/")
+            return cls(int(amount) / PERIODS[period.strip()], int(amount))
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid rate limit {value!r}, expected e.g. '10/minute'") from None
+
+
+def _take(tokens: float, elapsed: float, limit: RateLimit) -> Tuple[float, float]:
+    """Refill for ``elapsed`` seconds and take one token; returns (tokens, retry_after)."""
+    tokens = min(float(limit.burst), tokens + max(elapsed, 0.0) * limit.rate)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / limit.rate
+
+
+class MemoryBucketStore:
+    """Buckets in a dict; each process of the server keeps its own."""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(limit.burst), now))
+            tokens, retry_after = _take(tokens, now - updated, limit)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return retry_after
+
+    def _prune(self, now: float) -> None:
+        # Drop the least recently used half; a dropped bucket restarts full,
+        # which only errs in the client's favour.
+        by_age = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in by_age[: len(by_age) // 2]:
+            del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, shared by every process that opens it."""
+
+    # Buckets idle this long are full again and can be deleted.
+    IDLE_SECONDS = 3600
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after fork().
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def take(self, key: str, limit: RateLimit, now: float) -> float:
+        connection = self._connection()
+        # IMMEDIATE takes the write lock up front, so the read-modify-write
+        # below is atomic across processes.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (float(limit.burst), now)
+            tokens, retry_after = _take(tokens, now - updated, limit)
+            connection.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                connection.execute(
+                    "DELETE FROM rate_buckets WHERE updated < ?", (now - self.IDLE_SECONDS,)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+def make_store(storage: str):
+    if storage == "memory":
+        return MemoryBucketStore()
+    if storage.startswith("sqlite:///"):
+        return SQLiteBucketStore(storage[len("sqlite:///") :])
+    raise ValueError(f"Unsupported RATELIMIT_STORAGE {storage!r}")
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        store,
+        limits: Mapping[str, RateLimit],
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.store = store
+        self.limits = dict(limits)
+        self.clock = clock
+
+    def check(self, endpoint: str, client_ip: str, auth_header: str = "") -> float:
+        """Seconds the client must wait before calling ``endpoint``; 0 if allowed."""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return 0.0
+        keys = [f"{endpoint}:ip:{client_ip}"]
+        if auth_header.startswith("Bearer "):
+            keys.append(f"{endpoint}:token:{auth_header.split(' ', 1)[1].strip()}")
+        now = self.clock()
+        return max(self.store.take(key, limit, now) for key in keys)
+
+
+class AdmissionController:
+    """Caps the protected requests in flight in this process.
+
+    Requests are refused once ``max_in_flight`` are running. When the
+    smoothed latency exceeds ``latency_target`` the cap is halved until it
+    recovers; a single request is always admitted so the latency estimate
+    keeps updating.
+    """
+
+    def __init__(
+        self, max_in_flight: int = 32, latency_target: float = 0.5, smoothing: float = 0.2
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.latency_target = latency_target
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency = 0.0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            limit = self.max_in_flight
+            if self.latency > self.latency_target:
+                limit = max(1, limit // 2)
+            if self.in_flight >= limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, elapsed: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.latency += self.smoothing * (elapsed - self.latency)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "latency_ms": round(self.latency * 1000, 1),
+                "shed": self.shed,
+            }
+
+
+@dataclass(frozen=True)
+class Rejection:
+    status: int
+    error: str
+    retry_after: int
+
+
+class RequestGuard:
+    """Rate limiter plus admission control for one app, independent of the framework."""
+
+    def __init__(self, limiter: RateLimiter, admission: AdmissionController) -> None:
+        self.limiter = limiter
+        self.admission = admission
+
+    def protects(self, endpoint: Optional[str]) -> bool:
+        return endpoint in self.limiter.limits
+
+    def admit(self, endpoint: str, client_ip: str, auth_header: str = "") -> Optional[Rejection]:
+        """Return a rejection, or ``None`` after reserving an admission slot."""
+        retry_after = self.limiter.check(endpoint, client_ip, auth_header)
+        if retry_after:
+            return Rejection(HTTPStatus.TOO_MANY_REQUESTS, "Too many requests", math.ceil(retry_after))
+        if not self.admission.try_acquire():
+            return Rejection(HTTPStatus.SERVICE_UNAVAILABLE, "Server overloaded, retry later", 1)
+        return None
+
+    def done(self, elapsed: float) -> None:
+        self.admission.release(elapsed)
+
+    # Flask hooks
+
+    def before_request(self):
+        if not self.protects(request.endpoint):
+            return None
+        rejection = self.admit(
+            request.endpoint, request.remote_addr or "", request.headers.get("Authorization", "")
+        )
+        if rejection:
+            response = jsonify({"error": rejection.error})
+            response.status_code = rejection.status
+            response.headers["Retry-After"] = str(rejection.retry_after)
+            return response
+        g.admitted_at = time.perf_counter()
+        return None
+
+    def teardown_request(self, exc: Optional[BaseException]) -> None:
+        admitted_at = g.pop("admitted_at", None)
+        if admitted_at is not None:
+            self.done(time.perf_counter() - admitted_at)
+
+
+def init_app(app: Flask) -> Optional[RequestGuard]:
+    """Build the guard from the app config and register it on ``app``."""
+    if not app.config["RATELIMIT_ENABLED"]:
+        return None
+    limits = {
+        endpoint: RateLimit.parse(value) for endpoint, value in app.config["RATELIMIT_LIMITS"].items()
+    }
+    guard = RequestGuard(
+        RateLimiter(make_store(app.config["RATELIMIT_STORAGE"]), limits),
+        AdmissionController(
+            app.config["ADMISSION_MAX_IN_FLIGHT"], app.config["ADMISSION_LATENCY_TARGET"]
+        ),
+    )
+    app.extensions["request_guard"] = guard
+    app.before_request(guard.before_request)
+    app.teardown_request(guard.teardown_request)
+    return guard
@@ -0,0 +1,154 @@
+"""Read/write splitting between the primary database and a read replica.
+
+With ``READ_REPLICA_URI`` set, the read-only endpoints (room types, room
+search, the reservation list) send their queries to a replica engine;
+every write, and every query made before the handler runs (authentication
+included), stays on the primary. Locally the replica can be a second,
+read-only connection to the same SQLite file::
+
+    READ_REPLICA_URI = "sqlite:///file:/path/to/hotel_reservas.db?mode=ro&uri=true"
+
+(an absolute path: unlike ``SQLALCHEMY_DATABASE_URI``, it is not resolved
+against the instance folder).
+
+The primary is then switched to WAL mode, so readers never wait for the
+writer, and replica connections are opened with ``PRAGMA query_only``.
+
+A replica can lag behind the primary. For ``READ_REPLICA_STICKY_SECONDS``
+after a successful write, a client (its bearer token and its IP) reads
+from the primary, so it sees its own changes. The write times are kept per
+process, so with several workers this covers the requests that land on
+the worker that handled the write. Search results read from the replica
+are never stored in the search cache: its invalidation follows commits on
+the primary, which a lagging replica may not have yet.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from flask import Flask, current_app, request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from .database import db
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def client_keys(client_ip: str, auth_header: str = "") -> Tuple[str, ...]:
+    """Stickiness keys of a request, like the rate limiter's: IP and bearer token."""
+    keys = [f"ip:{client_ip}"]
+    if auth_header.startswith("Bearer "):
+        keys.append(f"token:{auth_header.split(' ', 1)[1].strip()}")
+    return tuple(keys)
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        engine: Engine,
+        sticky_seconds: float = 5.0,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.engine = engine
+        self.sticky_seconds = sticky_seconds
+        self.max_keys = max_keys
+        self.clock = clock
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self._written: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, keys: Iterable[str]) -> None:
+        now = self.clock()
+        with self._lock:
+            for key in keys:
+                self._written[key] = now
+            if len(self._written) > self.max_keys:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.sticky_seconds
+        self._written = {key: at for key, at in self._written.items() if at > cutoff}
+
+    def use_replica(self, keys: Iterable[str]) -> bool:
+        """False while any of ``keys`` wrote recently; counts the decision."""
+        cutoff = self.clock() - self.sticky_seconds
+        with self._lock:
+            sticky = any(self._written.get(key, cutoff) > cutoff for key in keys)
+            if sticky:
+                self.primary_reads += 1
+            else:
+                self.replica_reads += 1
+        return not sticky
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "replica_reads": self.replica_reads,
+                "primary_reads": self.primary_reads,
+                "sticky_clients": len(self._written),
+            }
+
+
+def configure_sqlite(primary: Engine, replica: Engine) -> None:
+    """WAL on a SQLite primary, ``query_only`` on a SQLite replica."""
+    if primary.dialect.name == "sqlite" and primary.url.database not in (None, "", ":memory:"):
+        event.listen(primary, "connect", _enable_wal)
+    if replica.dialect.name == "sqlite":
+        event.listen(replica, "connect", _query_only)
+
+
+def _enable_wal(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+def _query_only(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def reads_from_replica(view: Callable) -> Callable:
+    """Route the view's queries to the replica unless the client wrote recently.
+
+    Goes below ``login_required``, so the token lookup reads the primary.
+    """
+
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        router: Optional[ReplicaRouter] = current_app.extensions.get("read_replica")
+        if router is not None and router.use_replica(
+            client_keys(request.remote_addr or "", request.headers.get("Authorization", ""))
+        ):
+            db.session.info["replica"] = router.engine
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_app(app: Flask) -> Optional[ReplicaRouter]:
+    """Create the replica engine for ``READ_REPLICA_URI``; None when it is not set."""
+    if not app.config["READ_REPLICA_URI"]:
+        return None
+    engine = create_engine(app.config["READ_REPLICA_URI"], **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    router = ReplicaRouter(engine, app.config["READ_REPLICA_STICKY_SECONDS"])
+    app.extensions["read_replica"] = router
+    with app.app_context():
+        configure_sqlite(db.engine, engine)
+
+    @app.after_request
+    def remember_writes(response: Any) -> Any:
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            router.mark_write(
+                client_keys(request.remote_addr or "", request.headers.get("Authorization", ""))
+            )
+        return response
+
+    return router
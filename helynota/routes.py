@@ -1,32 +1,56 @@
 from __future__ import annotations
 
-import time
-from datetime import date, datetime
 from functools import wraps
 from http import HTTPStatus
-from typing import Any, Callable, Dict, Optional
-
-from flask import Blueprint, jsonify, request
-
-from .database import db, utcnow
-from .models import (
-    Payment,
-    Reservation,
-    Room,
-    RoomType,
-    SessionToken,
-    User,
-    active_token,
+from typing import Any, Callable, Optional
+
+from flask import Blueprint, current_app, jsonify, request
+
+from .booking import (
+    ApiError,
+    archived_reservations_stmt,
+    available_count_stmt,
+    available_counts_stmt,
+    available_rooms_stmt,
+    check_payable,
+    history_payloads,
+    login_payload,
+    new_reservation,
+    parse_booking,
+    parse_credentials,
+    parse_payment,
+    parse_registration,
+    parse_search,
+    payable_reservation_stmt,
+    payment_payload,
+    registered_payload,
+    reservation_created_payload,
+    reservation_event,
+    room_type_payload,
+    room_types_stmt,
+    search_payload,
+    search_results,
+    search_rooms_stmt,
+    settle_payment,
+    stats_payload,
+    user_by_name_stmt,
+    user_exists_stmt,
+    user_payload,
+    user_reservations_stmt,
 )
+from .database import db
+from .json_provider import STREAM_BATCH, stream_list
+from .models import RoomType, SessionToken, User, active_token
+from .provisioning import import_users, parse_csv, parse_json, plaintext_passwords
+from .replicas import reads_from_replica
+from .search_cache import search_key
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
 
-def parse_date(value: str, field_name: str) -> date:
-    try:
-        return datetime.strptime(value, "%Y-%m-%d").date()
-    except (ValueError, TypeError):
-        raise ValueError(f"{field_name} must follow YYYY-MM-DD format")
+@api_bp.errorhandler(ApiError)
+def api_error(exc: ApiError) -> Any:
+    return jsonify(exc.payload()), exc.status
 
 
 def get_current_user() -> Optional[User]:
@@ -57,15 +81,8 @@ def healthcheck() -> Any:
 
 @api_bp.post("/auth/register")
 def register() -> Any:
-    payload = request.get_json(force=True, silent=True) or {}
-    username = (payload.get("username") or "").strip()
-    email = (payload.get("email") or "").strip()
-    password = (payload.get("password") or "").strip()
-
-    if not username or not email or not password:
-        return jsonify({"error": "username, email and password are required"}), HTTPStatus.BAD_REQUEST
-
-    if User.query.filter((User.username == username) | (User.email == email)).first():
+    username, email, password = parse_registration(request.get_json(force=True, silent=True) or {})
+    if db.session.scalar(user_exists_stmt(username, email)):
         return jsonify({"error": "User already exists"}), HTTPStatus.CONFLICT
 
     user = User(username=username, email=email)
@@ -73,20 +90,45 @@ def register() -> Any:
     token = user.refresh_token()
     db.session.add(user)
     db.session.commit()
+    return jsonify(registered_payload(token)), HTTPStatus.CREATED
 
-    return (
-        jsonify({"message": "User registered successfully", "token": token}),
-        HTTPStatus.CREATED,
+
+@api_bp.post("/users/bulk")
+@login_required
+def bulk_create_users() -> Any:
+    """Create many accounts from a JSON list or a ``text/csv`` body; see provisioning.py."""
+    if request.current_user.username not in current_app.config["PROVISIONING_ADMINS"]:  # type: ignore[attr-defined]
+        return jsonify({"error": "Not allowed"}), HTTPStatus.FORBIDDEN
+    try:
+        if request.mimetype == "text/csv":
+            records = parse_csv(request.get_data(as_text=True))
+        else:
+            records = parse_json(request.get_json(force=True, silent=True))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), HTTPStatus.BAD_REQUEST
+    max_rows = current_app.config["BULK_IMPORT_MAX_ROWS"]
+    if not 1 <= len(records) <= max_rows:
+        return jsonify({"error": f"between 1 and {max_rows} users per request"}), HTTPStatus.BAD_REQUEST
+    max_plaintext = current_app.config["BULK_IMPORT_MAX_PLAINTEXT_ROWS"]
+    if plaintext_passwords(records) > max_plaintext:
+        error = f"at most {max_plaintext} users with a plaintext password per request; use flask import-users"
+        return jsonify({"error": error}), HTTPStatus.BAD_REQUEST
+
+    result = import_users(
+        db.session,
+        records,
+        current_app.config["BULK_IMPORT_CHUNK_SIZE"],
+        current_app.config["BULK_IMPORT_HASH_WORKERS"],
+        current_app.config["BULK_IMPORT_HASH_METHOD"],
     )
+    status = HTTPStatus.CREATED if result.created else HTTPStatus.UNPROCESSABLE_ENTITY
+    return jsonify(result.to_dict()), status
 
 
 @api_bp.post("/auth/login")
 def login() -> Any:
-    payload = request.get_json(force=True, silent=True) or {}
-    username = (payload.get("username") or "").strip()
-    password = (payload.get("password") or "").strip()
-
-    user = User.query.filter_by(username=username).first()
+    username, password = parse_credentials(request.get_json(force=True, silent=True) or {})
+    user = db.session.scalar(user_by_name_stmt(username))
     if not user or not user.check_password(password):
         return jsonify({"error": "Invalid credentials"}), HTTPStatus.UNAUTHORIZED
 
@@ -94,220 +136,138 @@ def login() -> Any:
     db.session.add(session_token)
     token = user.refresh_token()
     db.session.commit()
-    return jsonify({"message": "Login successful", "token": token, "session_token": session_token.token})
+    return jsonify(login_payload(token, session_token))
+
+
+@api_bp.get("/stats")
+def stats() -> Any:
+    return jsonify(stats_payload(current_app.extensions))
 
 
 @api_bp.get("/room-types")
+@reads_from_replica
 def list_room_types() -> Any:
-    room_types = RoomType.query.order_by(RoomType.name).all()
-    return jsonify(
-        [
-            {
-                "id": rt.id,
-                "name": rt.name,
-                "capacity": rt.capacity,
-                "base_price": rt.base_price,
-                "description": rt.description,
-            }
-            for rt in room_types
-        ]
-    )
+    return jsonify([room_type_payload(rt) for rt in db.session.scalars(room_types_stmt())])
 
 
-@api_bp.get("/rooms/search")
-def search_rooms() -> Any:
-    check_in_raw = request.args.get("check_in")
-    check_out_raw = request.args.get("check_out")
-    room_type_name = request.args.get("room_type")
+@api_bp.get("/forecast")
+@reads_from_replica
+def occupancy_forecast() -> Any:
+    # NumPy is loaded on the first forecast, not when the app starts.
+    from .forecast import forecast_payload, forecaster_for
 
-    if not check_in_raw or not check_out_raw:
-        return jsonify({"error": "check_in and check_out are required"}), HTTPStatus.BAD_REQUEST
+    max_days = current_app.config["FORECAST_MAX_DAYS"]
+    try:
+        days = int(request.args.get("days", 30))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= max_days:
+        return jsonify({"error": f"days must be between 1 and {max_days}"}), HTTPStatus.BAD_REQUEST
 
     try:
-        check_in = parse_date(check_in_raw, "check_in")
-        check_out = parse_date(check_out_raw, "check_out")
+        forecast = forecaster_for(current_app).forecast(
+            db.session, days, request.args.get("method", "ets"), request.args.get("room_type")
+        )
     except ValueError as exc:
         return jsonify({"error": str(exc)}), HTTPStatus.BAD_REQUEST
+    return jsonify(forecast_payload(forecast))
 
-    if check_in >= check_out:
-        return jsonify({"error": "check_out must be after check_in"}), HTTPStatus.BAD_REQUEST
-
-    query = Room.query.join(RoomType)
-    if room_type_name:
-        query = query.filter(RoomType.name.ilike(f"%{room_type_name}%"))
-
-    rooms = query.all()
-    available = []
-    for room in rooms:
-        if is_room_available(room, check_in, check_out):
-            available.append(
-                {
-                    "room_id": room.id,
-                    "room_number": room.room_number,
-                    "room_type": room.room_type.name,
-                    "capacity": room.room_type.capacity,
-                    "nightly_rate": room.room_type.base_price,
-                }
-            )
-
-    return jsonify({"available_rooms": available, "count": len(available)})
-
-
-def is_room_available(room: Room, check_in: date, check_out: date) -> bool:
-    overlapping = (
-        Reservation.query.filter_by(room_id=room.id)
-        .filter(Reservation.status.in_(["pending", "confirmed"]))
-        .filter(Reservation.check_in < check_out, Reservation.check_out > check_in)
-        .count()
-    )
-    return overlapping == 0
+
+@api_bp.get("/rooms/search")
+@reads_from_replica
+def search_rooms() -> Any:
+    check_in, check_out, filters = parse_search(request.args, current_app.config)
+    cache = current_app.extensions.get("search_cache")
+    if cache is not None:
+        key = search_key(check_in, check_out, filters)
+        available, generation = cache.lookup(key)
+        if available is not None:
+            return jsonify(search_payload(available))
+
+    rows = db.session.execute(search_rooms_stmt(check_in, check_out, filters)).all()
+    pricing = current_app.extensions["pricing"]
+    room_type_ids = {room_type.id for _, room_type in rows}
+    pricing.refresh(db.session, room_type_ids)
+    free = None
+    if filters.splits_room_types and any(pricing.has_occupancy_rules(i) for i in room_type_ids):
+        free = dict(db.session.execute(available_counts_stmt(check_in, check_out, room_type_ids)).all())
+    available = search_results(rows, check_in, check_out, pricing, free)
+    # A lagging replica may not have the changes the cache was invalidated for.
+    if cache is not None and "replica" not in db.session.info:
+        cache.store(key, available, generation)
+    return jsonify(search_payload(available))
 
 
 @api_bp.post("/reservations")
 @login_required
 def create_reservation() -> Any:
-    payload = request.get_json(force=True, silent=True) or {}
-
-    check_in_raw = payload.get("check_in")
-    check_out_raw = payload.get("check_out")
-    room_type_id = payload.get("room_type_id")
-
-    if not all([check_in_raw, check_out_raw, room_type_id]):
-        return (
-            jsonify({"error": "room_type_id, check_in and check_out are required"}),
-            HTTPStatus.BAD_REQUEST,
-        )
-
-    try:
-        check_in = parse_date(check_in_raw, "check_in")
-        check_out = parse_date(check_out_raw, "check_out")
-    except ValueError as exc:
-        return jsonify({"error": str(exc)}), HTTPStatus.BAD_REQUEST
-
-    if check_in >= check_out:
-        return jsonify({"error": "check_out must be after check_in"}), HTTPStatus.BAD_REQUEST
-
-    try:
-        room_type_id = int(room_type_id)
-    except (TypeError, ValueError):
-        return jsonify({"error": "room_type_id must be an integer"}), HTTPStatus.BAD_REQUEST
-
+    room_type_id, check_in, check_out = parse_booking(
+        request.get_json(force=True, silent=True) or {}, current_app.config
+    )
     room_type = db.session.get(RoomType, room_type_id)
     if not room_type:
         return jsonify({"error": "Room type not found"}), HTTPStatus.NOT_FOUND
 
-    room = Room.query.filter_by(room_type_id=room_type.id, status="available").all()
-    available_room = next(
-        (r for r in room if is_room_available(r, check_in, check_out)),
-        None,
-    )
+    available_room = db.session.scalars(
+        available_rooms_stmt(check_in, check_out, room_type_id=room_type.id, only_bookable=True)
+        .limit(1)
+    ).first()
     if not available_room:
         return jsonify({"error": "No rooms available for the selected criteria"}), HTTPStatus.CONFLICT
 
-    nights = (check_out - check_in).days
-    total_price = nights * room_type.base_price
-
-    reservation = Reservation(
-        user=request.current_user,  # type: ignore[attr-defined]
-        room=available_room,
-        check_in=check_in,
-        check_out=check_out,
-        status="pending",
-        total_price=total_price,
+    pricing = current_app.extensions["pricing"]
+    pricing.refresh(db.session, [room_type.id])
+    occupancy = 0.0
+    if pricing.has_occupancy_rules(room_type.id):
+        free = db.session.scalar(available_count_stmt(check_in, check_out, room_type.id))
+        occupancy = pricing.occupancy(room_type.id, free)
+
+    holds = current_app.extensions["holds"]
+    reservation = new_reservation(
+        request.current_user.id,  # type: ignore[attr-defined]
+        available_room,
+        check_in,
+        check_out,
+        pricing.stay_total(room_type.id, check_in, check_out, occupancy),
+        holds.hold_seconds,
     )
     db.session.add(reservation)
+    db.session.flush()
+    db.session.add(reservation_event("reservation.created", reservation))
     db.session.commit()
-
-    return (
-        jsonify(
-            {
-                "message": "Reservation created",
-                "reservation_id": reservation.id,
-                "status": reservation.status,
-                "total_price": reservation.total_price,
-            }
-        ),
-        HTTPStatus.CREATED,
-    )
+    holds.schedule(reservation.id, reservation.hold_expires_at)
+    return jsonify(reservation_created_payload(reservation)), HTTPStatus.CREATED
 
 
 @api_bp.get("/reservations")
 @login_required
+@reads_from_replica
 def list_reservations() -> Any:
     user: User = request.current_user  # type: ignore[attr-defined]
-    reservations = (
-        Reservation.query.filter_by(user=user)
-        .order_by(Reservation.created_at.desc())
-        .all()
-    )
-    return jsonify(
-        [
-            {
-                "id": r.id,
-                "room_number": r.room.room_number,
-                "room_type": r.room.room_type.name,
-                "status": r.status,
-                "check_in": r.check_in.isoformat(),
-                "check_out": r.check_out.isoformat(),
-                "total_price": r.total_price,
-                "payment_status": r.payment.status if r.payment else "unpaid",
-            }
-            for r in reservations
-        ]
+    # Rows are loaded and encoded batch by batch while the response is sent,
+    # archived reservations (helynota/archive.py) included.
+    hot = db.session.scalars(user_reservations_stmt(user.id).execution_options(yield_per=STREAM_BATCH))
+    archived = db.session.scalars(
+        archived_reservations_stmt(user.id).execution_options(yield_per=STREAM_BATCH)
     )
+    return stream_list(history_payloads(hot, archived))
 
 
 @api_bp.post("/payments/simulate")
 @login_required
 def simulate_payment() -> Any:
-    payload = request.get_json(force=True, silent=True) or {}
-    reservation_id = payload.get("reservation_id")
-    method = (payload.get("method") or "credit_card").strip()
-    simulate_failure = payload.get("force_failure", False)
-
-    if not reservation_id:
-        return jsonify({"error": "reservation_id is required"}), HTTPStatus.BAD_REQUEST
-
-    reservation = db.session.get(Reservation, reservation_id)
-    if not reservation or reservation.user != request.current_user:  # type: ignore[attr-defined]
-        return jsonify({"error": "Reservation not found"}), HTTPStatus.NOT_FOUND
-
-    if reservation.payment:
-        return jsonify({"error": "Reservation already paid"}), HTTPStatus.CONFLICT
-
-    now_utc = utcnow()
-    reference_suffix = int(time.time())
-    payment = Payment(
-        reservation=reservation,
-        amount=reservation.total_price,
-        method=method,
-        status="failed" if simulate_failure else "success",
-        transaction_reference=f"SIM-{reservation.id}-{reference_suffix}",
-        processed_at=now_utc,
+    reservation_id, method, force_failure = parse_payment(request.get_json(force=True, silent=True) or {})
+    reservation = check_payable(
+        db.session.scalar(payable_reservation_stmt(reservation_id)),
+        request.current_user.id,  # type: ignore[attr-defined]
     )
-    reservation.status = "cancelled" if simulate_failure else "confirmed"
-    db.session.add(payment)
+    payment, event = settle_payment(reservation, method, force_failure)
+    db.session.add_all([payment, event])
     db.session.commit()
-
-    return jsonify(
-        {
-            "message": "Payment processed",
-            "reservation_status": reservation.status,
-            "payment_status": payment.status,
-            "transaction_reference": payment.transaction_reference,
-        }
-    )
+    return jsonify(payment_payload(reservation, payment))
 
 
 @api_bp.get("/users/me")
 @login_required
 def current_user() -> Any:
-    user: User = request.current_user  # type: ignore[attr-defined]
-    return jsonify(
-        {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "token": user.api_token,
-        }
-    )
+    return jsonify(user_payload(request.current_user))  # type: ignore[attr-defined]
@@ -0,0 +1,199 @@
+"""Short-lived cache of room search results.
+
+Entries are keyed by ``(check_in, check_out, search filters)`` and expire
+after ``SEARCH_CACHE_TTL`` seconds, but the TTL is only a backstop: every
+committed change to a reservation (new booking, status change such as a
+confirmed or cancelled payment, new dates, deletion) evicts exactly the
+cached ranges that overlap the old and new stay, and catalog or price
+changes (rooms, room types, rate rules) clear the cache. A result computed
+while a change was committing is never stored, see :meth:`SearchCache.lookup`.
+
+Invalidation only sees writes made through this process's sessions, so the
+cache is for single-process serving; the pre-forking server turns it off.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .booking import SearchFilters
+from .models import RateRule, Reservation, Room, RoomType
+
+SearchKey = Tuple[date, date, SearchFilters]
+Stay = Tuple[date, date]
+
+# Sentinel stay meaning "everything changed".
+ALL = None
+
+
+def search_key(check_in: date, check_out: date, filters: SearchFilters = SearchFilters()) -> SearchKey:
+    return check_in, check_out, filters
+
+
+class SearchCache:
+    def __init__(
+        self, ttl: float = 30.0, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[SearchKey, Tuple[float, Any]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key: SearchKey) -> Tuple[Optional[Any], int]:
+        """Return ``(value or None, generation)``.
+
+        Pass the generation back to :meth:`store`: if any invalidation ran in
+        between, the freshly computed value may predate it and is dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], self._generation
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None, self._generation
+
+    def store(self, key: SearchKey, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, stays: Iterable[Optional[Stay]]) -> int:
+        """Evict entries overlapping any of ``stays`` (``ALL`` clears everything)."""
+        stays = list(stays)
+        if not stays:
+            return 0
+        with self._lock:
+            self._generation += 1
+            if ALL in stays:
+                stale: List[SearchKey] = list(self._entries)
+            else:
+                stale = [
+                    key
+                    for key in self._entries
+                    if any(key[0] < stay_out and key[1] > stay_in for stay_in, stay_out in stays)
+                ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# ----------------------------------------------------------------------
+# Invalidation hooks. Changed stays are collected before each flush (while
+# attribute history is still available) and only evicted once the
+# transaction commits; otherwise they are dropped with it.
+
+PENDING_KEY = "search_cache_pending"
+
+
+def _cache_for(session: Session) -> Optional[SearchCache]:
+    cache = session.info.get("search_cache")
+    if cache is None and has_app_context():
+        cache = current_app.extensions.get("search_cache")
+    return cache
+
+
+def _changed_stays(obj: Any, deleted: bool = False) -> List[Optional[Stay]]:
+    if isinstance(obj, (Room, RoomType, RateRule)):
+        # Catalog and price changes can alter any result.
+        return [ALL]
+    if not isinstance(obj, Reservation):
+        return []
+    state = inspect(obj)
+    stays: List[Optional[Stay]] = [(obj.check_in, obj.check_out)]
+    if not deleted and state.persistent:
+        check_in, check_out, status = (
+            state.attrs[name].history for name in ("check_in", "check_out", "status")
+        )
+        if not (check_in.has_changes() or check_out.has_changes() or status.has_changes()):
+            return []
+        old_in = check_in.deleted[0] if check_in.deleted else obj.check_in
+        old_out = check_out.deleted[0] if check_out.deleted else obj.check_out
+        if (old_in, old_out) != (obj.check_in, obj.check_out):
+            stays.append((old_in, old_out))
+    return stays
+
+
+def _before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    if _cache_for(session) is None:
+        return
+    stays = session.info.setdefault(PENDING_KEY, [])
+    for obj in session.new:
+        stays.extend(_changed_stays(obj))
+    for obj in session.dirty:
+        # A booking appends to room.reservations; only column changes to the
+        # catalog matter.
+        if isinstance(obj, (Room, RoomType, RateRule)) and not session.is_modified(
+            obj, include_collections=False
+        ):
+            continue
+        stays.extend(_changed_stays(obj))
+    for obj in session.deleted:
+        stays.extend(_changed_stays(obj, deleted=True))
+
+
+def _after_commit(session: Session) -> None:
+    stays = session.info.pop(PENDING_KEY, None)
+    cache = _cache_for(session)
+    if stays and cache is not None:
+        cache.invalidate(stays)
+
+
+def _after_transaction_end(session: Session, transaction: Any) -> None:
+    # Runs after _after_commit; anything left belongs to a rolled back or
+    # closed transaction.
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def _register_listeners() -> None:
+    # Listening on the base class covers Flask-SQLAlchemy's sessions and the
+    # sync sessions behind the ASGI app's AsyncSession.
+    for name, listener in (
+        ("before_flush", _before_flush),
+        ("after_commit", _after_commit),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def init_app(app: Flask) -> Optional[SearchCache]:
+    """Create the app's search cache from its config and hook invalidation."""
+    if not app.config["SEARCH_CACHE_ENABLED"]:
+        return None
+    cache = SearchCache(app.config["SEARCH_CACHE_TTL"], app.config["SEARCH_CACHE_MAX_ENTRIES"])
+    app.extensions["search_cache"] = cache
+    _register_listeners()
+    return cache
@@ -0,0 +1,273 @@
+"""Pre-forking production server.
+
+The master builds the app once, warms the catalog and the caches that are
+filled lazily (mappers, compiled SQL, Jinja templates), freezes the heap and
+then forks the workers, so they share those pages copy-on-write instead of
+each warming up on its own. Every worker serves the inherited listening
+socket with a fixed pool of threads.
+
+Signals sent to the master:
+
+* ``SIGHUP``: graceful reload. A freshly built and warmed app is forked
+  into a new generation of workers; the old ones stop accepting, finish
+  their in-flight requests and exit. Config and catalog changes are picked
+  up; code changes need a full restart.
+* ``SIGTERM`` / ``SIGINT``: graceful shutdown.
+
+Run with ``python -m helynota.server --workers 4 --threads 8``.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from flask import Flask
+from sqlalchemy import select
+from sqlalchemy.orm import configure_mappers
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from . import create_app
+from .booking import (
+    SearchFilters,
+    available_rooms_stmt,
+    search_rooms_stmt,
+    session_token_stmt,
+    user_reservations_stmt,
+)
+from .database import db
+from .models import RoomType
+
+logger = logging.getLogger(__name__)
+
+# Seconds old workers get to finish in-flight requests before SIGKILL.
+GRACEFUL_TIMEOUT = 30.0
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # One request per connection: with a bounded thread pool, idle keep-alive
+    # connections would otherwise hold threads that other clients need.
+    protocol_version = "HTTP/1.0"
+    access_log = False
+
+    def log_request(self, code: Any = "-", size: Any = "-") -> None:
+        if self.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles connections on ``threads`` pooled threads."""
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app: Flask, threads: int, fd: Optional[int] = None) -> None:
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="helynota-worker")
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.pool.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        if hasattr(self, "pool"):
+            self.pool.shutdown(wait=True)
+        super().server_close()
+
+
+def warm_up(app: Flask) -> None:
+    """Fill the lazily built caches before forking and release DB connections."""
+    with app.app_context():
+        configure_mappers()
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+
+        # Running the hot statements once compiles them into the engine's
+        # SQL cache, which the workers then inherit.
+        check_in = date.today()
+        check_out = check_in + timedelta(days=1)
+        db.session.scalars(select(RoomType).order_by(RoomType.name)).all()
+        db.session.execute(search_rooms_stmt(check_in, check_out, SearchFilters())).all()
+        db.session.execute(
+            available_rooms_stmt(check_in, check_out, room_type_id=0, only_bookable=True).limit(1)
+        ).all()
+        db.session.execute(session_token_stmt("")).all()
+        db.session.execute(user_reservations_stmt(0)).all()
+        db.session.remove()
+
+        # Connections must not cross fork(): every worker opens its own.
+        db.engine.dispose()
+        router = app.extensions.get("read_replica")
+        if router is not None:
+            router.engine.dispose()
+
+    # Keep the warmed objects out of the collector so its passes do not
+    # touch (and un-share) their pages in the workers.
+    gc.freeze()
+
+
+def _run_worker(app: Flask, listener: socket.socket, threads: int) -> None:
+    """Worker process body; returns when the master asks it to stop."""
+    server = PooledWSGIServer(*listener.getsockname()[:2], app, threads, fd=listener.fileno())
+
+    def stop(signum: int, frame: Any) -> None:
+        # shutdown() waits for serve_forever(), which runs in this thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    server.serve_forever()
+
+
+class Arbiter:
+    """Master process: forks, supervises and reloads the workers."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        workers: int = 2,
+        threads: int = 8,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.workers = workers
+        self.threads = threads
+        self.config = config
+        self.listener = socket.create_server((host, port), backlog=2048)
+        self.app: Optional[Flask] = None
+        self.children: Dict[int, int] = {}  # pid -> generation
+        self.generation = 0
+        self._reload = False
+        self._stop = False
+
+    @property
+    def address(self) -> tuple:
+        return self.listener.getsockname()[:2]
+
+    def _load(self) -> None:
+        # The search cache is invalidated only by its own process's writes,
+        # which would leave the other workers serving stale results.
+        app = create_app({**(self.config or {}), "SEARCH_CACHE_ENABLED": False})
+        warm_up(app)
+        self.app = app
+        self.generation += 1
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(self.app, self.listener, self.threads)  # type: ignore[arg-type]
+            except BaseException:
+                logger.exception("Worker %s crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = self.generation
+        logger.info("Started worker %s (generation %s)", pid, self.generation)
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            if generation == self.generation and not self._stop:
+                logger.warning("Worker %s exited with %s; respawning", pid, status)
+
+    def _signal(self, pids: Any, signum: int) -> None:
+        for pid in list(pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+    def _wait_for(self, pids: Any, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        pending = set(pids)
+        while pending & set(self.children) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        self._signal(pending & set(self.children), signal.SIGKILL)
+        self._reap()
+
+    def reload(self) -> None:
+        """Start a new generation of workers and retire the current one."""
+        old = [pid for pid, generation in self.children.items() if generation == self.generation]
+        self._load()
+        for _ in range(self.workers):
+            self._spawn()
+        self._signal(old, signal.SIGTERM)
+        logger.info("Reloaded: generation %s serving", self.generation)
+
+    def run(self) -> int:
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "_reload", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "_stop", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "_stop", True))
+
+        self._load()
+        logger.info("Listening on http://%s:%s with %s workers x %s threads", *self.address, self.workers, self.threads)
+        try:
+            while not self._stop:
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                self._reap()
+                current = sum(1 for g in self.children.values() if g == self.generation)
+                for _ in range(self.workers - current):
+                    self._spawn()
+                time.sleep(0.1)
+        finally:
+            self._signal(self.children, signal.SIGTERM)
+            self._wait_for(list(self.children), GRACEFUL_TIMEOUT)
+            self.listener.close()
+        return 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-forking HELYNOTA server")
+    parser.add_argument("--host", default=os.environ.get("HELYNOTA_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("HELYNOTA_PORT", 8000)))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("HELYNOTA_WORKERS", os.cpu_count() or 1))
+    )
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("HELYNOTA_THREADS", 8)))
+    parser.add_argument("--database-uri", help="overrides SQLALCHEMY_DATABASE_URI")
+    parser.add_argument("--access-log", action="store_true")
+    parser.add_argument(
+        "--no-rate-limit", action="store_true", help="disable rate limiting and load shedding"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="[%(process)d] %(message)s", stream=sys.stderr)
+    _RequestHandler.access_log = args.access_log
+    config: Dict[str, Any] = {}
+    if args.database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database_uri
+    if args.no_rate_limit:
+        config["RATELIMIT_ENABLED"] = False
+    return Arbiter(args.host, args.port, args.workers, args.threads, config or None).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DATASET_PATH = BASE_DIR / "data" / "dataset_defectos.csv"
+ALMACEN_PATH = BASE_DIR / "data" / "defectos_parquet"
+
+COLUMNAS_CATEGORICAS = [
+    "modulo",
+    "severidad",
+    "tipo",
+    "estado",
+    "reportado_por",
+    "prioridad",
+    "ambiente",
+    "ciclo",
+    "version",
+]
+# Columnas que leen la simulación y los indicadores de MetricasTesting.
+COLUMNAS_METRICAS = ["fecha", "modulo", "severidad", "estado", "ambiente", "dias_abierto"]
+# Fechas distintas por lote que acepta ``write_dataset`` (su ``max_partitions``).
+MAX_PARTICIONES_POR_LOTE = 1024
+# Huella del CSV convertido; pyarrow ignora los ficheros que empiezan por "_".
+HUELLA_ORIGEN = "_origen.json"
+
+
+def _es_almacen(origen: Path) -> bool:
+    return origen.is_dir()
+
+
+def _huella(origen: Path) -> Dict[str, int]:
+    estado = origen.stat()
+    return {"mtime_ns": estado.st_mtime_ns, "bytes": estado.st_size}
+
+
+def almacen_vigente(almacen: Path = ALMACEN_PATH, origen: Path = DATASET_PATH) -> bool:
+    """Indica si ``almacen`` se convirtió desde ``origen`` tal como está ahora."""
+    try:
+        guardada = json.loads((Path(almacen) / HUELLA_ORIGEN).read_text(encoding="utf-8"))
+        return guardada == _huella(Path(origen))
+    except (OSError, ValueError):
+        return False
+
+
+def elegir_origen(origen: Path = DATASET_PATH, almacen: Path = ALMACEN_PATH) -> Path:
+    """El almacén si está al día con el CSV; si no (o no existe), el propio CSV."""
+    return almacen if almacen_vigente(almacen, origen) else origen
+
+
+def _particionado():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("fecha", pa.date32())]), flavor="hive")
+
+
+def _por_fechas(lote, limite: int = MAX_PARTICIONES_POR_LOTE):
+    """Ordena el lote por fecha y lo parte en trozos de como mucho ``limite`` fechas."""
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    lote = lote.take(pc.sort_indices(lote, sort_keys=[("fecha", "ascending")]))
+    # Las fechas nulas quedan al final; se cuentan como una fecha más.
+    dias = lote.column("fecha").cast(pa.int32()).fill_null(np.iinfo(np.int32).max).to_numpy()
+    unicos = np.unique(dias)
+    inicio = 0
+    for fin in [*np.searchsorted(dias, unicos[limite::limite]), len(dias)]:
+        yield lote.slice(inicio, int(fin) - inicio)
+        inicio = int(fin)
+
+
+def convertir_csv_a_parquet(
+    origen: Path = DATASET_PATH,
+    destino: Path = ALMACEN_PATH,
+    bloque_bytes: int = 64 << 20,
+) -> int:
+    """Convierte el CSV de defectos al almacén Parquet y devuelve las filas escritas.
+
+    El CSV se lee en streaming por bloques, las columnas de texto se guardan
+    con codificación de diccionario y se escribe una partición por fecha
+    (``fecha=YYYY-MM-DD``). Cada bloque se ordena por fecha y se parte para
+    no pasar de ``MAX_PARTICIONES_POR_LOTE`` fechas por lote, así que el CSV
+    puede cubrir cualquier número de días. Las particiones existentes se
+    reemplazan y se guarda la huella del CSV (``HUELLA_ORIGEN``) para saber
+    si el almacén queda desfasado.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+
+    tipos = {columna: pa.dictionary(pa.int32(), pa.string()) for columna in COLUMNAS_CATEGORICAS}
+    tipos.update({"defecto_id": pa.string(), "fecha": pa.date32(), "dias_abierto": pa.int16()})
+    lector = pacsv.open_csv(
+        origen,
+        read_options=pacsv.ReadOptions(block_size=bloque_bytes),
+        convert_options=pacsv.ConvertOptions(column_types=tipos),
+    )
+
+    huella = _huella(Path(origen))
+    filas = 0
+
+    def _lotes():
+        nonlocal filas
+        for lote in lector:
+            filas += lote.num_rows
+            yield from _por_fechas(lote)
+
+    destino.mkdir(parents=True, exist_ok=True)
+    (destino / HUELLA_ORIGEN).unlink(missing_ok=True)
+    ds.write_dataset(
+        _lotes(),
+        destino,
+        schema=lector.schema,
+        format="parquet",
+        partitioning=_particionado(),
+        max_partitions=MAX_PARTICIONES_POR_LOTE,
+        existing_data_behavior="delete_matching",
+    )
+    (destino / HUELLA_ORIGEN).write_text(json.dumps(huella), encoding="utf-8")
+    return filas
+
+
+def fechas_disponibles(origen: Path = DATASET_PATH) -> List[date]:
+    """Devuelve las fechas con defectos, ordenadas, sin leer el resto de columnas."""
+    origen = Path(origen)
+    if _es_almacen(origen):
+        return sorted(
+            date.fromisoformat(particion.name.split("=", 1)[1])
+            for particion in origen.glob("fecha=*")
+            if particion.is_dir()
+        )
+    fechas = pd.read_csv(origen, usecols=["fecha"], parse_dates=["fecha"], date_format="%Y-%m-%d")
+    return sorted(fechas["fecha"].dt.date.unique())
+
+
+def cargar_defectos(
+    origen: Path = DATASET_PATH,
+    columnas: Optional[Sequence[str]] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+) -> pd.DataFrame:
+    """Carga los defectos leyendo solo ``columnas`` y el rango ``[desde, hasta]``.
+
+    ``origen`` puede ser el CSV o el directorio del almacén Parquet. En el
+    almacén el filtro de fechas descarta particiones completas sin abrirlas.
+    En ambos casos ``fecha`` queda como ``datetime64`` y las columnas de texto
+    como categóricas.
+    """
+    origen = Path(origen)
+    columnas = list(columnas) if columnas is not None else None
+    if columnas is not None and "fecha" not in columnas:
+        columnas = ["fecha", *columnas]
+
+    if _es_almacen(origen):
+        defectos = _cargar_parquet(origen, columnas, desde, hasta)
+    else:
+        defectos = _cargar_csv(origen, columnas, desde, hasta)
+
+    defectos["fecha"] = defectos["fecha"].astype("datetime64[ns]")
+    return defectos.reset_index(drop=True)
+
+
+def _cargar_parquet(
+    origen: Path,
+    columnas: Optional[List[str]],
+    desde: Optional[date],
+    hasta: Optional[date],
+) -> pd.DataFrame:
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(origen, format="parquet", partitioning=_particionado())
+    filtro = None
+    if desde is not None:
+        filtro = ds.field("fecha") >= desde
+    if hasta is not None:
+        condicion = ds.field("fecha") <= hasta
+        filtro = condicion if filtro is None else filtro & condicion
+    tabla = dataset.to_table(columns=columnas, filter=filtro)
+    return tabla.to_pandas(date_as_object=False)
+
+
+def _cargar_csv(
+    origen: Path,
+    columnas: Optional[List[str]],
+    desde: Optional[date],
+    hasta: Optional[date],
+) -> pd.DataFrame:
+    defectos = pd.read_csv(
+        origen,
+        usecols=columnas,
+        dtype={
+            **{columna: "category" for columna in COLUMNAS_CATEGORICAS},
+            "dias_abierto": "int16",
+        },
+        parse_dates=["fecha"],
+        date_format="%Y-%m-%d",
+    )
+    if desde is not None:
+        defectos = defectos[defectos["fecha"] >= pd.Timestamp(desde)]
+    if hasta is not None:
+        defectos = defectos[defectos["fecha"] <= pd.Timestamp(hasta)]
+    return defectos
+
+
+def comparar_formatos(
+    csv_path: Path = DATASET_PATH,
+    almacen_path: Path = ALMACEN_PATH,
+    repeticiones: int = 3,
+) -> pd.DataFrame:
+    """Compara tiempo de carga y memoria del CSV original frente al almacén."""
+
+    def _csv_original() -> pd.DataFrame:
+        defectos = pd.read_csv(csv_path)
+        defectos["fecha"] = pd.to_datetime(defectos["fecha"]).dt.date
+        return defectos
+
+    ultimas = fechas_disponibles(almacen_path)[-5:]
+    escenarios = {
+        "csv_original": _csv_original,
+        "csv_categorico": lambda: cargar_defectos(csv_path, COLUMNAS_METRICAS),
+        "parquet_completo": lambda: cargar_defectos(almacen_path),
+        "parquet_metricas": lambda: cargar_defectos(almacen_path, COLUMNAS_METRICAS),
+        "parquet_ultimos_5_dias": lambda: cargar_defectos(
+            almacen_path, COLUMNAS_METRICAS, desde=ultimas[0] if ultimas else None
+        ),
+    }
+
+    resultados: List[Dict[str, float]] = []
+    for nombre, cargar in escenarios.items():
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            defectos = cargar()
+            tiempos.append(time.perf_counter() - inicio)
+        resultados.append(
+            {
+                "escenario": nombre,
+                "filas": len(defectos),
+                "segundos": round(min(tiempos), 4),
+                "memoria_mb": round(defectos.memory_usage(deep=True).sum() / 2**20, 2),
+            }
+        )
+    return pd.DataFrame(resultados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén columnar de defectos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    convertir = subparsers.add_parser("convertir", help="CSV -> Parquet particionado")
+    convertir.add_argument("--origen", type=Path, default=DATASET_PATH)
+    convertir.add_argument("--destino", type=Path, default=ALMACEN_PATH)
+
+    benchmark = subparsers.add_parser("benchmark", help="Carga CSV vs Parquet")
+    benchmark.add_argument("--csv", type=Path, default=DATASET_PATH)
+    benchmark.add_argument("--almacen", type=Path, default=ALMACEN_PATH)
+    benchmark.add_argument("--repeticiones", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.comando == "convertir":
+        filas = convertir_csv_a_parquet(args.origen, args.destino)
+        print(f"{filas} defectos convertidos en {args.destino}")
+    else:
+        print(comparar_formatos(args.csv, args.almacen, args.repeticiones).to_string(index=False))
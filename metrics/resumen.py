@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from metrics.sistema_metricas import IndicadorSalida
+
+
+# Tipos de las columnas numéricas del snapshot; las de criterios se deducen
+# del sufijo (``_ok`` booleana, ``_detalle`` texto).
+TIPOS_SNAPSHOT: Dict[str, str] = {
+    "defectos_abiertos": "Int64",
+    "defectos_criticos": "Int64",
+    "tasa_resolucion": "float64",
+    "densidad_defectos": "float64",
+    "tasa_escape": "float64",
+    "productividad": "float64",
+    "tasa_aprobacion": "float64",
+    "automatizacion": "float64",
+    "cobertura_requisitos": "float64",
+}
+EXTENSIONES = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+
+def aplanar_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte ``criterios_salida_ok`` en columnas ``criterio_<clave>_ok/_detalle``."""
+    fila = {clave: valor for clave, valor in snapshot.items() if clave != "criterios_salida_ok"}
+    criterios: Dict[str, IndicadorSalida] = snapshot.get("criterios_salida_ok") or {}
+    for clave, indicador in criterios.items():
+        fila[f"criterio_{clave}_ok"] = bool(indicador.cumplido)
+        fila[f"criterio_{clave}_detalle"] = indicador.detalle
+    return fila
+
+
+def _tipar(resumen: pd.DataFrame) -> pd.DataFrame:
+    tipos: Dict[str, str] = {}
+    for columna in resumen.columns:
+        if columna in TIPOS_SNAPSHOT:
+            tipos[columna] = TIPOS_SNAPSHOT[columna]
+        elif columna.endswith("_ok"):
+            tipos[columna] = "boolean"
+        elif columna.endswith("_detalle"):
+            tipos[columna] = "string"
+    resumen = resumen.astype(tipos)
+    if "dia" in resumen.columns:
+        resumen["dia"] = pd.to_datetime(resumen["dia"], format="ISO8601")
+    return resumen
+
+
+def resumen_dataframe(snapshots: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """DataFrame tipado con un snapshot aplanado por fila."""
+    return _tipar(pd.DataFrame([aplanar_snapshot(snapshot) for snapshot in snapshots]))
+
+
+def _formato(ruta: Path, formato: Optional[str]) -> str:
+    if formato:
+        return formato
+    try:
+        return EXTENSIONES[ruta.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Formato de resumen no soportado: {ruta.suffix}") from None
+
+
+def exportar_resumen(
+    snapshots: Iterable[Dict[str, Any]], destino: Path, formato: Optional[str] = None
+) -> Path:
+    """Escribe el resumen como CSV, NDJSON o Parquet (según ``formato`` o la extensión)."""
+    formato = _formato(destino, formato)
+    resumen = resumen_dataframe(snapshots)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    if formato == "csv":
+        resumen.to_csv(destino, index=False, date_format="%Y-%m-%d")
+    elif formato == "ndjson":
+        resumen.to_json(destino, orient="records", lines=True, date_format="iso", date_unit="s")
+    else:
+        resumen.to_parquet(destino, index=False)
+    return destino
+
+
+def leer_resumen(origen: Path, formato: Optional[str] = None) -> pd.DataFrame:
+    """Lee uno o varios resúmenes (archivo o directorio) con tipos explícitos.
+
+    Con un directorio se concatenan, en orden de nombre, todos los archivos
+    con extensión soportada.
+    """
+    origen = Path(origen)
+    if origen.is_dir():
+        archivos = sorted(p for p in origen.iterdir() if p.suffix.lower() in EXTENSIONES)
+        partes: List[pd.DataFrame] = [leer_resumen(archivo, formato) for archivo in archivos]
+        return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+    formato = _formato(origen, formato)
+    if formato == "parquet":
+        return pd.read_parquet(origen)
+    if formato == "csv":
+        # Las columnas de criterios dependen del día; _tipar las convierte
+        # según su sufijo.
+        resumen = pd.read_csv(origen, dtype=TIPOS_SNAPSHOT, keep_default_na=False, na_values=[""])
+    else:
+        resumen = pd.read_json(origen, lines=True, dtype=False)
+    return _tipar(resumen)
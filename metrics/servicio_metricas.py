@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from metrics.sistema_metricas import MetricasTesting
+
+
+ESCENARIO_EJECUCION: List[Dict[str, int]] = [
+    {"plan": 40, "exec": 36, "pass": 32, "fail": 4, "auto": 20},
+    {"plan": 45, "exec": 42, "pass": 39, "fail": 3, "auto": 25},
+    {"plan": 45, "exec": 44, "pass": 41, "fail": 3, "auto": 30},
+    {"plan": 50, "exec": 48, "pass": 46, "fail": 2, "auto": 35},
+    {"plan": 50, "exec": 49, "pass": 47, "fail": 2, "auto": 40},
+]
+
+
+def _nativo(valor: Any) -> Any:
+    # Los indicadores devuelven escalares de NumPy (float64, bool_).
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def serializar_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte un snapshot en un diccionario apto para JSON."""
+    serializado: Dict[str, Any] = {}
+    for clave, valor in snapshot.items():
+        if clave == "criterios_salida_ok":
+            serializado[clave] = {
+                nombre: {campo: _nativo(v) for campo, v in asdict(indicador).items()}
+                for nombre, indicador in valor.items()
+            }
+        else:
+            serializado[clave] = _nativo(valor)
+    return serializado
+
+
+class ServicioMetricas:
+    """Mantiene un ``MetricasTesting`` vivo sobre el dataset de defectos.
+
+    El CSV se lee de forma incremental: solo se procesan los bytes añadidos
+    desde la última lectura y los días nuevos se registran sobre la instancia
+    existente. Si llegan defectos de un día ya registrado (o el archivo se
+    reescribe) se reconstruye la serie completa, ya que los indicadores son
+    acumulativos.
+    """
+
+    def __init__(
+        self,
+        dataset_path: Path,
+        escenario: Optional[List[Dict[str, int]]] = None,
+        max_rangos_cache: int = 128,
+    ) -> None:
+        self.dataset_path = Path(dataset_path)
+        self.escenario = escenario or ESCENARIO_EJECUCION
+        self.max_rangos_cache = max_rangos_cache
+
+        self.metricas: Optional[MetricasTesting] = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._cabecera = b""
+        self._offset = 0
+        self._dias: List[date] = []
+        self._cache: OrderedDict[
+            Tuple[Optional[date], Optional[date]], List[Dict[str, Any]]
+        ] = OrderedDict()
+
+    # ===================== Lectura incremental ========================
+    def refrescar(self) -> bool:
+        """Incorpora los defectos nuevos del dataset. Devuelve ``True`` si hubo cambios."""
+        with self._lock:
+            tamano = self.dataset_path.stat().st_size
+            if tamano < self._offset:
+                self._reiniciar()
+            if tamano == self._offset:
+                return False
+
+            nuevos = self._leer_desde_offset()
+            if nuevos is None or nuevos.empty:
+                return False
+
+            if self._dias and nuevos["fecha"].min() <= self._dias[-1]:
+                self._reiniciar()
+                nuevos = self._leer_desde_offset()
+
+            self._registrar(nuevos)
+            self.version += 1
+            self._cache.clear()
+            return True
+
+    def _reiniciar(self) -> None:
+        self.metricas = None
+        self._cabecera = b""
+        self._offset = 0
+        self._dias = []
+
+    def _leer_desde_offset(self) -> Optional[pd.DataFrame]:
+        with self.dataset_path.open("rb") as archivo:
+            if not self._cabecera:
+                self._cabecera = archivo.readline()
+                self._offset = archivo.tell()
+            archivo.seek(self._offset)
+            bloque = archivo.read()
+
+        # Solo se consumen líneas completas; una fila a medio escribir se
+        # leerá en el siguiente refresco.
+        fin = bloque.rfind(b"\n")
+        if fin < 0:
+            return None
+        bloque = bloque[: fin + 1]
+        self._offset += len(bloque)
+
+        defectos = pd.read_csv(io.BytesIO(self._cabecera + bloque))
+        defectos["fecha"] = pd.to_datetime(defectos["fecha"]).dt.date
+        return defectos
+
+    def _registrar(self, defectos: pd.DataFrame) -> None:
+        if self.metricas is None:
+            self.metricas = MetricasTesting(defectos, compacto=True)
+
+        for fecha, defectos_dia in defectos.groupby("fecha", sort=True):
+            indice = len(self._dias)
+            datos_dia = self.escenario[min(indice, len(self.escenario) - 1)]
+            self.metricas.registrar_dia(
+                fecha.isoformat(),
+                defectos_dia,
+                datos_dia["plan"],
+                datos_dia["exec"],
+                datos_dia["pass"],
+                datos_dia["fail"],
+                datos_dia["auto"],
+            )
+            self._dias.append(fecha)
+
+    # ========================= Consultas ==============================
+    def serie(
+        self, desde: Optional[date] = None, hasta: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """Devuelve los snapshots serializados entre ``desde`` y ``hasta`` (inclusive)."""
+        self.refrescar()
+        clave = (desde, hasta)
+        with self._lock:
+            if clave in self._cache:
+                self._cache.move_to_end(clave)
+                return self._cache[clave]
+
+            snapshots = self.metricas.snapshots if self.metricas else []
+            resultado = [
+                serializar_snapshot(snapshot)
+                for fecha, snapshot in zip(self._dias, snapshots)
+                if (desde is None or fecha >= desde) and (hasta is None or fecha <= hasta)
+            ]
+            self._cache[clave] = resultado
+            if len(self._cache) > self.max_rangos_cache:
+                self._cache.popitem(last=False)
+            return resultado
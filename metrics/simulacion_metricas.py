@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import argparse
 import base64
+import hashlib
 import io
 from pathlib import Path
 from typing import Dict, List
@@ -8,20 +10,62 @@ from typing import Dict, List
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from metrics.almacen_defectos import (
+    ALMACEN_PATH,
+    COLUMNAS_METRICAS,
+    DATASET_PATH,
+    cargar_defectos,
+    elegir_origen,
+    fechas_disponibles,
+)
+from metrics.resumen import exportar_resumen
+from metrics.servicio_metricas import ESCENARIO_EJECUCION
 from metrics.sistema_metricas import MetricasTesting
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
-DATASET_PATH = BASE_DIR / "data" / "dataset_defectos.csv"
 DASHBOARD_DIR = BASE_DIR / "dashboards"
+ASSETS_DIR = DASHBOARD_DIR / "assets"
+ASSETS_URL = "/dashboards/assets"
 
+MODOS_GRAFICOS = ("inline", "externo")
+FORMATOS_GRAFICOS = ("png", "svg")
+FORMATOS_RESUMEN = ("csv", "ndjson", "parquet")
 
-def _fig_to_base64(fig: plt.Figure) -> str:
+
+def _fig_to_bytes(fig: plt.Figure, formato: str = "png") -> bytes:
     buffer = io.BytesIO()
-    fig.savefig(buffer, format="png", bbox_inches="tight")
+    # Sin fecha en los metadatos SVG para que la huella sea reproducible.
+    metadata = {"Date": None} if formato == "svg" else None
+    fig.savefig(buffer, format=formato, bbox_inches="tight", metadata=metadata)
     plt.close(fig)
-    buffer.seek(0)
-    return base64.b64encode(buffer.read()).decode("utf-8")
+    return buffer.getvalue()
+
+
+def _fig_to_base64(fig: plt.Figure) -> str:
+    return base64.b64encode(_fig_to_bytes(fig, "png")).decode("utf-8")
+
+
+def _fig_to_asset(fig: plt.Figure, nombre: str, formato: str = "png") -> str:
+    """Guarda la figura como archivo con huella de contenido y devuelve su URL.
+
+    El nombre incluye el hash del contenido, por lo que el archivo puede
+    servirse con caché de larga duración: si el gráfico cambia, cambia la URL.
+    """
+    contenido = _fig_to_bytes(fig, formato)
+    huella = hashlib.sha256(contenido).hexdigest()[:12]
+    archivo = f"{nombre}-{huella}.{formato}"
+    ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+    destino = ASSETS_DIR / archivo
+    if not destino.exists():
+        destino.write_bytes(contenido)
+    return f"{ASSETS_URL}/{archivo}"
+
+
+def _fig_to_src(fig: plt.Figure, nombre: str, modo: str, formato: str) -> str:
+    if modo == "externo":
+        return _fig_to_asset(fig, nombre, formato)
+    return f"data:image/png;base64,{_fig_to_base64(fig)}"
 
 
 def _build_dashboard_html(
@@ -29,6 +73,8 @@ def _build_dashboard_html(
     historico: pd.DataFrame,
     criterios: Dict[str, object],
     ruta_salida: Path,
+    modo_graficos: str = "inline",
+    formato_graficos: str = "png",
 ) -> None:
     DASHBOARD_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -38,7 +84,9 @@ def _build_dashboard_html(
     ax1.set_ylabel("Defectos")
     ax1.set_xlabel("Día")
     ax1.grid(True, linestyle="--", alpha=0.4)
-    grafico_defectos = _fig_to_base64(fig1)
+    grafico_defectos = _fig_to_src(
+        fig1, "defectos_abiertos", modo_graficos, formato_graficos
+    )
 
     fig2, ax2 = plt.subplots(figsize=(6, 3))
     ax2.plot(historico["dia"], historico["tasa_aprobacion"], marker="o", color="#5cb85c")
@@ -47,7 +95,9 @@ def _build_dashboard_html(
     ax2.set_xlabel("Día")
     ax2.set_ylim(0, 1)
     ax2.grid(True, linestyle="--", alpha=0.4)
-    grafico_aprobacion = _fig_to_base64(fig2)
+    grafico_aprobacion = _fig_to_src(
+        fig2, "tasa_aprobacion", modo_graficos, formato_graficos
+    )
 
     criterios_rows = "\n".join(
         f"<tr><td>{c.nombre}</td>"
@@ -86,10 +136,10 @@ def _build_dashboard_html(
     <section>
         <h2>Evolución de métricas</h2>
         <div class="grafico">
-            <img src="data:image/png;base64,{grafico_defectos}" alt="Defectos abiertos" />
+            <img src="{grafico_defectos}" alt="Defectos abiertos" />
         </div>
         <div class="grafico">
-            <img src="data:image/png;base64,{grafico_aprobacion}" alt="Tasa aprobación" />
+            <img src="{grafico_aprobacion}" alt="Tasa aprobación" />
         </div>
     </section>
     <section>
@@ -106,25 +156,41 @@ def _build_dashboard_html(
     ruta_salida.write_text(html, encoding="utf-8")
 
 
-def simular_ejecucion() -> List[Dict[str, float]]:
-    defectos = pd.read_csv(DATASET_PATH)
-    defectos["fecha"] = pd.to_datetime(defectos["fecha"]).dt.date
+def simular_ejecucion(
+    modo_graficos: str = "inline",
+    formato_graficos: str = "png",
+    formato_resumen: str = "csv",
+) -> List[Dict[str, float]]:
+    """Ejecuta la simulación y genera dashboards, resumen y trazabilidad.
+
+    Con ``modo_graficos="externo"`` los gráficos se escriben en
+    ``dashboards/assets`` como archivos PNG/SVG con huella en el nombre en
+    lugar de incrustarse en base64 dentro de cada HTML. El resumen se guarda
+    aplanado y tipado en ``formato_resumen`` (csv, ndjson o parquet).
+    """
+    if modo_graficos not in MODOS_GRAFICOS:
+        raise ValueError(f"modo_graficos debe ser uno de {MODOS_GRAFICOS}")
+    if formato_graficos not in FORMATOS_GRAFICOS:
+        raise ValueError(f"formato_graficos debe ser uno de {FORMATOS_GRAFICOS}")
+    if formato_resumen not in FORMATOS_RESUMEN:
+        raise ValueError(f"formato_resumen debe ser uno de {FORMATOS_RESUMEN}")
+
+    # Se usa el almacén Parquet si está al día con el CSV; solo se leen las
+    # columnas de los indicadores y las particiones de los días simulados.
+    origen = elegir_origen(DATASET_PATH, ALMACEN_PATH)
+    dias_unicos = fechas_disponibles(origen)[-5:]
+    defectos = cargar_defectos(
+        origen, COLUMNAS_METRICAS, desde=dias_unicos[0] if dias_unicos else None
+    )
 
-    metricas = MetricasTesting(defectos)
+    metricas = MetricasTesting(defectos, compacto=True)
 
-    dias_unicos = sorted(defectos["fecha"].unique())[-5:]
-    escenario = [
-        {"plan": 40, "exec": 36, "pass": 32, "fail": 4, "auto": 20},
-        {"plan": 45, "exec": 42, "pass": 39, "fail": 3, "auto": 25},
-        {"plan": 45, "exec": 44, "pass": 41, "fail": 3, "auto": 30},
-        {"plan": 50, "exec": 48, "pass": 46, "fail": 2, "auto": 35},
-        {"plan": 50, "exec": 49, "pass": 47, "fail": 2, "auto": 40},
-    ]
+    escenario = ESCENARIO_EJECUCION
 
     snapshots: List[Dict[str, float]] = []
     for indice, fecha in enumerate(dias_unicos):
         datos_dia = escenario[min(indice, len(escenario) - 1)]
-        defectos_dia = defectos[defectos["fecha"] == fecha]
+        defectos_dia = defectos[defectos["fecha"] == pd.Timestamp(fecha)]
         snapshot = metricas.registrar_dia(
             fecha.isoformat(),
             defectos_dia,
@@ -138,17 +204,24 @@ def simular_ejecucion() -> List[Dict[str, float]]:
         historico = pd.DataFrame(metricas.snapshots)
         criterios = metricas.criterios_salida()
         salida = DASHBOARD_DIR / f"dashboard_dia_{indice + 1}.html"
-        _build_dashboard_html(snapshot, historico, criterios, salida)
+        _build_dashboard_html(
+            snapshot, historico, criterios, salida, modo_graficos, formato_graficos
+        )
 
-    resumen_path = DASHBOARD_DIR / "resumen_metricas.csv"
-    pd.DataFrame(snapshots).to_csv(resumen_path, index=False)
+    resumen_path = DASHBOARD_DIR / f"resumen_metricas.{formato_resumen}"
+    exportar_resumen(snapshots, resumen_path)
 
     trazabilidad_path = BASE_DIR / "Matriz_Trazabilidad.xlsx"
-    metricas.exportar_trazabilidad(trazabilidad_path)
+    metricas.exportar_trazabilidad(trazabilidad_path, incluir_historial=True)
 
     return snapshots
 
 
 if __name__ == "__main__":
-    resultados = simular_ejecucion()
+    parser = argparse.ArgumentParser(description="Simulación de métricas de testing")
+    parser.add_argument("--graficos", choices=MODOS_GRAFICOS, default="inline")
+    parser.add_argument("--formato", choices=FORMATOS_GRAFICOS, default="png")
+    parser.add_argument("--resumen", choices=FORMATOS_RESUMEN, default="csv")
+    args = parser.parse_args()
+    resultados = simular_ejecucion(args.graficos, args.formato, args.resumen)
     print("Simulación completada. Dashboards generados en:", DASHBOARD_DIR)
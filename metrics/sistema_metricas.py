@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
-from helynota.database import utcnow
+
+# Columnas de texto que el modo compacto guarda como códigos enteros.
+COLUMNAS_CODIFICADAS = ["estado", "severidad", "modulo", "ambiente"]
+# Únicas columnas de defectos que leen los indicadores.
+COLUMNAS_INDICADORES = [*COLUMNAS_CODIFICADAS, "dias_abierto"]
 
 
 @dataclass
@@ -17,7 +22,13 @@ class IndicadorSalida:
 
 
 class MetricasTesting:
-    """Calcula indicadores clave para el proceso de pruebas."""
+    """Calcula indicadores clave para el proceso de pruebas.
+
+    Con ``compacto=True`` los defectos se guardan solo con las columnas que
+    leen los indicadores y los textos de ``COLUMNAS_CODIFICADAS`` pasan a
+    códigos enteros (``vocabulario`` conserva la correspondencia), de modo
+    que las máscaras se evalúan sobre enteros en lugar de cadenas.
+    """
 
     def __init__(
         self,
@@ -25,13 +36,24 @@ class MetricasTesting:
         testers_disponibles: int = 5,
         casos_planificados_totales: int = 220,
         casos_automatizados_totales: int = 150,
+        compacto: bool = False,
     ) -> None:
-        self.catalogo_defectos = defectos.copy()
+        self.compacto = compacto
+        self.vocabulario: Dict[str, Dict[str, int]] = {
+            columna: {} for columna in COLUMNAS_CODIFICADAS
+        }
+        if compacto:
+            self.catalogo_defectos = self._compactar(defectos)
+        else:
+            self.catalogo_defectos = defectos.copy()
         self.testers_disponibles = testers_disponibles
         self.casos_planificados_totales = casos_planificados_totales
         self.casos_automatizados_totales = casos_automatizados_totales
 
-        self.defectos_observados = pd.DataFrame(columns=defectos.columns)
+        if compacto:
+            self.defectos_observados = self.catalogo_defectos.iloc[0:0].copy()
+        else:
+            self.defectos_observados = pd.DataFrame(columns=defectos.columns)
         self.registros_ejecucion = pd.DataFrame(
             columns=[
                 "dia",
@@ -79,6 +101,8 @@ class MetricasTesting:
     ) -> Dict[str, float]:
         """Registra los resultados de un día de pruebas y calcula métricas."""
         self._ultima_actualizacion = fecha
+        if self.compacto:
+            defectos_dia = self._compactar(defectos_dia)
         if not defectos_dia.empty:
             self.defectos_observados = pd.concat(
                 [self.defectos_observados, defectos_dia], ignore_index=True
@@ -144,36 +168,70 @@ class MetricasTesting:
             self.requisitos.at[idx, "casos_aprobados"] = aprobados + incremento
             restante -= incremento
 
+    # ===================== Modo compacto ==============================
+    def _compactar(self, defectos: pd.DataFrame) -> pd.DataFrame:
+        """Reduce ``defectos`` a las columnas de los indicadores con códigos enteros."""
+        compacto: Dict[str, np.ndarray] = {}
+        for columna in COLUMNAS_CODIFICADAS:
+            codigos, valores = pd.factorize(defectos[columna])
+            vocabulario = self.vocabulario[columna]
+            traduccion = np.array(
+                [vocabulario.setdefault(valor, len(vocabulario)) for valor in valores] + [-1],
+                dtype=np.int16,
+            )
+            # factorize marca los nulos con -1, que apunta al -1 añadido al final.
+            compacto[columna] = traduccion[codigos]
+        compacto["dias_abierto"] = defectos["dias_abierto"].to_numpy(dtype=np.int32)
+        return pd.DataFrame(compacto, index=defectos.index)
+
+    def _es(self, columna: str, valor: str):
+        """Máscara ``columna == valor``; en modo compacto compara códigos enteros."""
+        serie = self.defectos_observados[columna]
+        if self.compacto:
+            return serie.to_numpy() == self.vocabulario[columna].get(valor, -2)
+        return serie == valor
+
+    def uso_memoria(self) -> int:
+        """Bytes ocupados por el catálogo y los defectos observados."""
+        return int(
+            self.catalogo_defectos.memory_usage(deep=True).sum()
+            + self.defectos_observados.memory_usage(deep=True).sum()
+        )
+
     # ===================== Indicadores base ===========================
     def indicador_defectos_abiertos(self) -> int:
         if self.defectos_observados.empty:
             return 0
-        return int((self.defectos_observados["estado"] != "Resuelto").sum())
+        return int((~self._es("estado", "Resuelto")).sum())
 
     def indicador_defectos_criticos(self) -> int:
         if self.defectos_observados.empty:
             return 0
-        mask = (self.defectos_observados["severidad"] == "Critico") & (
-            self.defectos_observados["estado"] != "Resuelto"
-        )
+        mask = self._es("severidad", "Critico") & ~self._es("estado", "Resuelto")
         return int(mask.sum())
 
     def indicador_tasa_resolucion(self) -> float:
         if self.defectos_observados.empty:
             return 0.0
-        resueltos = (self.defectos_observados["estado"] == "Resuelto").sum()
+        resueltos = self._es("estado", "Resuelto").sum()
         return round(resueltos / len(self.defectos_observados), 3)
 
     def indicador_densidad_defectos(self) -> float:
         if self.defectos_observados.empty:
             return 0.0
-        modulos = self.defectos_observados.groupby("modulo").size()
+        if self.compacto:
+            codigos = self.defectos_observados["modulo"].to_numpy()
+            modulos = np.bincount(codigos[codigos >= 0])
+            modulos = modulos[modulos > 0]
+        else:
+            # observed=True: con "modulo" categórico no se cuentan módulos sin defectos.
+            modulos = self.defectos_observados.groupby("modulo", observed=True).size()
         return round(modulos.mean(), 2)
 
     def indicador_tasa_escape(self) -> float:
         if self.defectos_observados.empty:
             return 0.0
-        escapes = (self.defectos_observados["ambiente"] == "Produccion").sum()
+        escapes = self._es("ambiente", "Produccion").sum()
         return round(escapes / len(self.defectos_observados), 3)
 
     def indicador_productividad_equipo(self, casos_ejecutados: int) -> float:
@@ -199,9 +257,7 @@ class MetricasTesting:
     def indicador_tiempo_promedio_resolucion(self) -> float:
         if self.defectos_observados.empty:
             return 0.0
-        resueltos = self.defectos_observados[
-            self.defectos_observados["estado"] == "Resuelto"
-        ]
+        resueltos = self.defectos_observados[self._es("estado", "Resuelto")]
         if resueltos.empty:
             return 0.0
         return round(resueltos["dias_abierto"].astype(int).mean(), 2)
@@ -298,7 +354,12 @@ class MetricasTesting:
         metricos = ["defectos_abiertos", "tasa_aprobacion", "automatizacion"]
         return {m: self.detectar_tendencia(m) for m in metricos}
 
-    def exportar_trazabilidad(self, destino: Path) -> None:
+    def exportar_trazabilidad(self, destino: Path, incluir_historial: bool = False) -> None:
+        """Exporta la matriz de trazabilidad en modo streaming (openpyxl write-only).
+
+        Con ``incluir_historial`` se agregan las hojas ``Historial`` (un
+        snapshot por día) y ``Criterios_salida`` (estado actual).
+        """
         columnas = [
             "requisito_id",
             "descripcion",
@@ -310,11 +371,32 @@ class MetricasTesting:
         df["cobertura"] = (
             df["casos_aprobados"] / df["casos_totales"]
         ).round(3)
-        df.to_excel(destino, index=False)
+
+        hojas: Dict[str, pd.DataFrame] = {"Trazabilidad": df}
+        if incluir_historial:
+            hojas["Historial"] = pd.DataFrame(
+                [
+                    {k: v for k, v in snap.items() if k != "criterios_salida_ok"}
+                    for snap in self.snapshots
+                ]
+            )
+            hojas["Criterios_salida"] = pd.DataFrame(
+                [
+                    {"criterio": clave, **asdict(indicador)}
+                    for clave, indicador in self.criterios_salida().items()
+                ],
+                columns=["criterio", "nombre", "cumplido", "detalle"],
+            )
+        from metrics.exportador_excel import escribir_xlsx
+
+        escribir_xlsx(destino, hojas)
 
     def resumen_actual(self) -> Dict[str, float]:
         if not self.snapshots:
             return {}
+        # Import diferido: importar helynota arrastra Flask y SQLAlchemy.
+        from helynota.database import utcnow
+
         resumen = self.snapshots[-1].copy()
         resumen["ultima_actualizacion"] = self._ultima_actualizacion or ""
         resumen["timestamp_generado"] = utcnow().isoformat()
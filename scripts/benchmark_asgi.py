@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Each server runs in its own single process so the comparison is one
+# process per mode: Werkzeug with a thread per connection vs. uvicorn with
+# one event loop.
+SERVERS = {
+    "wsgi": """
+from werkzeug.serving import run_simple
+from helynota import create_app
+run_simple({host!r}, {port}, create_app({config!r}), threaded=True)
+""",
+    "asgi": """
+import uvicorn
+from helynota.asgi import create_asgi_app
+uvicorn.run(create_asgi_app({config!r}), host={host!r}, port={port}, log_level="warning", backlog=4096)
+""",
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _prepare_database(path: Path) -> Dict[str, object]:
+    from helynota import create_app
+    from helynota.database import db
+    from helynota.seed import seed_initial_data
+
+    config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"}
+    app = create_app(config)
+    # Every benchmark connection comes from 127.0.0.1: measure raw serving.
+    config["RATELIMIT_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+        seed_initial_data()
+    return config
+
+
+async def _get(host: str, port: int, target: str) -> Tuple[int, float]:
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status = int(response.split(b" ", 2)[1]) if response else 0
+    return status, time.perf_counter() - started
+
+
+async def _burst(host: str, port: int, target: str, connections: int) -> Tuple[List, float]:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_get(host, port, target) for _ in range(connections)), return_exceptions=True
+    )
+    return results, time.perf_counter() - started
+
+
+async def _wait_until_ready(host: str, port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            status, _ = await _get(host, port, "/api/health")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("server did not start")
+        await asyncio.sleep(0.1)
+
+
+def run_mode(
+    mode: str, config: Dict[str, object], connections: int, rounds: int, target: str
+) -> Dict[str, object]:
+    host, port = "127.0.0.1", _free_port()
+    script = SERVERS[mode].format(host=host, port=port, config=config)
+    server = subprocess.Popen(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(_wait_until_ready(host, port))
+        best: Optional[Dict[str, object]] = None
+        for _ in range(rounds):
+            results, elapsed = asyncio.run(_burst(host, port, target, connections))
+            latencies = sorted(r[1] for r in results if not isinstance(r, BaseException) and r[0] == 200)
+            summary = {
+                "mode": mode,
+                "connections": connections,
+                "ok": len(latencies),
+                "errors": connections - len(latencies),
+                "seconds": round(elapsed, 2),
+                "req_per_s": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+                "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1) if latencies else None,
+            }
+            if best is None or summary["req_per_s"] > best["req_per_s"]:
+                best = summary
+        return best  # type: ignore[return-value]
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main(connections: int = 1000, rounds: int = 3, modes: Tuple[str, ...] = ("wsgi", "asgi")) -> None:
+    check_in = date.today() + timedelta(days=14)
+    target = (
+        f"/api/rooms/search?check_in={check_in.isoformat()}"
+        f"&check_out={(check_in + timedelta(days=3)).isoformat()}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        config = _prepare_database(Path(directory) / "hotel.db")
+        print(f"{connections} simultaneous connections to {target.split('?')[0]}, best of {rounds}")
+        for mode in modes:
+            result = run_mode(mode, config, connections, rounds, target)
+            print("  " + "  ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare sync (WSGI) and async (ASGI) serving")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--mode", choices=sorted(SERVERS), action="append")
+    args = parser.parse_args()
+    main(args.connections, args.rounds, tuple(args.mode or ("wsgi", "asgi")))
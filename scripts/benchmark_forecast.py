@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _populate(years: int, rooms_per_type: int, seed: int) -> int:
+    """``rooms_per_type`` rooms of each type, booked back to back for ``years``."""
+    from sqlalchemy import insert, select
+
+    from helynota.database import db
+    from helynota.models import Reservation, Room, RoomType, User
+
+    rng = random.Random(seed)
+    for room_type in db.session.scalars(select(RoomType)):
+        extra = rooms_per_type - len(room_type.rooms)
+        db.session.add_all(
+            Room(room_number=f"{room_type.id}-{n}", floor=2 + n // 50, room_type=room_type) for n in range(extra)
+        )
+    db.session.flush()
+    user_id = db.session.scalar(select(User.id).limit(1))
+    first = date.today() - timedelta(days=365 * years)
+    rows = []
+    for room_id in db.session.scalars(select(Room.id)):
+        night = first + timedelta(days=rng.randrange(3))
+        while night < date.today():
+            nights = rng.randint(1, 5)
+            rows.append(
+                {
+                    "user_id": user_id,
+                    "room_id": room_id,
+                    "check_in": night,
+                    "check_out": night + timedelta(days=nights),
+                    "status": "confirmed" if rng.random() < 0.8 else "cancelled",
+                    "total_price": 100.0 * nights,
+                }
+            )
+            night += timedelta(days=nights + rng.randrange(4))
+    db.session.execute(insert(Reservation), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def main(years: int, rooms_per_type: int, days: int) -> None:
+    from helynota import create_app
+    from helynota.database import db
+    from helynota.forecast import OccupancyForecaster
+    from helynota.seed import seed_initial_data
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{Path(directory) / 'hotel.db'}",
+                "OUTBOX_DISPATCHER": False,
+                "HOLD_EXPIRY_SCHEDULER": False,
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            seed_initial_data()
+            count = _populate(years, rooms_per_type, seed=47)
+            print(f"{count} reservations over {years} years, {days}-day forecast for every room type")
+
+            today = [date.today()]
+            forecaster = OccupancyForecaster(history_days=365 * years, clock=lambda: today[0])
+            started = time.perf_counter()
+            forecaster.forecast(db.session, days)
+            print(f"  {'full fit + forecast':<28} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+            started = time.perf_counter()
+            forecaster.forecast(db.session, days)
+            print(f"  {'cached models + forecast':<28} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+            today[0] += timedelta(days=7)
+            started = time.perf_counter()
+            forecaster.forecast(db.session, days)
+            print(f"  {'one new week + forecast':<28} {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Occupancy forecast timings")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--rooms-per-type", type=int, default=100)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+    main(args.years, args.rooms_per_type, args.days)
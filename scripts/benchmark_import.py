@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _guests(prefix: str, count: int, password_hash: str = "") -> list:
+    return [
+        {
+            "username": f"{prefix}{i}",
+            "email": f"{prefix}{i}@corp.test",
+            "password": "" if password_hash else f"secret-{i}",
+            "password_hash": password_hash,
+        }
+        for i in range(count)
+    ]
+
+
+def _report(label: str, count: int, seconds: float) -> None:
+    print(f"  {label:<36} {count:>6} users {seconds:8.2f} s {count / seconds:9.0f} users/s")
+
+
+def main(register: int, hashed: int, prehashed: int) -> None:
+    from werkzeug.security import generate_password_hash
+
+    from helynota import create_app
+    from helynota.database import db
+    from helynota.provisioning import import_users
+    from helynota.seed import seed_initial_data
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{Path(directory) / 'hotel.db'}",
+                "OUTBOX_DISPATCHER": False,
+                "HOLD_EXPIRY_SCHEDULER": False,
+                "RATELIMIT_ENABLED": False,
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            seed_initial_data()
+
+        client = app.test_client()
+        started = time.perf_counter()
+        for guest in _guests("single", register):
+            assert client.post("/api/auth/register", json=guest).status_code == 201
+        _report("POST /api/auth/register, one by one", register, time.perf_counter() - started)
+
+        with app.app_context():
+            started = time.perf_counter()
+            result = import_users(db.session, _guests("bulk", hashed))
+            _report("import_users, scrypt passwords", result.created, time.perf_counter() - started)
+
+            password_hash = generate_password_hash("migrated")
+            started = time.perf_counter()
+            result = import_users(db.session, _guests("migrated", prehashed, password_hash))
+            _report("import_users, pre-hashed passwords", result.created, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Account creation throughput")
+    parser.add_argument("--register", type=int, default=50)
+    parser.add_argument("--hashed", type=int, default=50)
+    parser.add_argument("--prehashed", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.register, args.hashed, args.prehashed)
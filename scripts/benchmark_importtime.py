@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Analytics dependencies that must not be loaded to serve the web app.
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "pyarrow", "openpyxl")
+
+# Runs in a fresh interpreter: builds the app and reports wall time plus the
+# heavy modules that ended up imported.
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from helynota import create_app
+imported = time.perf_counter()
+create_app({{"SQLALCHEMY_DATABASE_URI": "sqlite://"}})
+finished = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (finished - imported) * 1000,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once() -> Tuple[Dict[str, object], List[Tuple[int, str]]]:
+    """Run one cold start; return its timings and (cumulative_us, module) pairs."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT.format(heavy=HEAVY_MODULES)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: List[Tuple[int, str]] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nesting is encoded as indentation after the single separator space.
+        modules.append((int(cumulative), name.rstrip()[1:]))
+    return json.loads(completed.stdout.strip().splitlines()[-1]), modules
+
+
+def main(runs: int = 5, top: int = 15) -> int:
+    results = [run_once() for _ in range(runs)]
+    timings = [timing for timing, _ in results]
+    total_ms = [t["import_ms"] + t["create_app_ms"] for t in timings]
+
+    print(f"cold start over {runs} runs (median): {statistics.median(total_ms):.1f} ms")
+    print(f"  import helynota: {statistics.median(t['import_ms'] for t in timings):.1f} ms")
+    print(f"  create_app():    {statistics.median(t['create_app_ms'] for t in timings):.1f} ms")
+
+    print("\nslowest imports up to one level deep (last run, cumulative):")
+    _, modules = results[-1]
+    shallow = [(us, name.strip()) for us, name in modules if len(name) - len(name.lstrip()) <= 2]
+    for cumulative, name in sorted(shallow, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    heavy = sorted({module for t in timings for module in t["heavy"]})
+    if heavy:
+        print(f"\nFAIL: analytics modules imported at startup: {', '.join(heavy)}")
+        return 1
+    print("\nOK: no analytics modules imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure create_app() cold-start import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.top))
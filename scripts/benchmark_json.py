@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _rows(count: int) -> List[Dict[str, Any]]:
+    """Reservation history rows shaped like ``reservation_payload``."""
+    first = date(2030, 1, 1)
+    return [
+        {
+            "id": i,
+            "room_number": str(100 + i % 18),
+            "room_type": ("Simple", "Doble", "Suite")[i % 3],
+            "status": ("pending", "confirmed", "cancelled")[i % 3],
+            "check_in": first + timedelta(days=i % 365),
+            "check_out": first + timedelta(days=i % 365 + 3),
+            "total_price": 3 * 220.0 + i % 7,
+            "payment_status": "success",
+        }
+        for i in range(count)
+    ]
+
+
+def _with_isoformat(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{**row, "check_in": row["check_in"].isoformat(), "check_out": row["check_out"].isoformat()} for row in rows]
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(count: int, repeat: int) -> None:
+    from flask.json.provider import DefaultJSONProvider
+
+    from helynota import create_app, json_provider
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    rows = _rows(count)
+    stdlib = DefaultJSONProvider(app)
+    fast = app.json
+    orjson_module = json_provider.orjson
+
+    def fallback() -> bytes:
+        json_provider.orjson = None
+        try:
+            return fast.dumps_bytes(rows)
+        finally:
+            json_provider.orjson = orjson_module
+
+    cases = {
+        # What the handlers did before: isoformat() per row, then the stdlib encoder.
+        "flask default + isoformat": lambda: stdlib.dumps(_with_isoformat(rows)).encode(),
+        "fast provider, stdlib fallback": fallback,
+    }
+    if orjson_module is not None:
+        cases["fast provider, orjson"] = lambda: fast.dumps_bytes(rows)
+        cases["fast provider, orjson streamed"] = lambda: b"".join(fast.iter_array(rows))
+    else:
+        print("orjson is not installed: only the stdlib encoder is measured")
+
+    print(f"Encoding {count} reservation rows, median of {repeat} runs")
+    baseline = None
+    for name, fn in cases.items():
+        elapsed = _timed(fn, repeat)
+        baseline = baseline or elapsed
+        print(f"  {name:<32} {elapsed:8.2f} ms  x{baseline / elapsed:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode time of API payloads by JSON encoder")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
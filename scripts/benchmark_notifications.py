@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import argparse
+import smtplib
+import socket
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+class CountingHandler:
+    def __init__(self) -> None:
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _payload(reservation_id: int) -> dict:
+    check_in = date.today() + timedelta(days=30)
+    return {
+        "reservation_id": reservation_id,
+        "status": "confirmed",
+        "check_in": check_in.isoformat(),
+        "check_out": (check_in + timedelta(days=2)).isoformat(),
+        "total_price": 440.0,
+        "payment": {"status": "success", "method": "credit_card", "amount": 440.0, "transaction_reference": "SIM-1"},
+    }
+
+
+def _connection_per_message(port: int, count: int) -> float:
+    """Baseline: a new SMTP connection for every message."""
+    started = time.perf_counter()
+    for i in range(count):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = "reservas@hotel.test", "cliente@hotel.test", f"#{i}"
+        message.set_content("Reserva confirmada")
+        with smtplib.SMTP("127.0.0.1", port) as conn:
+            conn.send_message(message)
+    return count / (time.perf_counter() - started)
+
+
+def _service(
+    uri: str, port: int, count: int, workers: int, batch_size: int, reservation_id: int
+) -> Tuple[float, int]:
+    from helynota import create_app
+    from helynota.notifications import Notification
+
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": uri,
+            "NOTIFICATIONS_ENABLED": True,
+            "NOTIFICATIONS_WORKERS": workers,
+            "NOTIFICATIONS_BATCH_SIZE": batch_size,
+            "SMTP_POOL_SIZE": workers,
+            "SMTP_PORT": port,
+        }
+    )
+    service = app.extensions["notifications"]
+    started = time.perf_counter()
+    for i in range(count):
+        service.enqueue(Notification(i, "reservation.confirmed", _payload(reservation_id)))
+    service.flush(timeout=600)
+    elapsed = time.perf_counter() - started
+    service.stop()
+    return count / elapsed, service.stats()["connections_opened"]
+
+
+def main(count: int, configs: List[Tuple[int, int]]) -> None:
+    from aiosmtpd.controller import Controller
+
+    from helynota import create_app
+    from helynota.database import db
+    from helynota.models import Reservation
+    from helynota.seed import seed_initial_data
+
+    handler = CountingHandler()
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            uri = f"sqlite:///{Path(directory) / 'hotel.db'}"
+            app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+            with app.app_context():
+                db.create_all()
+                seed_initial_data()
+                reservation_id = db.session.scalar(db.select(Reservation.id).limit(1))
+
+            print(f"{count} confirmation emails to a local SMTP server")
+            baseline = _connection_per_message(port, count)
+            print(f"  {'connection per message':<28} {baseline:8.1f} msg/s")
+            for workers, batch_size in configs:
+                rate, connections = _service(uri, port, count, workers, batch_size, reservation_id)
+                print(
+                    f"  workers={workers:<2} batch={batch_size:<4}          {rate:8.1f} msg/s"
+                    f"  x{rate / baseline:.1f}  connections={connections}"
+                )
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Notification throughput (messages/sec)")
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.messages, [(1, 1), (1, 50), (4, 50)])
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from multiprocessing import Pool
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _prepare_database(path: Path) -> str:
+    from helynota import create_app
+    from helynota.database import db
+    from helynota.seed import seed_initial_data
+
+    uri = f"sqlite:///{path}"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    with app.app_context():
+        db.create_all()
+        seed_initial_data()
+    return uri
+
+
+async def _get(port: int, target: str) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b" ", 2)[1]) if response else 0
+
+
+async def _load(port: int, target: str, concurrency: int, seconds: float) -> Tuple[int, int]:
+    deadline = time.perf_counter() + seconds
+    ok = errors = 0
+
+    async def client() -> None:
+        nonlocal ok, errors
+        while time.perf_counter() < deadline:
+            try:
+                status = await _get(port, target)
+            except OSError:
+                status = 0
+            if status == 200:
+                ok += 1
+            else:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return ok, errors
+
+
+def _client_process(args: Tuple[int, str, int, float]) -> Tuple[int, int]:
+    return asyncio.run(_load(*args))
+
+
+def run(
+    uri: str, workers: int, threads: int, clients: int, concurrency: int, seconds: float, target: str
+) -> Tuple[float, int]:
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "helynota.server",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "--database-uri", uri,
+            # Every benchmark connection comes from 127.0.0.1: measure raw serving.
+            "--no-rate-limit",
+        ],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 20
+        while True:
+            try:
+                if asyncio.run(_get(port, "/api/health")) == 200:
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("server did not start") from None
+                time.sleep(0.1)
+        # Let every worker come up before measuring.
+        time.sleep(0.5)
+
+        per_client = max(1, concurrency // clients)
+        with Pool(clients) as pool:
+            results = pool.map(
+                _client_process, [(port, target, per_client, seconds)] * clients
+            )
+        ok = sum(r[0] for r in results)
+        errors = sum(r[1] for r in results)
+        return ok / seconds, errors
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main(
+    worker_counts: Sequence[int], threads: int, clients: int, concurrency: int, seconds: float
+) -> None:
+    check_in = date.today() + timedelta(days=14)
+    target = (
+        f"/api/rooms/search?check_in={check_in.isoformat()}"
+        f"&check_out={(check_in + timedelta(days=3)).isoformat()}"
+    )
+    print(
+        f"/api/rooms/search, {concurrency} concurrent clients in {clients} processes, "
+        f"{seconds:.0f}s per run, {os.cpu_count()} CPUs"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        uri = _prepare_database(Path(directory) / "hotel.db")
+        baseline = None
+        for workers in worker_counts:
+            rate, errors = run(uri, workers, threads, clients, concurrency, seconds, target)
+            baseline = baseline or rate
+            print(
+                f"  workers={workers:<3} threads={threads:<3} {rate:8.1f} req/s"
+                f"  x{rate / baseline:.2f}  errors={errors}"
+            )
+
+
+def _default_worker_counts() -> List[int]:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Requests/sec of the pre-forking server by worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=_default_worker_counts())
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    main(args.workers, args.threads, args.clients, args.concurrency, args.seconds)
@@ -1,9 +1,34 @@
 from __future__ import annotations
 
+import argparse
 import random
+import sys
+import tempfile
+import time
 from pathlib import Path
+from typing import Iterator, List
 
+import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from metrics.exportador_excel import escribir_xlsx  # noqa: E402
+
+COLUMNAS_ENTRADA = ["Funcionalidad", "Severidad", "Ocurrencia", "Deteccion"]
+COLUMNAS_SALIDA = [*COLUMNAS_ENTRADA, "RPN", "Nivel_Riesgo", "Accion_Mitigacion"]
+
+# Umbrales inferiores de RPN para cada nivel, de mayor a menor.
+UMBRALES_RIESGO = [(300, "Critico"), (200, "Alto"), (120, "Medio")]
+ACCIONES_MITIGACION = {
+    "Critico": "Plan de mitigacion inmediato y prueba diaria",
+    "Alto": "Incrementar cobertura automatizada y validar escenarios limite",
+    "Medio": "Revisar casos de prueba y reforzar pruebas exploratorias",
+    "Bajo": "Monitoreo continuo, sin acciones adicionales",
+}
 
 
 def generar_matriz(destino: Path) -> None:
@@ -23,46 +48,123 @@ def generar_matriz(destino: Path) -> None:
     random.seed(42)
     registros = []
     for funcionalidad in funcionalidades:
-        severidad = random.randint(3, 10)
-        ocurrencia = random.randint(2, 9)
-        deteccion = random.randint(2, 8)
-        rpn = severidad * ocurrencia * deteccion
-        if rpn >= 300:
-            riesgo = "Critico"
-        elif rpn >= 200:
-            riesgo = "Alto"
-        elif rpn >= 120:
-            riesgo = "Medio"
-        else:
-            riesgo = "Bajo"
         registros.append(
             {
                 "Funcionalidad": funcionalidad,
-                "Severidad": severidad,
-                "Ocurrencia": ocurrencia,
-                "Deteccion": deteccion,
-                "RPN": rpn,
-                "Nivel_Riesgo": riesgo,
-                "Accion_Mitigacion": sugerir_accion(riesgo),
+                "Severidad": random.randint(3, 10),
+                "Ocurrencia": random.randint(2, 9),
+                "Deteccion": random.randint(2, 8),
             }
         )
 
-    df = pd.DataFrame(registros)
-    destino.parent.mkdir(parents=True, exist_ok=True)
-    df.to_excel(destino, index=False)
+    df = calcular_rpn(pd.DataFrame(registros))
+    escribir_xlsx(destino, {"Matriz_RPN": df})
 
 
 def sugerir_accion(riesgo: str) -> str:
-    acciones = {
-        "Critico": "Plan de mitigacion inmediato y prueba diaria",
-        "Alto": "Incrementar cobertura automatizada y validar escenarios limite",
-        "Medio": "Revisar casos de prueba y reforzar pruebas exploratorias",
-        "Bajo": "Monitoreo continuo, sin acciones adicionales",
-    }
-    return acciones[riesgo]
+    return ACCIONES_MITIGACION[riesgo]
+
+
+def calcular_rpn(df: pd.DataFrame) -> pd.DataFrame:
+    """Añade RPN, nivel de riesgo y acción sugerida con operaciones vectorizadas."""
+    faltantes = [columna for columna in COLUMNAS_ENTRADA if columna not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el inventario: {', '.join(faltantes)}")
+
+    puntajes = df[["Severidad", "Ocurrencia", "Deteccion"]].to_numpy(dtype=np.int64)
+    rpn = puntajes.prod(axis=1)
+    riesgo = np.select(
+        [rpn >= umbral for umbral, _ in UMBRALES_RIESGO],
+        [nivel for _, nivel in UMBRALES_RIESGO],
+        default="Bajo",
+    )
+
+    resultado = df[COLUMNAS_ENTRADA].copy()
+    resultado["RPN"] = rpn
+    resultado["Nivel_Riesgo"] = riesgo
+    resultado["Accion_Mitigacion"] = pd.Series(riesgo, index=df.index).map(ACCIONES_MITIGACION)
+    return resultado
+
+
+def _leer_inventario(origen: Path, filas_por_bloque: int) -> Iterator[pd.DataFrame]:
+    """Lee el inventario por bloques para no cargarlo completo en memoria."""
+    if origen.suffix.lower() in {".xlsx", ".xlsm"}:
+        libro = load_workbook(origen, read_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            cabecera = list(next(filas))
+            bloque: List[tuple] = []
+            for fila in filas:
+                bloque.append(fila)
+                if len(bloque) >= filas_por_bloque:
+                    yield pd.DataFrame(bloque, columns=cabecera)
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame(bloque, columns=cabecera)
+        finally:
+            libro.close()
+    else:
+        yield from pd.read_csv(origen, chunksize=filas_por_bloque)
+
+
+def generar_matriz_desde_archivo(
+    origen: Path, destino: Path, filas_por_bloque: int = 50_000
+) -> int:
+    """Calcula la matriz RPN de un inventario CSV/XLSX y la guarda en ``destino``.
+
+    El inventario debe tener las columnas ``COLUMNAS_ENTRADA``. Lectura,
+    cálculo y escritura trabajan bloque a bloque, por lo que la memoria queda
+    acotada por ``filas_por_bloque`` y no por el tamaño del inventario.
+    """
+    bloques = (calcular_rpn(bloque) for bloque in _leer_inventario(origen, filas_por_bloque))
+    # Con la cabecera explícita, un inventario vacío sigue dando una hoja con columnas.
+    filas = escribir_xlsx(destino, {"Matriz_RPN": bloques}, {"Matriz_RPN": COLUMNAS_SALIDA})
+    return filas["Matriz_RPN"]
+
+
+def benchmark(filas: int = 50_000, semilla: int = 42) -> None:
+    """Mide el tiempo de generar la matriz para un inventario sintético."""
+    rng = np.random.default_rng(semilla)
+    inventario = pd.DataFrame(
+        {
+            "Funcionalidad": [f"Funcionalidad {i}" for i in range(filas)],
+            "Severidad": rng.integers(1, 11, filas),
+            "Ocurrencia": rng.integers(1, 11, filas),
+            "Deteccion": rng.integers(1, 11, filas),
+        }
+    )
+    with tempfile.TemporaryDirectory() as directorio:
+        origen = Path(directorio) / "inventario.csv"
+        destino = Path(directorio) / "matriz.xlsx"
+        inventario.to_csv(origen, index=False)
+
+        inicio = time.perf_counter()
+        calcular_rpn(inventario)
+        calculo = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        generar_matriz_desde_archivo(origen, destino)
+        total = time.perf_counter() - inicio
+
+    print(f"{filas} funcionalidades: calculo {calculo:.3f}s, lectura+calculo+xlsx {total:.2f}s")
 
 
 if __name__ == "__main__":
-    destino = Path(__file__).resolve().parents[1] / "Matriz_Riesgo_RPN.xlsx"
-    generar_matriz(destino)
-    print(f"Matriz de riesgo generada en {destino}")
+    parser = argparse.ArgumentParser(description="Matriz de riesgo RPN")
+    parser.add_argument("--entrada", type=Path, help="inventario CSV/XLSX de funcionalidades")
+    parser.add_argument(
+        "--salida",
+        type=Path,
+        default=Path(__file__).resolve().parents[1] / "Matriz_Riesgo_RPN.xlsx",
+    )
+    parser.add_argument("--benchmark", type=int, metavar="FILAS")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.entrada:
+        filas = generar_matriz_desde_archivo(args.entrada, args.salida)
+        print(f"Matriz de riesgo con {filas} funcionalidades generada en {args.salida}")
+    else:
+        generar_matriz(args.salida)
+        print(f"Matriz de riesgo generada en {args.salida}")
@@ -1,84 +1,207 @@
 from __future__ import annotations
 
+import argparse
 import csv
 import random
+import time
 from datetime import date, timedelta
+from multiprocessing import Pool
 from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
 
+import numpy as np
 from faker import Faker
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "dataset_defectos.csv"
 
+FIELDNAMES = [
+    "defecto_id",
+    "fecha",
+    "modulo",
+    "severidad",
+    "tipo",
+    "estado",
+    "reportado_por",
+    "dias_abierto",
+    "prioridad",
+    "ambiente",
+    "ciclo",
+    "version",
+]
+MODULES = [
+    "Busqueda",
+    "Reservas",
+    "Pagos",
+    "Autenticacion",
+    "Notificaciones",
+    "Reportes",
+]
+SEVERITIES = ["Critico", "Alto", "Medio", "Bajo"]
+SEVERITY_WEIGHTS = [0.1, 0.3, 0.4, 0.2]
+STATES = ["Abierto", "En progreso", "Resuelto"]
+STATE_WEIGHTS = [0.2, 0.3, 0.5]
+DEFECT_TYPES = ["Funcional", "UI", "Performance", "Seguridad", "Datos"]
+PRIORITIES = ["P1", "P2", "P3", "P4"]
+ENVIRONMENTS = ["QA", "Staging", "Produccion"]
+CYCLES = [f"Sprint {sprint}" for sprint in range(1, 13)]
+VERSIONS = [f"v{major}.{minor}" for major in range(1, 4) for minor in range(10)]
+DAYS_SPAN = 60
 
-def main(records: int = 500) -> None:
+
+def main(records: int = 500, output: Path = DATA_PATH) -> None:
     fake = Faker("es_MX")
     Faker.seed(1234)
     random.seed(1234)
 
-    modules = [
-        "Busqueda",
-        "Reservas",
-        "Pagos",
-        "Autenticacion",
-        "Notificaciones",
-        "Reportes",
-    ]
-    severities = ["Critico", "Alto", "Medio", "Bajo"]
-    states = ["Abierto", "En progreso", "Resuelto"]
-    defect_types = ["Funcional", "UI", "Performance", "Seguridad", "Datos"]
-    priorities = ["P1", "P2", "P3", "P4"]
-    environments = ["QA", "Staging", "Produccion"]
-
-    start_date = date.today() - timedelta(days=60)
-
-    DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    with DATA_PATH.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(
-            csvfile,
-            fieldnames=[
-                "defecto_id",
-                "fecha",
-                "modulo",
-                "severidad",
-                "tipo",
-                "estado",
-                "reportado_por",
-                "dias_abierto",
-                "prioridad",
-                "ambiente",
-                "ciclo",
-                "version",
-            ],
-        )
+    start_date = date.today() - timedelta(days=DAYS_SPAN)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    with output.open("w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
         writer.writeheader()
 
         for defect_id in range(1, records + 1):
             days_offset = random.randint(0, 59)
             discovered = start_date + timedelta(days=days_offset)
-            estado = random.choices(states, weights=[0.2, 0.3, 0.5], k=1)[0]
+            estado = random.choices(STATES, weights=STATE_WEIGHTS, k=1)[0]
             dias_abierto = 0 if estado == "Resuelto" else random.randint(1, 10)
             writer.writerow(
                 {
                     "defecto_id": f"D{defect_id:04d}",
                     "fecha": discovered.isoformat(),
-                    "modulo": random.choice(modules),
-                    "severidad": random.choices(severities, weights=[0.1, 0.3, 0.4, 0.2], k=1)[
-                        0
-                    ],
-                    "tipo": random.choice(defect_types),
+                    "modulo": random.choice(MODULES),
+                    "severidad": random.choices(SEVERITIES, weights=SEVERITY_WEIGHTS, k=1)[0],
+                    "tipo": random.choice(DEFECT_TYPES),
                     "estado": estado,
                     "reportado_por": fake.name(),
                     "dias_abierto": dias_abierto,
-                    "prioridad": random.choice(priorities),
-                    "ambiente": random.choice(environments),
+                    "prioridad": random.choice(PRIORITIES),
+                    "ambiente": random.choice(ENVIRONMENTS),
                     "ciclo": f"Sprint {random.randint(1, 12)}",
                     "version": f"v{random.randint(1, 3)}.{random.randint(0, 9)}",
                 }
             )
 
-    print(f"Dataset guardado en {DATA_PATH}")
+    print(f"Dataset guardado en {output}")
+
+
+# ========================= Generación masiva ==========================
+# Cada bloque se genera con su propia semilla derivada de (seed, índice), de
+# modo que la salida solo depende de seed y chunk_size, no del número de
+# procesos ni del orden en que terminan.
+
+BlockTask = Tuple[int, int, int, int, Sequence[str], str]
+
+
+def _csv_field(value: str) -> str:
+    if any(char in value for char in ',"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def build_name_pool(size: int = 5000, seed: int = 1234) -> List[str]:
+    """Precompute reporter names once (already CSV-escaped)."""
+    fake = Faker("es_MX")
+    Faker.seed(seed)
+    return [_csv_field(fake.name()) for _ in range(size)]
+
+
+def _generate_block(task: BlockTask) -> str:
+    block_index, first_id, size, seed, names, start_iso = task
+    rng = np.random.default_rng([seed, block_index])
+    start_date = date.fromisoformat(start_iso)
+
+    def pick(values: Sequence[str], weights: Sequence[float] | None = None) -> np.ndarray:
+        pool = np.array(values, dtype=object)
+        if weights is None:
+            return pool[rng.integers(0, len(pool), size)]
+        return pool[rng.choice(len(pool), size=size, p=weights)]
+
+    dates = [(start_date + timedelta(days=offset)).isoformat() for offset in range(DAYS_SPAN)]
+    state_index = rng.choice(len(STATES), size=size, p=STATE_WEIGHTS)
+    open_days = np.where(
+        state_index == STATES.index("Resuelto"), 0, rng.integers(1, 11, size)
+    )
+
+    columns = [
+        [f"D{defect_id:04d}" for defect_id in range(first_id, first_id + size)],
+        pick(dates),
+        pick(MODULES),
+        pick(SEVERITIES, SEVERITY_WEIGHTS),
+        pick(DEFECT_TYPES),
+        np.array(STATES, dtype=object)[state_index],
+        pick(names),
+        open_days.astype(str),
+        pick(PRIORITIES),
+        pick(ENVIRONMENTS),
+        pick(CYCLES),
+        pick(VERSIONS),
+    ]
+    return "\n".join(map(",".join, zip(*columns))) + "\n"
+
+
+def _block_tasks(
+    records: int, chunk_size: int, seed: int, names: Sequence[str], start_iso: str
+) -> Iterator[BlockTask]:
+    for block_index, first in enumerate(range(0, records, chunk_size)):
+        size = min(chunk_size, records - first)
+        yield block_index, first + 1, size, seed, names, start_iso
+
+
+def generate_bulk(
+    records: int,
+    destination: Path = DATA_PATH,
+    chunk_size: int = 200_000,
+    workers: int = 1,
+    seed: int = 1234,
+    name_pool_size: int = 5000,
+    start_date: date | None = None,
+) -> float:
+    """Generate ``records`` defects in vectorized blocks; returns rows/second.
+
+    Columns are drawn as NumPy arrays per block and each block is written as
+    a single buffered string. With ``workers > 1`` blocks are produced by a
+    process pool and written in order, so the file is identical to a
+    single-process run with the same ``seed`` and ``chunk_size``.
+    """
+    started = time.perf_counter()
+    names = build_name_pool(name_pool_size, seed)
+    start_iso = (start_date or date.today() - timedelta(days=DAYS_SPAN)).isoformat()
+    tasks = _block_tasks(records, chunk_size, seed, names, start_iso)
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    buffer_size = 16 << 20
+    with destination.open("w", newline="", encoding="utf-8", buffering=buffer_size) as csvfile:
+        csvfile.write(",".join(FIELDNAMES) + "\n")
+        if workers > 1:
+            with Pool(workers) as pool:
+                for block in pool.imap(_generate_block, tasks):
+                    csvfile.write(block)
+        else:
+            for task in tasks:
+                csvfile.write(_generate_block(task))
+
+    elapsed = time.perf_counter() - started
+    return records / elapsed if elapsed else float("inf")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the defect dataset")
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument(
+        "--bulk", action="store_true", help="vectorized chunked generator for large datasets"
+    )
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=Path, default=DATA_PATH)
+    args = parser.parse_args()
+
+    if args.bulk:
+        rate = generate_bulk(
+            args.records, args.output, args.chunk_size, args.workers, args.seed
+        )
+        print(f"Dataset guardado en {args.output} ({rate:,.0f} filas/s)")
+    else:
+        main(args.records, args.output)
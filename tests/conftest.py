@@ -3,6 +3,63 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+from helynota import create_app  # noqa: E402
+from helynota.database import db  # noqa: E402
+from helynota.seed import seed_initial_data  # noqa: E402
+
+
+@pytest.fixture()
+def app_config():
+    """Extra configuration merged into the test app; override per module."""
+    return {}
+
+
+@pytest.fixture()
+def app(app_config):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            # The in-memory database is one shared connection: tests drive
+            # the outbox and hold expiry by hand instead of background threads.
+            "OUTBOX_DISPATCHER": False,
+            "HOLD_EXPIRY_SCHEDULER": False,
+            **app_config,
+        }
+    )
+
+    with app.app_context():
+        db.create_all()
+        seed_initial_data()
+
+    yield app
+
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _auth_headers(client, username="cliente", password="cliente123"):
+    response = client.post("/api/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.get_json()
+    return {"Authorization": f"Bearer {response.get_json()['session_token']}"}
+
+
+@pytest.fixture(scope="session")
+def auth_headers():
+    """``auth_headers(client, username, password)`` signs in and returns the Authorization header.
+
+    Defaults to the seeded guest account; tokens live in the database, so the
+    header works for any app on the same database, ASGI included.
+    """
+    return _auth_headers
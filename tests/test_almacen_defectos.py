@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from metrics.almacen_defectos import (
+    COLUMNAS_METRICAS,
+    cargar_defectos,
+    convertir_csv_a_parquet,
+    elegir_origen,
+    fechas_disponibles,
+)
+
+pytest.importorskip("pyarrow")
+
+CSV = (
+    "defecto_id,fecha,modulo,severidad,tipo,estado,reportado_por,"
+    "dias_abierto,prioridad,ambiente,ciclo,version\n"
+    "D0001,2025-10-01,Pagos,Alto,UI,Abierto,Ana Perez,3,P2,QA,Sprint 1,v1.0\n"
+    "D0002,2025-10-02,Busqueda,Critico,Datos,Resuelto,Luis Gil,0,P1,Produccion,Sprint 2,v1.1\n"
+    "D0003,2025-10-03,Pagos,Bajo,UI,En progreso,Ana Perez,5,P4,Staging,Sprint 2,v1.1\n"
+)
+
+
+@pytest.fixture()
+def csv_path(tmp_path):
+    ruta = tmp_path / "defectos.csv"
+    ruta.write_text(CSV, encoding="utf-8")
+    return ruta
+
+
+def test_conversion_partitions_by_date(csv_path, tmp_path):
+    almacen = tmp_path / "almacen"
+    assert convertir_csv_a_parquet(csv_path, almacen) == 3
+    assert sorted(p.name for p in almacen.iterdir()) == [
+        "_origen.json",
+        "fecha=2025-10-01",
+        "fecha=2025-10-02",
+        "fecha=2025-10-03",
+    ]
+    assert fechas_disponibles(almacen) == fechas_disponibles(csv_path)
+
+
+def test_loader_prunes_columns_and_dates_consistently(csv_path, tmp_path):
+    almacen = tmp_path / "almacen"
+    convertir_csv_a_parquet(csv_path, almacen)
+
+    for origen in (csv_path, almacen):
+        defectos = cargar_defectos(
+            origen, COLUMNAS_METRICAS, desde=date(2025, 10, 2), hasta=date(2025, 10, 3)
+        )
+        assert sorted(defectos.columns) == sorted(COLUMNAS_METRICAS)
+        assert sorted(defectos["fecha"].dt.date) == [date(2025, 10, 2), date(2025, 10, 3)]
+        assert str(defectos["estado"].dtype) == "category"
+        assert str(defectos["fecha"].dtype) == "datetime64[ns]"
+
+
+def test_store_is_only_used_while_it_matches_the_csv(csv_path, tmp_path):
+    almacen = tmp_path / "almacen"
+    assert elegir_origen(csv_path, almacen) == csv_path
+    convertir_csv_a_parquet(csv_path, almacen)
+    assert elegir_origen(csv_path, almacen) == almacen
+
+    with csv_path.open("a", encoding="utf-8") as csv:
+        csv.write("D0004,2025-10-04,Pagos,Alto,UI,Abierto,Ana Perez,1,P2,QA,Sprint 2,v1.1\n")
+    assert elegir_origen(csv_path, almacen) == csv_path
+    assert fechas_disponibles(elegir_origen(csv_path, almacen))[-1] == date(2025, 10, 4)
+
+    convertir_csv_a_parquet(csv_path, almacen)
+    assert elegir_origen(csv_path, almacen) == almacen
+    assert fechas_disponibles(almacen)[-1] == date(2025, 10, 4)
+
+
+def test_conversion_of_more_dates_than_partitions_per_batch(tmp_path):
+    primero = date(2022, 1, 1)
+    fechas = [primero + timedelta(days=dia) for dia in range(1100)]
+    filas = [
+        f"D{n:05d},{fecha.isoformat()},Pagos,Alto,UI,Abierto,Ana Perez,{n % 9},P2,QA,Sprint 1,v1.0"
+        for n, fecha in enumerate(reversed(fechas))
+    ]
+    ruta = tmp_path / "defectos.csv"
+    ruta.write_text(CSV.splitlines(keepends=True)[0] + "\n".join(filas) + "\n", encoding="utf-8")
+
+    almacen = tmp_path / "almacen"
+    assert convertir_csv_a_parquet(ruta, almacen) == 1100
+    assert fechas_disponibles(almacen) == fechas
+    defectos = cargar_defectos(almacen, ["dias_abierto"], desde=fechas[-1], hasta=fechas[-1])
+    assert defectos["dias_abierto"].tolist() == [0]
@@ -2,45 +2,6 @@ from __future__ import annotations
 
 from datetime import date, timedelta
 
-import pytest
-
-from helynota import create_app
-from helynota.database import db
-from helynota.seed import seed_initial_data
-
-
-@pytest.fixture()
-def app():
-    app = create_app(
-        {
-            "TESTING": True,
-            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
-        }
-    )
-
-    with app.app_context():
-        db.create_all()
-        seed_initial_data()
-
-    yield app
-
-    with app.app_context():
-        db.drop_all()
-
-
-@pytest.fixture()
-def client(app):
-    return app.test_client()
-
-
-def login(client) -> str:
-    response = client.post(
-        "/api/auth/login", json={"username": "cliente", "password": "cliente123"}
-    )
-    payload = response.get_json()
-    assert response.status_code == 200
-    return payload["session_token"]
-
 
 def test_user_registration_and_login_flow(client):
     response = client.post(
@@ -76,9 +37,8 @@ def test_room_search_returns_available_rooms(client):
     assert all("room_id" in room for room in payload["available_rooms"])
 
 
-def test_reservation_creation_and_payment_flow(client):
-    token = login(client)
-    headers = {"Authorization": f"Bearer {token}"}
+def test_reservation_creation_and_payment_flow(client, auth_headers):
+    headers = auth_headers(client)
 
     room_types_response = client.get("/api/room-types")
     assert room_types_response.status_code == 200
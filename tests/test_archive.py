@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from helynota.archive import archive_reservations
+from helynota.database import db
+from helynota.models import ArchivedPayment, ArchivedReservation, Payment, Reservation, Room, User
+
+TODAY = date.today()
+
+
+def add_reservation(status, check_out_offset, created_minutes_ago, paid=False):
+    user = db.session.scalar(db.select(User).filter_by(username="cliente"))
+    room = db.session.scalar(db.select(Room).limit(1))
+    check_out = TODAY + timedelta(days=check_out_offset)
+    reservation = Reservation(
+        user=user,
+        room=room,
+        check_in=check_out - timedelta(days=2),
+        check_out=check_out,
+        status=status,
+        total_price=200.0,
+        created_at=datetime(2030, 1, 1) - timedelta(minutes=created_minutes_ago),
+    )
+    if paid:
+        reservation.payment = Payment(
+            amount=200.0,
+            status="success" if status == "confirmed" else "failed",
+            method="credit_card",
+            transaction_reference=f"SIM-{check_out_offset}-{created_minutes_ago}",
+        )
+    db.session.add(reservation)
+    db.session.commit()
+    return reservation.id
+
+
+@pytest.fixture()
+def history(app):
+    with app.app_context():
+        db.session.execute(db.delete(Payment))
+        db.session.execute(db.delete(Reservation))
+        return {
+            "stayed": add_reservation("confirmed", -40, 50, paid=True),
+            "cancelled": add_reservation("cancelled", -30, 40, paid=True),
+            "expired": add_reservation("expired", -20, 30),
+            "pending": add_reservation("pending", -10, 20),
+            "upcoming": add_reservation("confirmed", 10, 10, paid=True),
+            "recent": add_reservation("confirmed", -1, 5, paid=True),
+        }
+
+
+def list_reservations(client, headers):
+    return client.get("/api/reservations", headers=headers).get_json()
+
+
+def test_finished_reservations_move_in_batches(app, client, history, auth_headers):
+    headers = auth_headers(client)
+    before = list_reservations(client, headers)
+    with app.app_context():
+        result = archive_reservations(db.session, TODAY - timedelta(days=5), batch_size=2)
+        assert (result.reservations, result.payments, result.batches) == (3, 2, 2)
+
+        assert set(db.session.scalars(db.select(Reservation.id))) == {
+            history["pending"], history["upcoming"], history["recent"]
+        }
+        assert set(db.session.scalars(db.select(ArchivedReservation.id))) == {
+            history["stayed"], history["cancelled"], history["expired"]
+        }
+        archived = db.session.get(ArchivedReservation, history["cancelled"])
+        assert archived.payment.status == "failed"
+        assert db.session.scalar(db.select(db.func.count()).select_from(ArchivedPayment)) == 2
+
+        # Nothing left to move.
+        assert archive_reservations(db.session, TODAY - timedelta(days=5)).reservations == 0
+
+    # The history reads across both tables, newest first as before.
+    assert list_reservations(client, headers) == before
+    assert [r["id"] for r in before][-3:] == [history["expired"], history["cancelled"], history["stayed"]]
+
+
+def test_archived_ids_are_not_reused(app, history):
+    with app.app_context():
+        archive_reservations(db.session, TODAY)
+        newest = max(db.session.scalars(db.select(ArchivedReservation.id)))
+        assert newest == history["recent"]
+        assert add_reservation("pending", 20, 1) > newest
+
+
+def test_cli_command(app, history):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["archive-reservations", "--before", TODAY.isoformat()])
+    assert result.exit_code == 0, result.output
+    assert "Archived 4 reservations and 3 payments in 1 batches" in result.output
+
+    tomorrow = (TODAY + timedelta(days=1)).isoformat()
+    result = runner.invoke(args=["archive-reservations", "--before", tomorrow])
+    assert result.exit_code != 0
+    assert "before cannot be in the future" in result.output
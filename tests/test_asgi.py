@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from helynota import create_app  # noqa: E402
+from helynota.asgi import ROUTES, async_database_uri, create_asgi_app  # noqa: E402
+from helynota.database import db  # noqa: E402
+from helynota.json_provider import STREAM_BATCH  # noqa: E402
+from helynota.models import Reservation, User  # noqa: E402
+from helynota.seed import seed_initial_data  # noqa: E402
+
+
+class WsgiApi:
+    def __init__(self, client):
+        self.client = client
+
+    def request(self, method, path, json=None, query=None, headers=None):
+        response = self.client.open(
+            path, method=method, json=json, query_string=query, headers=headers
+        )
+        return response.status_code, response.get_json()
+
+
+class AsgiApi:
+    """Drives the ASGI app in-process, on one event loop for the whole test."""
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self.messages = []
+
+    async def call(self, method, path, json_body=None, query=None, headers=None):
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        raw_headers = [(b"content-type", b"application/json")]
+        raw_headers += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": urlencode(query or {}).encode(),
+            "headers": raw_headers,
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 5000),
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        self.messages = sent
+        content = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+        headers_out = dict(sent[0]["headers"])
+        payload = json.loads(content) if headers_out.get(b"content-type") == b"application/json" else content
+        return sent[0]["status"], payload
+
+    def request(self, method, path, json=None, query=None, headers=None):
+        return self.loop.run_until_complete(self.call(method, path, json, query, headers))
+
+    def close(self):
+        self.loop.run_until_complete(self.app.engine.dispose())
+        self.loop.close()
+
+
+@pytest.fixture()
+def app_config(tmp_path):
+    # The async engine opens its own connections, so both modes share a file.
+    # The burst test would trip the rate limiter; it is covered in test_rate_limit.
+    return {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hotel.db'}",
+        "RATELIMIT_ENABLED": False,
+        "OUTBOX_DISPATCHER": False,
+        "HOLD_EXPIRY_SCHEDULER": False,
+    }
+
+
+@pytest.fixture()
+def asgi_api(app, app_config):
+    api = AsgiApi(create_asgi_app({"TESTING": True, **app_config}))
+    yield api
+    api.close()
+
+
+@pytest.fixture(params=["wsgi", "asgi"])
+def api(request, client):
+    if request.param == "wsgi":
+        return WsgiApi(client)
+    return request.getfixturevalue("asgi_api")
+
+
+def stay(offset, nights=3):
+    check_in = date.today() + timedelta(days=offset)
+    return check_in.isoformat(), (check_in + timedelta(days=nights)).isoformat()
+
+
+def test_search_validates_input(api):
+    status, payload = api.request("GET", "/api/rooms/search")
+    assert status == 400
+    assert payload["error"] == "check_in and check_out are required"
+
+    check_in, check_out = stay(5)
+    status, payload = api.request(
+        "GET", "/api/rooms/search", query={"check_in": check_out, "check_out": check_in}
+    )
+    assert status == 400
+    assert payload["error"] == "check_out must be after check_in"
+
+    check_in, check_out = stay(5)
+    status, payload = api.request(
+        "GET", "/api/rooms/search", query={"check_in": check_in, "check_out": check_out, "limit": "500"}
+    )
+    assert status == 400
+    assert payload["error"] == "limit must be at most 100"
+
+
+def test_booking_flow(api, client, auth_headers):
+    # Session tokens live in the shared database: the Flask client can sign in.
+    headers = auth_headers(client)
+    status, room_types = api.request("GET", "/api/room-types")
+    assert status == 200
+    suite = next(rt for rt in room_types if rt["name"] == "Suite")
+
+    check_in, check_out = stay(30)
+    query = {"check_in": check_in, "check_out": check_out, "room_type": "Suite"}
+    _, before = api.request("GET", "/api/rooms/search", query=query)
+
+    status, reservation = api.request(
+        "POST",
+        "/api/reservations",
+        json={"room_type_id": suite["id"], "check_in": check_in, "check_out": check_out},
+        headers=headers,
+    )
+    assert status == 201
+    assert reservation["total_price"] == 3 * suite["base_price"]
+
+    _, after = api.request("GET", "/api/rooms/search", query=query)
+    assert after["count"] == before["count"] - 1
+
+    status, payment = api.request(
+        "POST",
+        "/api/payments/simulate",
+        json={"reservation_id": reservation["reservation_id"]},
+        headers=headers,
+    )
+    assert status == 200
+    assert payment["reservation_status"] == "confirmed"
+
+    status, payment = api.request(
+        "POST",
+        "/api/payments/simulate",
+        json={"reservation_id": reservation["reservation_id"]},
+        headers=headers,
+    )
+    assert status == 409
+
+    status, reservations = api.request("GET", "/api/reservations", headers=headers)
+    assert status == 200
+    mine = next(r for r in reservations if r["id"] == reservation["reservation_id"])
+    assert mine["payment_status"] == "success"
+    assert mine["room_type"] == "Suite"
+
+
+def test_protected_endpoints_require_a_session(api, client, auth_headers):
+    status, payload = api.request("GET", "/api/users/me")
+    assert status == 401
+    assert payload == {"error": "Authentication required"}
+
+    status, me = api.request("GET", "/api/users/me", headers=auth_headers(client))
+    assert status == 200
+    assert me["username"] == "cliente"
+
+
+def test_register_rejects_duplicates(api):
+    user = {"username": "nueva", "email": "nueva@hotel.test", "password": "segura123"}
+    assert api.request("POST", "/api/auth/register", json=user)[0] == 201
+    assert api.request("POST", "/api/auth/register", json=user)[0] == 409
+
+
+def test_asgi_handles_concurrent_requests(asgi_api):
+    check_in, check_out = stay(14)
+    query = {"check_in": check_in, "check_out": check_out}
+
+    async def burst():
+        return await asyncio.gather(
+            *(asgi_api.call("GET", "/api/rooms/search", query=query) for _ in range(200))
+        )
+
+    results = asgi_api.loop.run_until_complete(burst())
+    assert {status for status, _ in results} == {200}
+    assert len({payload["count"] for _, payload in results}) == 1
+
+
+def test_asgi_streams_the_reservation_history(app, client, asgi_api, auth_headers):
+    with app.app_context():
+        user = db.session.scalar(db.select(User).filter_by(username="cliente"))
+        check_in = date.today() - timedelta(days=400)
+        db.session.execute(
+            db.insert(Reservation),
+            [
+                {
+                    "user_id": user.id,
+                    "room_id": 1,
+                    "check_in": check_in,
+                    "check_out": check_in + timedelta(days=1),
+                    "status": "cancelled",
+                    "total_price": 100.0,
+                }
+                for _ in range(STREAM_BATCH * 2)
+            ],
+        )
+        db.session.commit()
+        expected = len(db.session.scalars(db.select(Reservation).filter_by(user_id=user.id)).all())
+
+    status, history = asgi_api.request("GET", "/api/reservations", headers=auth_headers(client))
+    assert status == 200 and len(history) == expected
+    bodies = [m for m in asgi_api.messages if m["type"] == "http.response.body"]
+    assert len(bodies) > 3
+    assert all(m["more_body"] for m in bodies[:-1]) and not bodies[-1]["more_body"]
+    assert not any(name == b"content-length" for name, _ in asgi_api.messages[0]["headers"])
+
+
+def test_asgi_falls_back_to_flask_for_pages(asgi_api):
+    status, body = asgi_api.request("GET", "/reservas")
+    assert status == 200
+    assert b"<html" in body.lower()
+
+
+def test_async_uri_requires_a_database_file():
+    assert async_database_uri("sqlite:////tmp/hotel.db") == "sqlite+aiosqlite:////tmp/hotel.db"
+    with pytest.raises(ValueError):
+        async_database_uri("sqlite:///:memory:")
+
+
+def test_asgi_applies_rate_limits(app, app_config):
+    api = AsgiApi(
+        create_asgi_app(
+            {**app_config, "RATELIMIT_ENABLED": True, "RATELIMIT_LIMITS": {"api.search_rooms": "2/minute"}}
+        )
+    )
+    try:
+        check_in, check_out = stay(14)
+        query = {"check_in": check_in, "check_out": check_out}
+        statuses = [api.request("GET", "/api/rooms/search", query=query)[0] for _ in range(3)]
+        assert statuses == [200, 200, 429]
+    finally:
+        api.close()
+
+
+# Values that depend on the clock or on random tokens, not on the front end.
+VOLATILE = {"token", "session_token", "hold_expires_at", "transaction_reference"}
+
+
+def normalized(payload):
+    if isinstance(payload, dict):
+        return {k: "<varies>" if k in VOLATILE and v else normalized(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [normalized(item) for item in payload]
+    return payload
+
+
+def exercise(api, headers):
+    """Every route, with its error paths, in one scripted session signed in with ``headers``."""
+    check_in, check_out = stay(20)
+    dates = {"check_in": check_in, "check_out": check_out}
+    user = {"username": "nueva", "email": "nueva@hotel.test", "password": "segura123"}
+    anonymous = [
+        ("GET", "/api/health", {}),
+        ("POST", "/api/auth/register", {"json": {}}),
+        ("POST", "/api/auth/register", {"json": user}),
+        ("POST", "/api/auth/register", {"json": user}),
+        ("POST", "/api/auth/login", {"json": {"username": "cliente", "password": "mal"}}),
+        ("POST", "/api/auth/login", {"json": {"username": "cliente", "password": "cliente123"}}),
+        ("GET", "/api/users/me", {}),
+        ("GET", "/api/room-types", {}),
+        ("GET", "/api/rooms/search", {"query": {"check_in": check_in}}),
+        ("GET", "/api/rooms/search", {"query": {**dates, "guests": "nan"}}),
+        ("GET", "/api/rooms/search", {"query": {**dates, "sort": "price"}}),
+        ("GET", "/api/reservations", {}),
+    ]
+    signed_in = [
+        ("GET", "/api/users/me", {}),
+        ("POST", "/api/reservations", {"json": {"check_in": check_in}}),
+        ("POST", "/api/reservations", {"json": {"room_type_id": "x", **dates}}),
+        ("POST", "/api/reservations", {"json": {"room_type_id": 99, **dates}}),
+        ("POST", "/api/reservations", {"json": {"room_type_id": 3, **dates}}),
+        ("GET", "/api/reservations", {}),
+        ("POST", "/api/payments/simulate", {"json": {}}),
+        ("POST", "/api/payments/simulate", {"json": {"reservation_id": 999}}),
+    ]
+    results = [(method, path, *api.request(method, path, **kwargs)) for method, path, kwargs in anonymous]
+    for method, path, kwargs in signed_in:
+        results.append((method, path, *api.request(method, path, headers=headers, **kwargs)))
+
+    payment = {"reservation_id": results[-4][3]["reservation_id"]}
+    for _ in range(2):
+        status, payload = api.request("POST", "/api/payments/simulate", json=payment, headers=headers)
+        results.append(("POST", "/api/payments/simulate", status, payload))
+    status, counters = api.request("GET", "/api/stats")
+    results.append(("GET", "/api/stats", status, sorted(counters)))
+    return [(method, path, status, normalized(payload)) for method, path, status, payload in results]
+
+
+def seeded(flask_app):
+    with flask_app.app_context():
+        db.create_all()
+        seed_initial_data()
+    return flask_app
+
+
+def test_every_async_route_answers_like_the_blueprint(tmp_path, app_config, auth_headers):
+    # Profiling on, so /api/stats reports every optional section.
+    config = {
+        **app_config,
+        "PROFILING_ENABLED": True,
+        "PROFILING_SAMPLE_RATE": 0.0,
+        "PROFILING_DIR": str(tmp_path),
+    }
+    wsgi_app = seeded(create_app({**config, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'wsgi.db'}"}))
+    asgi_app = create_asgi_app({**config, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'asgi.db'}"})
+    seeded(asgi_app.flask_app)
+    asgi_api = AsgiApi(asgi_app)
+    try:
+        client = wsgi_app.test_client()
+        expected = exercise(WsgiApi(client), auth_headers(client))
+        assert exercise(asgi_api, auth_headers(asgi_app.flask_app.test_client())) == expected
+    finally:
+        asgi_api.close()
+    assert set(ROUTES) <= {(method, path) for method, path, _, _ in expected}
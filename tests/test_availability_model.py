@@ -0,0 +1,209 @@
+"""Room search and booking checked against a brute-force model of the hotel.
+
+Each seed builds a random hotel (extra rooms and room types, rooms out of
+service) and a random reservation history, then runs a random mix of
+searches, bookings and payments through the API. After every step the
+answer must match what a plain Python scan of the same data gives: the
+same rooms, in the same order, and the same room picked for a booking.
+The search cache stays on, so stale cache entries fail here too.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from helynota.booking import ACTIVE_RESERVATION_STATUSES
+from helynota.database import db
+from helynota.models import Reservation, Room, RoomType, User
+
+FIRST_NIGHT = date.today() + timedelta(days=10)
+SEEDS = range(8)
+STEPS = 60
+
+
+@pytest.fixture()
+def app_config():
+    return {"RATELIMIT_ENABLED": False}
+
+
+@dataclass
+class ModelRoom:
+    id: int
+    room_type: str
+    room_type_id: int
+    capacity: int
+    base_price: float
+    floor: int
+    bookable: bool
+
+
+class ReferenceHotel:
+    """The rooms and stays as plain lists; every answer is a full scan."""
+
+    def __init__(self, rooms: List[ModelRoom]) -> None:
+        self.rooms = rooms
+        self.stays: Dict[int, Tuple[int, date, date, str]] = {}
+
+    def free(self, check_in: date, check_out: date) -> List[ModelRoom]:
+        return [
+            room
+            for room in self.rooms
+            if not any(
+                room_id == room.id and status in ACTIVE_RESERVATION_STATUSES and start < check_out and end > check_in
+                for room_id, start, end, status in self.stays.values()
+            )
+        ]
+
+    def search(self, check_in: date, check_out: date, params: Dict[str, object]) -> List[int]:
+        rooms = self.free(check_in, check_out)
+        if "room_type" in params:
+            rooms = [r for r in rooms if r.room_type == params["room_type"]]
+        if "guests" in params:
+            rooms = [r for r in rooms if r.capacity >= params["guests"]]
+        if "min_price" in params:
+            rooms = [r for r in rooms if r.base_price >= params["min_price"]]
+        if "max_price" in params:
+            rooms = [r for r in rooms if r.base_price <= params["max_price"]]
+        if "floor" in params:
+            rooms = [r for r in rooms if r.floor == params["floor"]]
+        sort = params.get("sort") or ("fit" if "guests" in params else "room")
+        keys = {
+            "room": lambda r: (r.id,),
+            "price": lambda r: (r.base_price, r.id),
+            "-price": lambda r: (-r.base_price, r.id),
+            "fit": lambda r: (r.capacity, r.base_price, r.id),
+            "floor": lambda r: (r.floor, r.id),
+        }
+        rooms.sort(key=keys[sort])
+        return [r.id for r in rooms[: params.get("limit")]]
+
+    def book(self, room_type_id: int, check_in: date, check_out: date) -> Optional[int]:
+        free = [r.id for r in self.free(check_in, check_out) if r.room_type_id == room_type_id and r.bookable]
+        return min(free, default=None)
+
+
+def build_hotel(rng: random.Random) -> ReferenceHotel:
+    """Extra rooms and a random history on top of the seeded hotel."""
+    # Same price as Doble and same capacity as Suite: ties in every sort.
+    family = RoomType(name="Familiar", description="Dos camas dobles.", capacity=4, base_price=120.0)
+    db.session.add(family)
+    room_types = db.session.scalars(db.select(RoomType)).all()
+    for n in range(rng.randint(5, 15)):
+        db.session.add(
+            Room(
+                room_number=f"X{n}",
+                floor=rng.randint(1, 4),
+                status="maintenance" if rng.random() < 0.2 else "available",
+                room_type=rng.choice(room_types),
+            )
+        )
+    db.session.flush()
+
+    rooms = db.session.execute(db.select(Room, RoomType).join(Room.room_type).order_by(Room.id)).all()
+    hotel = ReferenceHotel(
+        [
+            ModelRoom(room.id, rt.name, rt.id, rt.capacity, rt.base_price, room.floor, room.status == "available")
+            for room, rt in rooms
+        ]
+    )
+    # The seeded demo reservations included.
+    for reservation in db.session.scalars(db.select(Reservation)):
+        hotel.stays[reservation.id] = (
+            reservation.room_id, reservation.check_in, reservation.check_out, reservation.status
+        )
+    user = db.session.scalar(db.select(User).filter_by(username="admin"))
+    for _ in range(rng.randint(50, 200)):
+        room = rng.choice(hotel.rooms)
+        check_in = FIRST_NIGHT + timedelta(days=rng.randint(0, 40))
+        check_out = check_in + timedelta(days=rng.randint(1, 6))
+        status = rng.choice(["pending", "confirmed", "confirmed", "cancelled", "expired"])
+        if status in ACTIVE_RESERVATION_STATUSES and room not in hotel.free(check_in, check_out):
+            status = "cancelled"  # the hotel never double-books
+        reservation = Reservation(
+            user=user,
+            room_id=room.id,
+            check_in=check_in,
+            check_out=check_out,
+            status=status,
+            total_price=100.0,
+        )
+        db.session.add(reservation)
+        db.session.flush()
+        hotel.stays[reservation.id] = (room.id, check_in, check_out, status)
+    db.session.commit()
+    return hotel
+
+
+def random_stay(rng: random.Random) -> Tuple[date, date]:
+    check_in = FIRST_NIGHT + timedelta(days=rng.randint(-3, 45))
+    return check_in, check_in + timedelta(days=rng.randint(1, 7))
+
+
+def random_filters(rng: random.Random) -> Dict[str, object]:
+    options = {
+        "room_type": lambda: rng.choice(["Simple", "Doble", "Suite", "Familiar", "Ático"]),
+        "guests": lambda: rng.randint(1, 5),
+        "min_price": lambda: rng.choice([0, 80, 100, 120, 220]),
+        "max_price": lambda: rng.choice([80, 119.99, 120, 300]),
+        "floor": lambda: rng.randint(1, 4),
+        "sort": lambda: rng.choice(["room", "price", "-price", "fit", "floor"]),
+        "limit": lambda: rng.randint(1, 10),
+    }
+    return {name: make() for name, make in options.items() if rng.random() < 0.3}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_search_and_booking_match_the_reference_model(app, client, seed, auth_headers):
+    rng = random.Random(seed)
+    with app.app_context():
+        hotel = build_hotel(rng)
+        room_type_ids = [room.room_type_id for room in hotel.rooms]
+    headers = auth_headers(client)
+
+    for step in range(STEPS):
+        check_in, check_out = random_stay(rng)
+        stay = {"check_in": check_in.isoformat(), "check_out": check_out.isoformat()}
+        if rng.random() < 0.6:
+            params = random_filters(rng)
+            response = client.get("/api/rooms/search", query_string={**stay, **params})
+            assert response.status_code == 200
+            found = [room["room_id"] for room in response.get_json()["available_rooms"]]
+            assert found == hotel.search(check_in, check_out, params), (step, stay, params)
+            continue
+
+        room_type_id = rng.choice(room_type_ids)
+        expected = hotel.book(room_type_id, check_in, check_out)
+        response = client.post("/api/reservations", headers=headers, json={"room_type_id": room_type_id, **stay})
+        if expected is None:
+            assert response.status_code == 409, (step, stay, room_type_id)
+            continue
+        assert response.status_code == 201
+        reservation_id = response.get_json()["reservation_id"]
+        with app.app_context():
+            assert db.session.get(Reservation, reservation_id).room_id == expected
+        hotel.stays[reservation_id] = (expected, check_in, check_out, "pending")
+
+        if rng.random() < 0.5:
+            failed = rng.random() < 0.5
+            response = client.post(
+                "/api/payments/simulate",
+                headers=headers,
+                json={"reservation_id": reservation_id, "force_failure": failed},
+            )
+            assert response.status_code == 200
+            hotel.stays[reservation_id] = (expected, check_in, check_out, "cancelled" if failed else "confirmed")
+
+    # However the steps went, no room is ever double-booked.
+    with app.app_context():
+        active = db.session.execute(
+            db.select(Reservation.room_id, Reservation.check_in, Reservation.check_out).where(
+                Reservation.status.in_(ACTIVE_RESERVATION_STATUSES)
+            )
+        ).all()
+    for i, (room_id, start, end) in enumerate(active):
+        for other_room, other_start, other_end in active[i + 1 :]:
+            assert not (room_id == other_room and start < other_end and other_start < end)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.fixture()
+def dashboards_dir(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "dashboard_dia_1.html").write_text(
+        '<img src="/dashboards/assets/defectos_abiertos-abc123.png" />',
+        encoding="utf-8",
+    )
+    (tmp_path / "assets" / "defectos_abiertos-abc123.png").write_bytes(b"\x89PNG-fake")
+    return tmp_path
+
+
+@pytest.fixture()
+def app_config(dashboards_dir):
+    return {"DASHBOARD_DIR": str(dashboards_dir)}
+
+
+def test_dashboard_html_supports_conditional_requests(client):
+    response = client.get("/dashboards/dashboard/1")
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert "no-cache" in response.headers["Cache-Control"]
+
+    revalidated = client.get(
+        "/dashboards/dashboard/1", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+
+def test_chart_assets_are_served_with_long_lived_cache(client):
+    response = client.get("/dashboards/assets/defectos_abiertos-abc123.png")
+    assert response.status_code == 200
+    cache_control = response.headers["Cache-Control"]
+    assert "immutable" in cache_control
+    assert "max-age=31536000" in cache_control
+
+    revalidated = client.get(
+        "/dashboards/assets/defectos_abiertos-abc123.png",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_external_chart_mode_writes_fingerprinted_files(tmp_path, monkeypatch):
+    from metrics import simulacion_metricas
+
+    monkeypatch.setattr(simulacion_metricas, "ASSETS_DIR", tmp_path)
+    fig, ax = simulacion_metricas.plt.subplots()
+    ax.plot([1, 2, 3])
+    url = simulacion_metricas._fig_to_asset(fig, "grafico", "svg")
+
+    archivo = url.rsplit("/", 1)[-1]
+    assert url.startswith(simulacion_metricas.ASSETS_URL)
+    assert archivo.startswith("grafico-") and archivo.endswith(".svg")
+    assert (tmp_path / archivo).exists()
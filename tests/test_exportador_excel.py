@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from metrics.almacen_defectos import DATASET_PATH
+from metrics.exportador_excel import escribir_xlsx
+from metrics.servicio_metricas import ESCENARIO_EJECUCION
+from metrics.sistema_metricas import MetricasTesting
+
+
+def test_streaming_writer_handles_blocks_and_missing_values(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    bloques = (
+        pd.DataFrame({"id": [i, i + 1], "valor": [0.5, None], "ok": [True, False]})
+        for i in range(0, 6, 2)
+    )
+
+    assert escribir_xlsx(destino, {"Datos": bloques, "Vacia": []}) == {"Datos": 6, "Vacia": 0}
+
+    filas = list(load_workbook(destino, read_only=True)["Datos"].iter_rows(values_only=True))
+    assert filas[0] == ("id", "valor", "ok")
+    assert filas[1] == (0, 0.5, True)
+    assert filas[2] == (1, None, False)
+    assert len(filas) == 7
+
+
+def test_header_is_written_once_even_with_empty_blocks(tmp_path):
+    destino = tmp_path / "salida.xlsx"
+    bloques = [pd.DataFrame({"id": [], "valor": []}), pd.DataFrame({"id": [1], "valor": [2.5]})]
+
+    filas = escribir_xlsx(destino, {"Datos": bloques, "Vacia": iter([])}, {"Vacia": ["id", "valor"]})
+    assert filas == {"Datos": 1, "Vacia": 0}
+
+    libro = load_workbook(destino, read_only=True)
+    assert list(libro["Datos"].iter_rows(values_only=True)) == [("id", "valor"), (1, 2.5)]
+    assert list(libro["Vacia"].iter_rows(values_only=True)) == [("id", "valor")]
+
+
+def test_traceability_export_includes_history_and_exit_criteria(tmp_path):
+    defectos = pd.read_csv(DATASET_PATH)
+    metricas = MetricasTesting(defectos, compacto=True)
+    for indice, (fecha, defectos_dia) in enumerate(list(defectos.groupby("fecha"))[:3]):
+        datos = ESCENARIO_EJECUCION[indice]
+        metricas.registrar_dia(
+            fecha,
+            defectos_dia,
+            datos["plan"],
+            datos["exec"],
+            datos["pass"],
+            datos["fail"],
+            datos["auto"],
+        )
+
+    destino = tmp_path / "trazabilidad.xlsx"
+    metricas.exportar_trazabilidad(destino, incluir_historial=True)
+
+    hojas = pd.read_excel(destino, sheet_name=None)
+    assert list(hojas) == ["Trazabilidad", "Historial", "Criterios_salida"]
+    assert len(hojas["Trazabilidad"]) == 10
+    assert len(hojas["Historial"]) == 3
+    assert "criterios_salida_ok" not in hojas["Historial"].columns
+    assert len(hojas["Criterios_salida"]) == 8
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from helynota.database import db
+from helynota.forecast import OccupancyForecaster, occupied_rooms, room_counts
+from helynota.models import ArchivedReservation, Reservation, Room, User
+
+TODAY = date.today()
+START = TODAY - timedelta(days=120)
+
+
+@pytest.fixture()
+def stays(app):
+    """Random stays over the last 120 days and the next 20, hot and archived."""
+    rng = random.Random(47)
+    with app.app_context():
+        db.session.execute(db.delete(Reservation))
+        user_id = db.session.scalar(db.select(User.id).filter_by(username="cliente"))
+        rooms = db.session.execute(db.select(Room.id, Room.room_type_id)).all()
+        stays = []
+        for room_id, room_type_id in rooms:
+            night = START - timedelta(days=rng.randrange(5))
+            while night < TODAY + timedelta(days=20):
+                nights = rng.randint(1, 4)
+                status = rng.choice(["confirmed", "confirmed", "cancelled"])
+                model = Reservation if night > START + timedelta(days=60) else ArchivedReservation
+                db.session.add(
+                    model(
+                        user_id=user_id,
+                        room_id=room_id,
+                        check_in=night,
+                        check_out=night + timedelta(days=nights),
+                        status=status,
+                        total_price=100.0 * nights,
+                    )
+                )
+                if status == "confirmed":
+                    stays.append((room_type_id, night, night + timedelta(days=nights)))
+                night += timedelta(days=nights + rng.randrange(3))
+        db.session.commit()
+    return stays
+
+
+def test_occupied_rooms_counts_every_night_of_every_stay(app, stays):
+    with app.app_context():
+        room_type_ids = np.array(sorted(room_counts(db.session)))
+        counts = occupied_rooms(db.session, room_type_ids, START, TODAY)
+
+    expected = np.zeros_like(counts)
+    for room_type_id, check_in, check_out in stays:
+        row = room_type_ids.tolist().index(room_type_id)
+        for offset in range((TODAY - START).days):
+            if check_in <= START + timedelta(days=offset) < check_out:
+                expected[row, offset] += 1
+    assert (counts == expected).all()
+
+
+def test_moving_on_updates_the_models_like_a_full_fit(app, stays):
+    today = [TODAY - timedelta(days=10)]
+    incremental = OccupancyForecaster(history_days=90, clock=lambda: today[0])
+    with app.app_context():
+        before = incremental.refresh(db.session)
+        season = before.season.copy()
+        today[0] = TODAY
+        models = incremental.refresh(db.session)
+        assert (incremental.full_fits, incremental.incremental_fits) == (1, 1)
+
+        # The same window, fitted in one go.
+        full = OccupancyForecaster(history_days=100, clock=lambda: TODAY).refresh(db.session)
+    assert models.through == full.through == TODAY
+    assert np.allclose(models.level, full.level)
+    assert np.allclose(models.season, full.season)
+    # Callers get snapshots: the update did not touch the earlier one.
+    assert before.through == TODAY - timedelta(days=10)
+    assert (before.season == season).all()
+
+
+def test_naive_forecast_repeats_the_last_week(app, stays):
+    forecaster = OccupancyForecaster(history_days=90, clock=lambda: TODAY)
+    with app.app_context():
+        forecast = forecaster.forecast(db.session, 14, method="naive")
+    assert forecast.fitted_through == TODAY - timedelta(days=1)
+    for series in forecast.series:
+        days = [day["occupancy"] for day in series["days"]]
+        assert days[:7] == days[7:]
+        assert all(0.0 <= day["booked"] <= 1.0 for day in series["days"])
+
+
+def test_forecast_api(client, stays):
+    response = client.get("/api/forecast", query_string={"days": 10, "room_type": "Suite"})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["start"] == TODAY.isoformat() and payload["method"] == "ets"
+    (suites,) = payload["room_types"]
+    assert suites["room_type"] == "Suite" and len(suites["days"]) == 10
+    assert all(0.0 <= day["occupancy"] <= 1.0 for day in suites["days"])
+
+    for params, error in [
+        ({"days": 0}, "days must be between 1 and 365"),
+        ({"days": "week"}, "days must be between 1 and 365"),
+        ({"method": "arima"}, "method must be one of: ets, naive"),
+    ]:
+        response = client.get("/api/forecast", query_string=params)
+        assert response.status_code == 400
+        assert response.get_json()["error"] == error
+
+
+def test_forecast_command(app, stays):
+    result = app.test_cli_runner().invoke(args=["forecast-occupancy", "--days", "3", "--method", "naive"])
+    assert result.exit_code == 0, result.output
+    header, *rows = result.output.splitlines()
+    assert header.split() == ["date", "Simple", "Doble", "Suite"]
+    assert [row.split()[0] for row in rows] == [(TODAY + timedelta(days=n)).isoformat() for n in range(3)]
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from datetime import date
+
+from metrics.almacen_defectos import cargar_defectos
+from scripts.generate_dataset import FIELDNAMES, generate_bulk, main
+
+
+def test_bulk_generator_is_reproducible_across_workers(tmp_path):
+    single = tmp_path / "single.csv"
+    parallel = tmp_path / "parallel.csv"
+    options = {
+        "chunk_size": 1_000,
+        "seed": 7,
+        "name_pool_size": 50,
+        "start_date": date(2025, 1, 1),
+    }
+
+    generate_bulk(5_000, single, workers=1, **options)
+    generate_bulk(5_000, parallel, workers=2, **options)
+
+    assert single.read_bytes() == parallel.read_bytes()
+
+    defectos = cargar_defectos(single)
+    assert list(defectos.columns) == FIELDNAMES
+    assert len(defectos) == 5_000
+    assert defectos["defecto_id"].is_unique
+    resueltos = defectos["estado"] == "Resuelto"
+    assert (defectos.loc[resueltos, "dias_abierto"] == 0).all()
+    assert defectos.loc[~resueltos, "dias_abierto"].between(1, 10).all()
+
+
+def test_default_generator_writes_to_the_given_output(tmp_path):
+    output = tmp_path / "nested" / "defectos.csv"
+    main(20, output)
+    defectos = cargar_defectos(output)
+    assert list(defectos.columns) == FIELDNAMES
+    assert len(defectos) == 20
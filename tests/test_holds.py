@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+
+from helynota import create_app
+from helynota.database import db, utcnow
+from helynota.holds import HoldExpirer
+from helynota.models import OutboxEvent, Reservation
+from helynota.seed import seed_initial_data
+
+CHECK_IN = date.today() + timedelta(days=30)
+CHECK_OUT = CHECK_IN + timedelta(days=2)
+
+
+def book(client, headers):
+    response = client.post(
+        "/api/reservations",
+        headers=headers,
+        json={"room_type_id": 3, "check_in": CHECK_IN.isoformat(), "check_out": CHECK_OUT.isoformat()},
+    )
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def pay(client, headers, reservation_id):
+    return client.post("/api/payments/simulate", headers=headers, json={"reservation_id": reservation_id})
+
+
+def free_suites(client):
+    response = client.get(
+        "/api/rooms/search",
+        query_string={"check_in": CHECK_IN.isoformat(), "check_out": CHECK_OUT.isoformat(), "room_type": "Suite"},
+    )
+    return response.get_json()["count"]
+
+
+def after_hold(app):
+    return utcnow() + timedelta(seconds=app.config["RESERVATION_HOLD_SECONDS"] + 1)
+
+
+def test_unpaid_holds_expire_and_free_the_room(app, client, auth_headers):
+    headers = auth_headers(client)
+    before = free_suites(client)
+    held = book(client, headers)
+    paid = book(client, headers)
+    assert held["hold_expires_at"]
+    assert pay(client, headers, paid["reservation_id"]).status_code == 200
+    # Cached by now: expiry has to evict it.
+    assert free_suites(client) == before - 2
+
+    holds = app.extensions["holds"]
+    assert holds.stats()["scheduled"] == 2
+    assert holds.expire_due() == 0
+    assert holds.expire_due(after_hold(app)) == 1
+    assert holds.stats()["scheduled"] == 0
+    assert free_suites(client) == before - 1
+
+    with app.app_context():
+        assert db.session.get(Reservation, held["reservation_id"]).status == "expired"
+        assert db.session.get(Reservation, paid["reservation_id"]).status == "confirmed"
+        topics = db.session.scalars(
+            db.select(OutboxEvent.topic).where(OutboxEvent.aggregate_id == held["reservation_id"])
+        ).all()
+    assert topics == ["reservation.created", "reservation.expired"]
+
+    response = pay(client, headers, held["reservation_id"])
+    assert response.status_code == 409
+    assert response.get_json()["error"] == "Reservation hold expired"
+
+
+def test_pending_holds_are_reloaded_from_the_database(app, client, auth_headers):
+    headers = auth_headers(client)
+    book(client, headers)
+    book(client, headers)
+
+    # A fresh process starts with an empty heap.
+    holds = HoldExpirer(app, app.config["RESERVATION_HOLD_SECONDS"])
+    assert holds.load_pending() == 2
+    assert holds.next_expiry is not None
+    assert holds.expire_due(after_hold(app)) == 2
+    # Entries expired by someone else are skipped.
+    assert app.extensions["holds"].expire_due(after_hold(app)) == 0
+
+
+def test_scheduler_thread_expires_holds(tmp_path, auth_headers):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hotel.db'}",
+            "OUTBOX_DISPATCHER": False,
+            "RESERVATION_HOLD_SECONDS": 0.2,
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        seed_initial_data()
+    holds = app.extensions["holds"]
+    client = app.test_client()
+    try:
+        reservation = book(client, auth_headers(client))
+        assert holds.running
+        deadline = time.monotonic() + 5
+        while holds.expired == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert holds.expired == 1
+    finally:
+        holds.stop()
+    with app.app_context():
+        assert db.session.get(Reservation, reservation["reservation_id"]).status == "expired"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from helynota import json_provider
+
+PAYLOAD = {"check_in": date(2030, 1, 1), "created_at": datetime(2030, 1, 1, 12, 30), "name": "Suite ñ"}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, app, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    return app.json
+
+
+def test_dates_are_encoded_as_iso_8601(provider):
+    assert json.loads(provider.dumps_bytes(PAYLOAD)) == {
+        "check_in": "2030-01-01",
+        "created_at": "2030-01-01T12:30:00",
+        "name": "Suite ñ",
+    }
+    assert json.loads(provider.dumps(PAYLOAD)) == json.loads(provider.dumps_bytes(PAYLOAD))
+
+
+def test_unknown_types_are_rejected(provider):
+    with pytest.raises(TypeError):
+        provider.dumps_bytes({"value": object()})
+
+
+@pytest.mark.parametrize("count", [0, 1, 5, 6])
+def test_streamed_arrays_are_valid_json(provider, count):
+    items = [{"id": i, "day": date(2030, 1, 1)} for i in range(count)]
+    chunks = list(provider.iter_array(items, batch_size=2))
+    assert json.loads(b"".join(chunks)) == json.loads(provider.dumps_bytes(items))
+
+
+def test_reservation_history_is_streamed(client, auth_headers):
+    headers = auth_headers(client)
+    room_types = client.get("/api/room-types").get_json()
+    seeded = len(client.get("/api/reservations", headers=headers).get_json())
+    check_in = date.today() + timedelta(days=20)
+    for offset, room_type in enumerate(room_types):
+        stay = {
+            "room_type_id": room_type["id"],
+            "check_in": (check_in + timedelta(days=offset)).isoformat(),
+            "check_out": (check_in + timedelta(days=offset + 2)).isoformat(),
+        }
+        assert client.post("/api/reservations", headers=headers, json=stay).status_code == 201
+
+    response = client.get("/api/reservations", headers=headers)
+    assert response.is_streamed
+    assert response.mimetype == "application/json"
+    history = response.get_json()
+    assert len(history) == seeded + len(room_types)
+    booked = {(check_in + timedelta(days=offset)).isoformat() for offset in range(len(room_types))}
+    assert booked <= {reservation["check_in"] for reservation in history}
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from scripts.generar_matriz_rpn import COLUMNAS_SALIDA, generar_matriz_desde_archivo
+
+
+def test_matrix_from_inventory_classifies_risk_by_rpn(tmp_path):
+    inventario = pd.DataFrame(
+        {
+            "Funcionalidad": ["A", "B", "C", "D", "E"],
+            "Severidad": [10, 5, 5, 4, 1],
+            "Ocurrencia": [6, 5, 4, 5, 1],
+            "Deteccion": [5, 8, 6, 6, 1],
+        }
+    )
+    origen = tmp_path / "inventario.csv"
+    inventario.to_csv(origen, index=False)
+    destino = tmp_path / "matriz.xlsx"
+
+    assert generar_matriz_desde_archivo(origen, destino, filas_por_bloque=2) == 5
+
+    matriz = pd.read_excel(destino)
+    assert list(matriz.columns) == COLUMNAS_SALIDA
+    assert matriz["RPN"].tolist() == [300, 200, 120, 120, 1]
+    assert matriz["Nivel_Riesgo"].tolist() == ["Critico", "Alto", "Medio", "Medio", "Bajo"]
+
+    origen_xlsx = tmp_path / "inventario.xlsx"
+    inventario.to_excel(origen_xlsx, index=False)
+    generar_matriz_desde_archivo(origen_xlsx, destino, filas_por_bloque=2)
+    assert pd.read_excel(destino).equals(matriz)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from metrics.almacen_defectos import DATASET_PATH
+from metrics.servicio_metricas import ESCENARIO_EJECUCION
+from metrics.sistema_metricas import MetricasTesting
+
+
+def _simular(metricas: MetricasTesting, defectos: pd.DataFrame):
+    snapshots = []
+    for indice, (fecha, defectos_dia) in enumerate(defectos.groupby("fecha")):
+        datos = ESCENARIO_EJECUCION[min(indice, len(ESCENARIO_EJECUCION) - 1)]
+        snapshot = metricas.registrar_dia(
+            fecha,
+            defectos_dia,
+            datos["plan"],
+            datos["exec"],
+            datos["pass"],
+            datos["fail"],
+            datos["auto"],
+        )
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def test_compact_mode_matches_string_mode():
+    defectos = pd.read_csv(DATASET_PATH)
+
+    normal = _simular(MetricasTesting(defectos), defectos)
+    compacto = MetricasTesting(defectos, compacto=True)
+    resultado = _simular(compacto, defectos)
+
+    assert resultado == normal
+    assert compacto.indicador_tiempo_promedio_resolucion() == (
+        MetricasTesting(defectos).indicador_tiempo_promedio_resolucion()
+    )
+
+
+def test_compact_mode_uses_integer_codes_and_less_memory():
+    defectos = pd.read_csv(DATASET_PATH)
+    normal = MetricasTesting(defectos)
+    compacto = MetricasTesting(defectos, compacto=True)
+    _simular(normal, defectos)
+    _simular(compacto, defectos)
+
+    assert list(compacto.defectos_observados.columns) == [
+        "estado",
+        "severidad",
+        "modulo",
+        "ambiente",
+        "dias_abierto",
+    ]
+    assert compacto.defectos_observados["estado"].dtype.kind == "i"
+    assert compacto.uso_memoria() * 5 < normal.uso_memoria()
+
+
+def test_compact_mode_extends_vocabulary_for_new_values():
+    defectos = pd.read_csv(DATASET_PATH)
+    metricas = MetricasTesting(defectos, compacto=True)
+    nuevo = defectos.head(1).assign(modulo="Checkin", estado="Resuelto")
+
+    metricas.registrar_dia("2099-01-01", nuevo, 10, 10, 10, 0, 5)
+
+    assert "Checkin" in metricas.vocabulario["modulo"]
+    assert metricas.indicador_tasa_resolucion() == 1.0
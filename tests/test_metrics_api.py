@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+CABECERA = (
+    "defecto_id,fecha,modulo,severidad,tipo,estado,reportado_por,"
+    "dias_abierto,prioridad,ambiente,ciclo,version\n"
+)
+
+
+def _fila(defecto_id: int, fecha: str, estado: str = "Abierto") -> str:
+    return (
+        f"D{defecto_id:04d},{fecha},Pagos,Alto,Funcional,{estado},Ana Perez,"
+        f"{0 if estado == 'Resuelto' else 2},P2,QA,Sprint 1,v1.0\n"
+    )
+
+
+@pytest.fixture()
+def dataset(tmp_path):
+    ruta = tmp_path / "defectos.csv"
+    ruta.write_text(
+        CABECERA
+        + _fila(1, "2025-10-01")
+        + _fila(2, "2025-10-01", "Resuelto")
+        + _fila(3, "2025-10-02")
+        + _fila(4, "2025-10-03"),
+        encoding="utf-8",
+    )
+    return ruta
+
+
+@pytest.fixture()
+def app_config(dataset):
+    return {"METRICS_DATASET_PATH": str(dataset)}
+
+
+def test_metrics_api_returns_snapshot_series(client):
+    response = client.get("/dashboards/api/metrics")
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload["count"] == 3
+    assert [s["dia"] for s in payload["snapshots"]] == [
+        "2025-10-01",
+        "2025-10-02",
+        "2025-10-03",
+    ]
+    assert payload["snapshots"][-1]["defectos_abiertos"] == 3
+    criterios = payload["snapshots"][-1]["criterios_salida_ok"]
+    assert set(criterios["criticos_cerrados"]) == {"nombre", "cumplido", "detalle"}
+
+
+def test_metrics_api_filters_by_range(client):
+    response = client.get(
+        "/dashboards/api/metrics", query_string={"from": "2025-10-02", "to": "2025-10-02"}
+    )
+    payload = response.get_json()
+    assert payload["count"] == 1
+    assert payload["snapshots"][0]["dia"] == "2025-10-02"
+
+    bad = client.get("/dashboards/api/metrics", query_string={"from": "02/10/2025"})
+    assert bad.status_code == 400
+
+
+def test_metrics_api_refreshes_incrementally(app, client, dataset):
+    client.get("/dashboards/api/metrics")
+    servicio = app.extensions["metricas_en_vivo"]
+    metricas = servicio.metricas
+
+    with dataset.open("a", encoding="utf-8") as archivo:
+        archivo.write(_fila(5, "2025-10-04", "Resuelto"))
+
+    payload = client.get("/dashboards/api/metrics").get_json()
+    assert payload["count"] == 4
+    assert servicio.metricas is metricas
+
+    with dataset.open("a", encoding="utf-8") as archivo:
+        archivo.write(_fila(6, "2025-10-01"))
+
+    payload = client.get("/dashboards/api/metrics").get_json()
+    assert payload["count"] == 4
+    assert payload["snapshots"][-1]["defectos_abiertos"] == 4
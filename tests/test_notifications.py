@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import socket
+from datetime import date, timedelta
+from email import message_from_bytes, policy
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from helynota.database import db  # noqa: E402
+from helynota.models import OutboxEvent  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Inbox:
+    """aiosmtpd handler keeping received messages; can refuse or reject the first N."""
+
+    def __init__(self, refuse=0, reject=0):
+        self.refuse = refuse
+        self.reject = reject
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        if self.refuse:
+            self.refuse -= 1
+            return "451 Try again later"
+        if self.reject:
+            self.reject -= 1
+            return "554 Message rejected"
+        self.messages.append(message_from_bytes(envelope.content, policy=policy.default))
+        return "250 OK"
+
+
+@pytest.fixture()
+def inbox():
+    handler = Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture()
+def app_config(inbox, tmp_path):
+    return {
+        # Workers render in their own threads: they need their own
+        # connections, not the shared in-memory one.
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hotel.db'}",
+        "NOTIFICATIONS_ENABLED": True,
+        "NOTIFICATIONS_WORKERS": 1,
+        "NOTIFICATIONS_RETRY_DELAY": 0.0,
+        "SMTP_PORT": inbox[1],
+    }
+
+
+@pytest.fixture()
+def notifications(app):
+    service = app.extensions["notifications"]
+    yield service
+    service.stop()
+
+
+def pay(client, headers, offset, force_failure=False):
+    check_in = date.today() + timedelta(days=offset)
+    reservation = client.post(
+        "/api/reservations",
+        headers=headers,
+        json={
+            "room_type_id": 3,
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+        },
+    ).get_json()
+    response = client.post(
+        "/api/payments/simulate",
+        headers=headers,
+        json={"reservation_id": reservation["reservation_id"], "force_failure": force_failure},
+    )
+    assert response.status_code == 200
+    return reservation["reservation_id"]
+
+
+def deliver(app, notifications):
+    while app.extensions["outbox"].dispatch_once():
+        pass
+    assert notifications.flush()
+
+
+def test_confirmation_and_cancellation_emails(app, client, inbox, notifications, auth_headers):
+    headers = auth_headers(client)
+    handler, _ = inbox
+    confirmed = pay(client, headers, 30)
+    cancelled = pay(client, headers, 40, force_failure=True)
+    # Nothing is sent on the request path.
+    assert handler.messages == []
+
+    deliver(app, notifications)
+    subjects = {message["Subject"] for message in handler.messages}
+    assert subjects == {f"Reserva #{confirmed} confirmada", f"Reserva #{cancelled} cancelada"}
+    assert {message["To"] for message in handler.messages} == {"cliente@hotel.test"}
+    body = next(m for m in handler.messages if "confirmada" in m["Subject"]).get_content()
+    assert "Hola cliente" in body and "Suite" in body and "SIM-" in body
+
+    # Redelivered outbox events do not send twice.
+    with app.app_context():
+        db.session.execute(db.update(OutboxEvent).values(dispatched_at=None))
+        db.session.commit()
+    deliver(app, notifications)
+    assert len(handler.messages) == 2
+
+
+def test_connection_is_reused_across_batches(app, client, inbox, notifications, auth_headers):
+    headers = auth_headers(client)
+    handler, _ = inbox
+    for offset in range(3):
+        pay(client, headers, 30 + offset * 5)
+        deliver(app, notifications)
+    assert len(handler.messages) == 3
+    assert notifications.stats()["connections_opened"] == 1
+    assert len(handler.sessions) == 1
+    assert notifications.stats()["messages_per_second"] > 0
+
+
+def test_transient_failures_are_retried(app, client, inbox, notifications, auth_headers):
+    headers = auth_headers(client)
+    handler, _ = inbox
+    handler.refuse = 2
+    pay(client, headers, 30)
+    deliver(app, notifications)
+    assert len(handler.messages) == 1
+    stats = notifications.stats()
+    assert (stats["sent"], stats["failed"], stats["retries"]) == (1, 0, 2)
+
+
+def test_permanent_rejections_do_not_hold_up_the_batch(app, client, inbox, notifications, auth_headers):
+    headers = auth_headers(client)
+    handler, _ = inbox
+    handler.reject = 1
+    for offset in range(3):
+        pay(client, headers, 30 + offset * 5)
+    deliver(app, notifications)
+    assert len(handler.messages) == 2
+    stats = notifications.stats()
+    assert (stats["sent"], stats["failed"], stats["retries"]) == (2, 1, 0)
+    # The rejected message is not worth retrying: the events are dispatched.
+    assert app.extensions["outbox"].pending() == 0
+
+
+def test_unreachable_server_leaves_the_event_in_the_outbox(app, client, inbox, notifications, auth_headers):
+    headers = auth_headers(client)
+    handler, port = inbox
+    notifications.pool.port = _free_port()
+    pay(client, headers, 30)
+    deliver(app, notifications)
+    stats = notifications.stats()
+    assert (stats["sent"], stats["failed"], stats["deferred"], stats["retries"]) == (0, 0, 1, 3)
+    assert app.extensions["outbox"].pending() == 2  # the whole batch is held back
+
+    # Once the server is back, the outbox delivers the event again.
+    notifications.pool.port = port
+    with app.app_context():
+        db.session.execute(db.update(OutboxEvent).values(claimed_until=None))
+        db.session.commit()
+    deliver(app, notifications)
+    assert len(handler.messages) == 1
+    assert app.extensions["outbox"].pending() == 0
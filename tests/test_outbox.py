@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from helynota import create_app
+from helynota.database import db
+from helynota.models import OutboxEvent
+from helynota.outbox import LocalBroker, NDJSONFileSink, OutboxDispatcher, Sink
+from helynota.seed import seed_initial_data
+
+
+@pytest.fixture()
+def app_config(tmp_path):
+    return {"OUTBOX_SINKS": ["broker", f"ndjson:{tmp_path / 'events.ndjson'}"], "OUTBOX_BATCH_SIZE": 2}
+
+
+def book_and_pay(client, headers, offset=30, force_failure=False):
+    check_in = date.today() + timedelta(days=offset)
+    reservation = client.post(
+        "/api/reservations",
+        headers=headers,
+        json={
+            "room_type_id": 1,
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+        },
+    ).get_json()
+    client.post(
+        "/api/payments/simulate",
+        headers=headers,
+        json={"reservation_id": reservation["reservation_id"], "force_failure": force_failure},
+    )
+    return reservation["reservation_id"]
+
+
+def pending_events(app):
+    with app.app_context():
+        return db.session.scalars(
+            db.select(OutboxEvent).where(OutboxEvent.dispatched_at.is_(None)).order_by(OutboxEvent.id)
+        ).all()
+
+
+def test_changes_are_recorded_in_the_outbox(app, client, auth_headers):
+    headers = auth_headers(client)
+    confirmed = book_and_pay(client, headers)
+    cancelled = book_and_pay(client, headers, offset=40, force_failure=True)
+
+    events = pending_events(app)
+    assert [(e.topic, e.aggregate_id) for e in events] == [
+        ("reservation.created", confirmed),
+        ("reservation.confirmed", confirmed),
+        ("reservation.created", cancelled),
+        ("reservation.cancelled", cancelled),
+    ]
+    assert events[1].payload["status"] == "confirmed"
+    assert events[1].payload["payment"]["status"] == "success"
+    assert events[3].payload["payment"]["status"] == "failed"
+
+
+def test_dispatcher_delivers_batches_to_every_sink(app, client, auth_headers):
+    dispatcher = app.extensions["outbox"]
+    received = []
+    dispatcher.subscribe(received.append, "reservation.confirmed")
+    consumer = dispatcher.sink(LocalBroker).subscribe("reservation.")
+    headers = auth_headers(client)
+    book_and_pay(client, headers)
+    book_and_pay(client, headers, offset=40)
+
+    assert [dispatcher.dispatch_once() for _ in range(3)] == [2, 2, 0]
+    assert not pending_events(app)
+    assert [e.topic for e in received] == ["reservation.confirmed", "reservation.confirmed"]
+    assert consumer.qsize() == 4
+
+    lines = open(dispatcher.sink(NDJSONFileSink).path, encoding="utf-8").read().splitlines()
+    ids = [json.loads(line)["id"] for line in lines]
+    assert ids == sorted(ids) and len(ids) == 4
+
+
+class FlakySink(Sink):
+    def __init__(self):
+        self.fail = True
+        self.delivered = []
+
+    def deliver(self, events):
+        if self.fail:
+            raise ConnectionError("sink unavailable")
+        self.delivered.extend(events)
+
+
+def test_sinks_must_implement_deliver():
+    class Incomplete(Sink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_failed_batches_stay_claimed_and_are_retried(app, client, auth_headers):
+    flaky = FlakySink()
+    dispatcher = OutboxDispatcher(app, [flaky], batch_size=10)
+    other = OutboxDispatcher(app, [], batch_size=10)
+    book_and_pay(client, auth_headers(client))
+
+    assert dispatcher.dispatch_once() == 0
+    assert dispatcher.failures == 1
+    assert [e.attempts for e in pending_events(app)] == [1, 1]
+    # The backoff keeps the batch claimed: no other dispatcher takes it.
+    assert other.dispatch_once() == 0
+
+    with app.app_context():
+        db.session.execute(db.update(OutboxEvent).values(claimed_until=None))
+        db.session.commit()
+    flaky.fail = False
+    assert dispatcher.dispatch_once() == 2
+    assert [e.topic for e in flaky.delivered] == ["reservation.created", "reservation.confirmed"]
+
+
+def test_background_dispatcher_delivers_after_commit(tmp_path, auth_headers):
+    app = create_app(
+        {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hotel.db'}"}
+    )
+    with app.app_context():
+        db.create_all()
+        seed_initial_data()
+    dispatcher = app.extensions["outbox"]
+    confirmed = threading.Event()
+    dispatcher.subscribe(lambda event: confirmed.set(), "reservation.confirmed")
+    try:
+        client = app.test_client()
+        book_and_pay(client, auth_headers(client))
+        assert confirmed.wait(5)
+        assert dispatcher.running
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from helynota.database import db
+from helynota.models import RateRule, RoomType
+from helynota.pricing import CompiledRule, RateTable
+
+D = date(2030, 1, 7)  # a Monday
+
+
+def day(offset):
+    return D + timedelta(days=offset)
+
+
+RULES = [
+    CompiledRule("season", 1.5, start_date=day(10), end_date=day(19)),
+    CompiledRule("weekday", 1.2, weekdays=(4, 5)),
+    CompiledRule("occupancy", 1.1, min_occupancy=0.5),
+    CompiledRule("occupancy", 1.3, min_occupancy=0.8),
+]
+
+
+def brute_force(check_in, check_out):
+    total = 0.0
+    night = check_in
+    while night < check_out:
+        rate = 100.0
+        if day(10) <= night <= day(19):
+            rate *= 1.5
+        if night.weekday() in (4, 5):
+            rate *= 1.2
+        total += rate
+        night += timedelta(days=1)
+    return total
+
+
+def test_prefix_sums_match_a_night_by_night_sum():
+    table = RateTable(100.0, RULES, rooms=10, start=D, end=day(60))
+    rng = random.Random(39)
+    for _ in range(200):
+        first = rng.randrange(0, 59)
+        last = rng.randrange(first + 1, 60)
+        assert table.total(day(first), day(last)) == round(brute_force(day(first), day(last)), 2)
+
+
+def test_occupancy_uses_the_highest_tier_reached():
+    table = RateTable(100.0, RULES, rooms=10, start=D, end=day(30))
+    # Monday to Wednesday, no season or weekday rule applies.
+    assert table.total(day(0), day(2), occupancy=0.4) == 200.0
+    assert table.total(day(0), day(2), occupancy=0.5) == 220.0
+    assert table.total(day(0), day(2), occupancy=0.9) == 260.0
+
+
+def test_unknown_rule_kind_is_rejected():
+    with pytest.raises(ValueError):
+        CompiledRule.from_model(RateRule(kind="holiday", multiplier=2.0))
+
+
+def test_rate_tables_are_recompiled_only_for_changed_room_types(app):
+    pricing = app.extensions["pricing"]
+    with app.app_context():
+        assert len(pricing.refresh(db.session)) == 3
+        compilations = pricing.compilations
+
+        pricing.refresh(db.session)
+        assert pricing.compilations == compilations
+
+        suite = db.session.scalar(db.select(RoomType).filter_by(name="Suite"))
+        db.session.add(RateRule(room_type=suite, name="Fin de semana", kind="weekday", multiplier=1.5, weekdays="5"))
+        db.session.commit()
+        assert pricing.due()
+        assert pricing.refresh(db.session) == [suite.id]
+        assert pricing.compilations == compilations + 1
+
+        # Stays beyond the horizon are priced on their own; the table stays as compiled.
+        far = date.today() + timedelta(days=pricing.horizon_days + 30)
+        table = pricing._tables[suite.id]
+        assert pricing.stay_total(suite.id, far, far + timedelta(days=7)) == 220.0 * 6 + 330.0
+        assert pricing._tables[suite.id] is table and not table.covers(far, far + timedelta(days=7))
+
+
+def test_window_covers_the_bookable_horizon_and_rolls_daily(app):
+    pricing = app.extensions["pricing"]
+    today = [date.today()]
+    pricing.today = lambda: today[0]
+    nights = app.config["MAX_STAY_NIGHTS"]
+    with app.app_context():
+        suite_id = db.session.scalar(db.select(RoomType.id).filter_by(name="Suite"))
+        pricing.refresh(db.session)
+        # The latest check-in parse_stay accepts, for the longest stay.
+        last = today[0] + timedelta(days=pricing.horizon_days)
+        assert pricing._tables[suite_id].covers(last, last + timedelta(days=nights))
+
+        compilations = pricing.compilations
+        today[0] += timedelta(days=1)
+        assert pricing.due()
+        assert len(pricing.refresh(db.session)) == 3
+        assert pricing.compilations == compilations + 3
+        last += timedelta(days=1)
+        assert pricing._tables[suite_id].covers(last, last + timedelta(days=nights))
+        assert not pricing.due()
+
+
+def quote(client, check_in, check_out):
+    response = client.get(
+        "/api/rooms/search",
+        query_string={"check_in": check_in.isoformat(), "check_out": check_out.isoformat(), "room_type": "Suite"},
+    )
+    assert response.status_code == 200
+    return {room["stay_total"] for room in response.get_json()["available_rooms"]}
+
+
+def test_search_quotes_the_price_that_is_charged(app, client, auth_headers):
+    headers = auth_headers(client)
+    check_in = date.today() + timedelta(days=30)
+    check_out = check_in + timedelta(days=7)
+    assert quote(client, check_in, check_out) == {7 * 220.0}
+
+    with app.app_context():
+        suite = db.session.scalar(db.select(RoomType).filter_by(name="Suite"))
+        suite_id = suite.id
+        db.session.add_all(
+            [
+                RateRule(room_type=suite, name="Sábado", kind="weekday", multiplier=1.5, weekdays="5"),
+                RateRule(room_type=suite, name="Demanda", kind="occupancy", multiplier=2.0, min_occupancy=0.5),
+            ]
+        )
+        db.session.commit()
+
+    # Rule changes show up in the next search, cached or not.
+    (weekly,) = quote(client, check_in, check_out)
+    assert weekly == 6 * 220.0 + 330.0
+
+    stay = {"room_type_id": suite_id, "check_in": check_in.isoformat(), "check_out": check_out.isoformat()}
+    for _ in range(3):
+        (expected,) = quote(client, check_in, check_out)
+        response = client.post("/api/reservations", headers=headers, json=stay)
+        assert response.status_code == 201
+        assert response.get_json()["total_price"] == expected
+
+    # Three of six suites are taken: the occupancy tier doubles the price.
+    assert quote(client, check_in, check_out) == {2 * weekly}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import date, timedelta
+
+import pytest
+
+CHECK_IN = date.today() + timedelta(days=20)
+STAY = {"check_in": CHECK_IN.isoformat(), "check_out": (CHECK_IN + timedelta(days=2)).isoformat()}
+
+
+@pytest.fixture()
+def app_config(tmp_path):
+    return {
+        "PROFILING_ENABLED": True,
+        "PROFILING_DIR": str(tmp_path / "profiles"),
+        "PROFILING_SAMPLE_RATE": 0.0,
+        "PROFILING_SLOW_SECONDS": 0.2,
+        "PROFILING_SAMPLE_INTERVAL": 0.001,
+        "PROFILING_MAX_FILES": 3,
+    }
+
+
+def profiles(app):
+    directory = app.extensions["profiler"].directory
+    return [json.loads(path.read_text()) for path in sorted(directory.glob("*.json"))]
+
+
+def test_sampled_requests_are_profiled_with_cprofile(app, client):
+    app.extensions["profiler"].sample_rate = 0.5
+    app.extensions["profiler"].rng = lambda: 0.1
+    response = client.get("/api/rooms/search", query_string=STAY)
+    assert response.status_code == 200
+
+    (profile,) = profiles(app)
+    assert profile["endpoint"] == "api.search_rooms" and profile["status"] == 200
+    assert (profile["trigger"], profile["profiler"]) == ("sample", "cprofile")
+    assert profile["sql_queries"] >= 1 and profile["sql_seconds"] > 0
+    functions = {f["function"].split(" ")[0]: f for f in profile["functions"]}
+    assert functions["search_rooms"]["calls"] == 1
+
+
+def test_only_slow_requests_keep_their_stack_samples(app, client):
+    @app.get("/slow")
+    def slow_view():
+        time.sleep(0.3)
+        return "done"
+
+    assert client.get("/api/room-types").status_code == 200
+    assert profiles(app) == []
+
+    assert client.get("/slow").status_code == 200
+    (profile,) = profiles(app)
+    assert (profile["trigger"], profile["profiler"]) == ("slow", "sampling")
+    assert profile["elapsed_seconds"] >= 0.3 and profile["samples"] > 10
+    hottest = profile["functions"][0]
+    assert hottest["function"].startswith("slow_view ") and hottest["self_seconds"] > 0.1
+    stats = client.get("/api/stats").get_json()["profiling"]
+    assert stats == {"sampled": 0, "slow": 1, "written": 1}
+
+
+def test_old_profiles_rotate_and_the_report_aggregates_them(app, client):
+    profiler = app.extensions["profiler"]
+    profiler.sample_rate, profiler.rng = 1.0, lambda: 0.0
+    for _ in range(4):
+        client.get("/api/rooms/search", query_string=STAY)
+    client.get("/api/room-types")
+    assert [p["endpoint"] for p in profiles(app)] == ["api.search_rooms"] * 2 + ["api.list_room_types"]
+
+    result = app.test_cli_runner().invoke(args=["profiles-report", "--top", "3"])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    headers = sorted(line.split(",")[0] for line in lines if line.startswith("api."))
+    assert headers == ["api.list_room_types: 1 profiles", "api.search_rooms: 2 profiles"]
+    assert len([line for line in lines if line.startswith("  ") and "function" not in line]) == 3 + 3
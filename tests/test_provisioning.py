@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from helynota.database import db
+from helynota.models import User
+from helynota.provisioning import import_users
+
+
+@pytest.fixture()
+def app_config():
+    # Cheap hashes keep the tests fast; the default is werkzeug's scrypt.
+    return {"BULK_IMPORT_HASH_METHOD": "pbkdf2:sha256:1000", "BULK_IMPORT_CHUNK_SIZE": 2, "RATELIMIT_ENABLED": False}
+
+
+def guest(n, **extra):
+    return {"username": f"guest{n}", "email": f"guest{n}@corp.test", "password": f"secret{n}", **extra}
+
+
+def test_import_reports_bad_rows_and_creates_the_rest(app):
+    records = [
+        guest(1),
+        guest(2, email="not-an-email"),
+        {"username": "cliente", "email": "new@corp.test", "password": "x"},
+        guest(3),
+        guest(3, email="other@corp.test"),
+        {"username": "guest4", "email": "guest4@corp.test"},
+        guest(5, password="", password_hash=generate_password_hash("hashed", method="pbkdf2:sha256:1000")),
+        "guest6",
+    ]
+    with app.app_context():
+        result = import_users(db.session, records, chunk_size=2, hash_method="pbkdf2:sha256:1000")
+        assert (result.created, result.chunks) == (3, 2)
+        assert [(e.row, e.error) for e in result.errors] == [
+            (2, "email is not valid"),
+            (3, "username already exists"),
+            (5, "duplicate username in the import"),
+            (6, "username, email and password are required"),
+            (8, "row must be an object"),
+        ]
+        users = {u.username: u for u in db.session.scalars(db.select(User).filter(User.username.like("guest%")))}
+        assert sorted(users) == ["guest1", "guest3", "guest5"]
+        assert users["guest1"].check_password("secret1") and users["guest1"].is_active
+        assert users["guest5"].check_password("hashed")
+
+
+def test_chunk_colliding_with_a_concurrent_signup_is_retried(app, monkeypatch):
+    from helynota import provisioning
+
+    drop_taken = provisioning._drop_taken
+    calls = []
+
+    def register_meanwhile(session, rows, errors):
+        free = drop_taken(session, rows, errors)
+        calls.append(len(rows))
+        if len(calls) == 1:
+            session.add(User(username="guest2", email="guest2@corp.test", password_hash="x"))
+            session.commit()
+        return free
+
+    monkeypatch.setattr(provisioning, "_drop_taken", register_meanwhile)
+    with app.app_context():
+        result = import_users(db.session, [guest(1), guest(2)], chunk_size=10, hash_method="pbkdf2:sha256:1000")
+        assert result.created == 1 and calls == [2, 2]
+        assert [(e.row, e.error) for e in result.errors] == [(2, "username already exists")]
+
+
+def test_chunk_colliding_twice_is_reported_as_failed(app, monkeypatch):
+    from helynota import provisioning
+
+    drop_taken = provisioning._drop_taken
+
+    def register_meanwhile(session, rows, errors):
+        free = drop_taken(session, rows, errors)
+        # Take the last free account every time, so the retry collides too.
+        row = free[-1]
+        session.add(User(username=row.username, email=row.email, password_hash="x"))
+        session.commit()
+        return free
+
+    monkeypatch.setattr(provisioning, "_drop_taken", register_meanwhile)
+    with app.app_context():
+        result = import_users(db.session, [guest(1), guest(2)], chunk_size=10, hash_method="pbkdf2:sha256:1000")
+        assert result.created == 0
+        assert [(e.row, e.error) for e in result.errors] == [
+            (1, "account was taken during the import, try again"),
+            (2, "username already exists"),
+        ]
+
+
+def test_bulk_endpoint_accepts_json_and_csv(client, auth_headers):
+    headers = auth_headers(client, "admin", "admin123")
+    response = client.post("/api/users/bulk", headers=headers, json={"users": [guest(1), guest(2)]})
+    assert response.status_code == 201
+    assert response.get_json() == {"created": 2, "failed": 0, "errors": []}
+
+    csv_body = "username,email,password\nguest3,guest3@corp.test,pw3\nguest1,guest1@corp.test,pw1\n"
+    response = client.post("/api/users/bulk", headers=headers, data=csv_body, content_type="text/csv")
+    assert response.status_code == 201
+    assert response.get_json()["errors"] == [{"row": 2, "username": "guest1", "error": "username already exists"}]
+    assert client.post("/api/auth/login", json={"username": "guest3", "password": "pw3"}).status_code == 200
+
+    response = client.post("/api/users/bulk", headers=headers, json=[guest(1)])
+    assert response.status_code == 422
+
+
+def test_bulk_endpoint_is_for_provisioning_admins(client, auth_headers):
+    assert client.post("/api/users/bulk", json=[guest(1)]).status_code == 401
+    headers = auth_headers(client)
+    assert client.post("/api/users/bulk", headers=headers, json=[guest(1)]).status_code == 403
+
+    headers = auth_headers(client, "admin", "admin123")
+    response = client.post("/api/users/bulk", headers=headers, json={"users": "guest1"})
+    assert response.status_code == 400 and response.get_json()["error"] == "users must be a list"
+    response = client.post("/api/users/bulk", headers=headers, json=[])
+    assert response.get_json()["error"] == "between 1 and 10000 users per request"
+
+
+def test_bulk_endpoint_limits_passwords_to_hash(app, client, auth_headers):
+    app.config["BULK_IMPORT_MAX_PLAINTEXT_ROWS"] = 2
+    headers = auth_headers(client, "admin", "admin123")
+    response = client.post("/api/users/bulk", headers=headers, json=[guest(1), guest(2), guest(3)])
+    assert response.status_code == 400
+    assert response.get_json()["error"] == (
+        "at most 2 users with a plaintext password per request; use flask import-users"
+    )
+    hashed = generate_password_hash("pw", method="pbkdf2:sha256:1000")
+    records = [guest(1), guest(2), guest(3, password="", password_hash=hashed)]
+    assert client.post("/api/users/bulk", headers=headers, json=records).status_code == 201
+
+
+def test_import_users_command(app, tmp_path):
+    path = tmp_path / "guests.json"
+    path.write_text(json.dumps([guest(1), guest(1)]))
+    result = app.test_cli_runner().invoke(args=["import-users", str(path)])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        "row 2 (guest1): duplicate username in the import",
+        "Created 1 users, 1 rows failed",
+    ]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from helynota.rate_limit import (
+    AdmissionController,
+    MemoryBucketStore,
+    RateLimit,
+    RateLimiter,
+    SQLiteBucketStore,
+)
+
+
+@pytest.fixture()
+def app_config():
+    return {"RATELIMIT_LIMITS": {"api.search_rooms": "3/minute", "api.login": "2/minute"}}
+
+
+def search_query():
+    check_in = date.today() + timedelta(days=14)
+    return {"check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat()}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / "buckets.db"))
+
+
+def test_rate_limit_parsing():
+    assert RateLimit.parse("10/minute") == RateLimit(10 / 60, 10)
+    with pytest.raises(ValueError):
+        RateLimit.parse("10 per minute")
+
+
+def test_token_bucket_allows_burst_then_refills(store):
+    clock = FakeClock()
+    limiter = RateLimiter(store, {"search": RateLimit(1.0, 2)}, clock)
+
+    assert limiter.check("search", "10.0.0.1") == 0
+    assert limiter.check("search", "10.0.0.1") == 0
+    assert limiter.check("search", "10.0.0.1") == pytest.approx(1.0)
+    # Other clients and unprotected endpoints have their own budget.
+    assert limiter.check("search", "10.0.0.2") == 0
+    assert limiter.check("health", "10.0.0.1") == 0
+
+    clock.now += 1.0
+    assert limiter.check("search", "10.0.0.1") == 0
+    assert limiter.check("search", "10.0.0.1") > 0
+
+
+def test_token_and_ip_buckets_both_apply(store):
+    limiter = RateLimiter(store, {"search": RateLimit(0.1, 1)}, FakeClock())
+
+    assert limiter.check("search", "10.0.0.1", "Bearer abc") == 0
+    # Same token from a new IP, and a new token from the same IP, are limited.
+    assert limiter.check("search", "10.0.0.2", "Bearer abc") > 0
+    assert limiter.check("search", "10.0.0.1", "Bearer xyz") > 0
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    clock = FakeClock()
+    limit = {"login": RateLimit(0.01, 1)}
+
+    assert RateLimiter(SQLiteBucketStore(path), limit, clock).check("login", "10.0.0.1") == 0
+    assert RateLimiter(SQLiteBucketStore(path), limit, clock).check("login", "10.0.0.1") > 0
+
+
+def test_memory_store_prunes_oldest_buckets():
+    store = MemoryBucketStore(max_keys=10)
+    limiter = RateLimiter(store, {"search": RateLimit(1.0, 1)}, FakeClock())
+    for client in range(25):
+        limiter.check("search", f"10.0.0.{client}")
+    assert len(store._buckets) <= 10
+
+
+def test_admission_sheds_on_queue_depth_and_latency():
+    admission = AdmissionController(max_in_flight=4, latency_target=0.1)
+    assert all(admission.try_acquire() for _ in range(4))
+    assert not admission.try_acquire()
+
+    for _ in range(4):
+        admission.release(1.0)
+    # Slow responses halve the cap, but one request always gets through.
+    assert admission.try_acquire() and admission.try_acquire()
+    assert not admission.try_acquire()
+    assert admission.stats()["shed"] == 2
+
+
+def test_search_returns_429_with_retry_after(client):
+    responses = [client.get("/api/rooms/search", query_string=search_query()) for _ in range(4)]
+
+    assert [r.status_code for r in responses] == [200, 200, 200, 429]
+    assert responses[-1].get_json() == {"error": "Too many requests"}
+    assert int(responses[-1].headers["Retry-After"]) >= 1
+
+    other_ip = client.get(
+        "/api/rooms/search", query_string=search_query(), environ_base={"REMOTE_ADDR": "10.9.9.9"}
+    )
+    assert other_ip.status_code == 200
+    # Unprotected endpoints are not limited.
+    assert client.get("/api/room-types").status_code == 200
+
+
+def test_login_is_rate_limited(client):
+    credentials = {"username": "cliente", "password": "incorrecta"}
+    statuses = [client.post("/api/auth/login", json=credentials).status_code for _ in range(3)]
+    assert statuses == [401, 401, 429]
+
+
+def test_overloaded_server_returns_503(app, client):
+    admission = app.extensions["request_guard"].admission
+    admission.max_in_flight = 0
+
+    response = client.get("/api/rooms/search", query_string=search_query())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_admission_slot_is_released_after_each_request(app, client):
+    client.get("/api/rooms/search", query_string=search_query())
+    stats = app.extensions["request_guard"].admission.stats()
+    assert stats["in_flight"] == 0
+    assert stats["latency_ms"] > 0
+
+
+def test_guard_can_be_disabled(app_config):
+    from helynota import create_app
+
+    app = create_app({"TESTING": True, "RATELIMIT_ENABLED": False, **app_config})
+    assert "request_guard" not in app.extensions
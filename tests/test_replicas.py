@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from helynota.database import db
+
+CHECK_IN = date.today() + timedelta(days=30)
+STAY = {"check_in": CHECK_IN.isoformat(), "check_out": (CHECK_IN + timedelta(days=2)).isoformat()}
+
+
+@pytest.fixture()
+def app_config(tmp_path):
+    return {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hotel.db'}",
+        # A separate file stands in for a replica that lags behind.
+        "READ_REPLICA_URI": f"sqlite:///{tmp_path / 'replica.db'}",
+        "SEARCH_CACHE_ENABLED": False,
+        "RATELIMIT_ENABLED": False,
+    }
+
+
+@pytest.fixture()
+def clock(app):
+    now = [1000.0]
+    app.extensions["read_replica"].clock = lambda: now[0]
+    return now
+
+
+def replicate(tmp_path):
+    with sqlite3.connect(tmp_path / "hotel.db") as primary, sqlite3.connect(tmp_path / "replica.db") as replica:
+        primary.backup(replica)
+
+
+def free_suites(client):
+    return client.get("/api/rooms/search", query_string={**STAY, "room_type": "Suite"}).get_json()["count"]
+
+
+def test_reads_go_to_the_replica_except_right_after_a_write(app, client, clock, tmp_path, auth_headers):
+    replicate(tmp_path)
+    router = app.extensions["read_replica"]
+    suites = free_suites(client)
+    assert router.stats()["replica_reads"] == 1
+
+    headers = auth_headers(client)
+    response = client.post("/api/reservations", headers=headers, json={"room_type_id": 3, **STAY})
+    assert response.status_code == 201
+    reservation_id = response.get_json()["reservation_id"]
+
+    # Read-your-writes: the client that wrote reads the primary for a while...
+    assert free_suites(client) == suites - 1
+    listed = client.get("/api/reservations", headers=headers).get_json()
+    assert reservation_id in [r["id"] for r in listed]
+    assert router.stats()["primary_reads"] == 2
+
+    # ...then goes back to the replica, which has not caught up. The
+    # session token is only on the primary: authentication does not use
+    # the replica.
+    clock[0] += router.sticky_seconds + 1
+    assert free_suites(client) == suites
+    listed = client.get("/api/reservations", headers=headers)
+    assert listed.status_code == 200
+    assert reservation_id not in [r["id"] for r in listed.get_json()]
+
+    replicate(tmp_path)
+    assert free_suites(client) == suites - 1
+    assert client.get("/api/stats").get_json()["read_replica"]["replica_reads"] == 4
+
+
+@pytest.fixture()
+def cached_search(app_config):
+    app_config["SEARCH_CACHE_ENABLED"] = True
+    return app_config
+
+
+def test_lagging_replica_reads_are_not_cached(cached_search, app, client, clock, tmp_path, auth_headers):
+    replicate(tmp_path)
+    cache = app.extensions["search_cache"]
+    headers = auth_headers(client)
+    suites = free_suites(client)
+    response = client.post("/api/reservations", headers=headers, json={"room_type_id": 3, **STAY})
+    assert response.status_code == 201
+
+    # The booking invalidated the cache; the replica has not seen it yet.
+    clock[0] += app.extensions["read_replica"].sticky_seconds + 1
+    assert free_suites(client) == suites
+    assert cache.stats()["entries"] == 0
+
+    replicate(tmp_path)
+    assert free_suites(client) == suites - 1
+    assert cache.stats()["hits"] == 0
+
+
+def test_writes_use_the_primary_outside_the_sticky_window(app, client, clock, tmp_path, auth_headers):
+    replicate(tmp_path)
+    headers = auth_headers(client)
+    reservation_id = client.post(
+        "/api/reservations", headers=headers, json={"room_type_id": 3, **STAY}
+    ).get_json()["reservation_id"]
+    clock[0] += 60
+    response = client.post(
+        "/api/payments/simulate", headers=headers, json={"reservation_id": reservation_id}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["reservation_status"] == "confirmed"
+
+
+@pytest.fixture()
+def readonly_replica(app_config, tmp_path):
+    app_config["READ_REPLICA_URI"] = f"sqlite:///file:{tmp_path / 'hotel.db'}?mode=ro&uri=true"
+    return app_config
+
+
+def test_read_only_connection_to_the_same_file(readonly_replica, app, client):
+    assert free_suites(client) > 0
+    assert app.extensions["read_replica"].stats()["replica_reads"] == 1
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        with app.extensions["read_replica"].engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("DELETE FROM reservations"))
+
+
+def test_async_mode_routes_reads_too(readonly_replica, app):
+    pytest.importorskip("aiosqlite")
+    from test_asgi import AsgiApi
+
+    from helynota.asgi import create_asgi_app
+
+    api = AsgiApi(create_asgi_app({"TESTING": True, **readonly_replica}))
+    try:
+        status, payload = api.request("GET", "/api/rooms/search", query={**STAY, "room_type": "Suite"})
+        assert status == 200 and payload["count"] > 0
+        router = api.app.flask_app.extensions["read_replica"]
+        assert router.stats()["replica_reads"] == 1
+
+        status, payload = api.request(
+            "POST", "/api/auth/login", json={"username": "cliente", "password": "cliente123"}
+        )
+        assert status == 200
+        api.request("GET", "/api/room-types")
+        assert router.stats()["primary_reads"] == 1
+    finally:
+        api.loop.run_until_complete(api.app.replica_engine.dispose())
+        api.close()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from metrics.almacen_defectos import DATASET_PATH
+from metrics.resumen import exportar_resumen, leer_resumen, resumen_dataframe
+from metrics.servicio_metricas import ESCENARIO_EJECUCION
+from metrics.sistema_metricas import MetricasTesting
+
+
+@pytest.fixture(scope="module")
+def snapshots():
+    defectos = pd.read_csv(DATASET_PATH)
+    metricas = MetricasTesting(defectos, compacto=True)
+    for indice, (fecha, defectos_dia) in enumerate(list(defectos.groupby("fecha"))[:4]):
+        datos = ESCENARIO_EJECUCION[indice]
+        metricas.registrar_dia(
+            fecha,
+            defectos_dia,
+            datos["plan"],
+            datos["exec"],
+            datos["pass"],
+            datos["fail"],
+            datos["auto"],
+        )
+    return metricas.snapshots
+
+
+def test_summary_flattens_exit_criteria_into_typed_columns(snapshots):
+    resumen = resumen_dataframe(snapshots)
+
+    assert "criterios_salida_ok" not in resumen.columns
+    assert str(resumen["criterio_criticos_cerrados_ok"].dtype) == "boolean"
+    assert str(resumen["criterio_criticos_cerrados_detalle"].dtype) == "string"
+    assert str(resumen["defectos_abiertos"].dtype) == "Int64"
+    # El primer día aún no tiene criterios evaluados.
+    assert resumen["criterio_criticos_cerrados_ok"].isna().tolist() == [True, False, False, False]
+
+
+@pytest.mark.parametrize("extension", ["csv", "ndjson", "parquet"])
+def test_summary_round_trips_through_every_format(snapshots, tmp_path, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    destino = tmp_path / f"resumen.{extension}"
+
+    exportar_resumen(snapshots, destino)
+
+    pd.testing.assert_frame_equal(
+        leer_resumen(destino), resumen_dataframe(snapshots), check_dtype=True
+    )
+
+
+def test_reader_concatenates_a_directory_of_summaries(snapshots, tmp_path):
+    exportar_resumen(snapshots[:2], tmp_path / "2025-10.csv")
+    exportar_resumen(snapshots[2:], tmp_path / "2025-11.ndjson")
+
+    assert len(leer_resumen(tmp_path)) == len(snapshots)
@@ -0,0 +1,218 @@
+"""Regression tests for how the booking endpoints scale.
+
+Two kinds of check:
+
+* SQL statements per request, which must not grow with the number of
+  rooms or reservations (an N+1 query coming back fails here). These
+  always run.
+* Timings on hotels with 10^4 to 10^6 reservations. They take minutes, so
+  they only run with ``HELYNOTA_SCALE_TESTS`` set to the largest history
+  to build, at least 10^5, e.g. ``HELYNOTA_SCALE_TESTS=1000000 pytest tests/test_scale.py``.
+  Each endpoint's median latency may grow at most with the square root of
+  the history size relative to the 10^4 baseline: index lookups pass
+  easily, a scan that is linear in the history does not.
+"""
+from __future__ import annotations
+
+import math
+import os
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+import pytest
+from sqlalchemy import event, insert
+
+from helynota import create_app
+from helynota.archive import archive_reservations
+from helynota.database import db
+from helynota.models import Reservation, Room, RoomType, User
+from helynota.seed import seed_initial_data
+
+TODAY = date.today()
+STAY = {
+    "check_in": (TODAY + timedelta(days=30)).isoformat(),
+    "check_out": (TODAY + timedelta(days=33)).isoformat(),
+}
+
+
+@pytest.fixture()
+def app_config():
+    return {"RATELIMIT_ENABLED": False, "SEARCH_CACHE_ENABLED": False}
+
+
+@contextmanager
+def counting_statements(app) -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def add_rooms(count: int) -> None:
+    room_types = db.session.scalars(db.select(RoomType)).all()
+    db.session.add_all(
+        Room(room_number=f"R{n}", floor=2 + n // 50, room_type=room_types[n % len(room_types)])
+        for n in range(count)
+    )
+    db.session.commit()
+
+
+def add_history(count: int, username: str = "historial", seed: int = 0, batch: int = 50_000) -> None:
+    """``count`` stays, back to back per room, going back in time from 60 days ahead."""
+    rng = random.Random(seed)
+    user = db.session.scalar(db.select(User).filter_by(username=username))
+    if user is None:
+        user = User(username=username, email=f"{username}@hotel.test", password_hash="!")
+        db.session.add(user)
+        db.session.flush()
+    room_ids = db.session.scalars(db.select(Room.id)).all()
+    per_room = -(-count // len(room_ids))
+    rows: List[Dict[str, object]] = []
+    for index in range(count):
+        room_id = room_ids[index // per_room]
+        if index % per_room == 0:
+            night = TODAY + timedelta(days=60)
+        check_out = night - timedelta(days=rng.randrange(4))
+        night = check_out - timedelta(days=rng.randint(1, 5))
+        rows.append(
+            {
+                "user_id": user.id,
+                "room_id": room_id,
+                "check_in": night,
+                "check_out": check_out,
+                "status": rng.choice(("confirmed",) * 17 + ("cancelled", "cancelled", "expired")),
+                "total_price": 100.0,
+            }
+        )
+        if len(rows) == batch:
+            db.session.execute(insert(Reservation), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Reservation), rows)
+    db.session.commit()
+
+
+def statements_per_request(app, client, headers) -> Dict[str, int]:
+    counts = {}
+    requests = {
+        "search": lambda: client.get("/api/rooms/search", query_string=STAY),
+        "list": lambda: client.get("/api/reservations", headers=headers),
+        "book": lambda: client.post("/api/reservations", headers=headers, json={"room_type_id": 2, **STAY}),
+    }
+    for name, send in requests.items():
+        send()  # warm the per-process caches (pricing rules, sessions)
+        with counting_statements(app) as statements:
+            response = send()
+            response.get_data()  # the reservation list is streamed
+            assert response.status_code < 400
+        counts[name] = len(statements)
+    return counts
+
+
+def test_statements_per_request_do_not_grow_with_the_hotel(app, client, auth_headers):
+    headers = auth_headers(client)
+    small = statements_per_request(app, client, headers)
+
+    with app.app_context():
+        add_rooms(100)
+        add_history(2_000)
+        add_history(40, username="cliente", seed=1)
+        archive_reservations(db.session, TODAY - timedelta(days=30), batch_size=500)
+    assert statements_per_request(app, client, headers) == small
+
+
+# -- timings ----------------------------------------------------------------
+
+SCALE = int(os.environ.get("HELYNOTA_SCALE_TESTS") or 0)
+BASELINE = 10_000
+SIZES = [size for size in (100_000, 1_000_000) if size <= SCALE]
+ROOMS = 200
+REPEAT = 15
+
+scale = pytest.mark.skipif(
+    not SIZES, reason="set HELYNOTA_SCALE_TESTS to the largest history to test, at least 100000"
+)
+
+
+def measure(tmp_path_factory, auth_headers, size: int) -> Dict[str, float]:
+    """Median seconds per endpoint on a hotel with ``ROOMS`` rooms and ``size`` reservations."""
+    path = tmp_path_factory.mktemp(f"scale-{size}") / "hotel.db"
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "OUTBOX_DISPATCHER": False,
+            "HOLD_EXPIRY_SCHEDULER": False,
+            "RATELIMIT_ENABLED": False,
+            "SEARCH_CACHE_ENABLED": False,
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        seed_initial_data()
+        add_rooms(ROOMS - db.session.scalar(db.select(db.func.count(Room.id))))
+        add_history(size)
+        add_history(20, username="cliente", seed=1)
+
+    client = app.test_client()
+    headers = auth_headers(client)
+    rng = random.Random(size)
+
+    def stay() -> Dict[str, str]:
+        check_in = TODAY + timedelta(days=rng.randint(1, 90))
+        return {"check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=3)).isoformat()}
+
+    requests = {
+        "search": lambda: client.get("/api/rooms/search", query_string=stay()),
+        "book": lambda: client.post("/api/reservations", headers=headers, json={"room_type_id": 3, **stay()}),
+        "list": lambda: client.get("/api/reservations", headers=headers),
+    }
+    medians = {}
+    for name, send in requests.items():
+        send().get_data()
+        timings = []
+        for _ in range(REPEAT):
+            started = time.perf_counter()
+            response = send()
+            response.get_data()
+            timings.append(time.perf_counter() - started)
+            assert response.status_code < 400 or response.status_code == 409
+        medians[name] = statistics.median(timings)
+    with app.app_context():
+        db.engine.dispose()
+    return medians
+
+
+@pytest.fixture(scope="module")
+def timings(tmp_path_factory, auth_headers) -> Dict[int, Dict[str, float]]:
+    cache: Dict[int, Dict[str, float]] = {}
+
+    class Timings(dict):
+        def __missing__(self, size):
+            self[size] = measure(tmp_path_factory, auth_headers, size)
+            return self[size]
+
+    return Timings(cache)
+
+
+@scale
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("endpoint", ["search", "book", "list"])
+def test_latency_grows_sublinearly_with_history(timings, size, endpoint):
+    baseline, measured = timings[BASELINE][endpoint], timings[size][endpoint]
+    allowed = math.sqrt(size / BASELINE)
+    assert measured <= baseline * allowed, (
+        f"{endpoint}: {measured * 1000:.1f} ms with {size} reservations,"
+        f" {baseline * 1000:.1f} ms with {BASELINE} (at most x{allowed:.1f})"
+    )
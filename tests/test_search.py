@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from helynota.database import db
+from helynota.models import RateRule, Room, RoomType
+
+CHECK_IN = date.today() + timedelta(days=20)
+STAY = {"check_in": CHECK_IN.isoformat(), "check_out": (CHECK_IN + timedelta(days=2)).isoformat()}
+
+
+def search(client, **params):
+    response = client.get("/api/rooms/search", query_string={**STAY, **params})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["available_rooms"]
+
+
+def test_room_type_is_an_exact_match(client):
+    rooms = search(client, room_type="Suite")
+    assert len(rooms) == 6 and {r["room_type"] for r in rooms} == {"Suite"}
+    assert search(client, room_type="suite") == []
+    assert search(client, room_type="Sui") == []
+
+
+def test_guests_filter_and_rank_by_best_fit(client):
+    rooms = search(client, guests=2)
+    assert [r["room_type"] for r in rooms] == ["Doble"] * 6 + ["Suite"] * 6
+    assert all(r["capacity"] >= 2 for r in rooms)
+    assert search(client, guests=5) == []
+
+
+def test_price_bounds_sort_and_limit(client):
+    rooms = search(client, sort="-price", limit=3)
+    assert [r["room_type"] for r in rooms] == ["Suite"] * 3
+    assert [r["room_id"] for r in rooms] == sorted(r["room_id"] for r in rooms)
+
+    rooms = search(client, min_price=100, max_price=200, sort="price")
+    assert {r["nightly_rate"] for r in rooms} == {120.0}
+
+
+def test_floor_filter(app, client):
+    with app.app_context():
+        suite = db.session.scalar(db.select(RoomType).filter_by(name="Suite"))
+        db.session.add_all(Room(room_number=str(n), floor=2, room_type=suite) for n in (201, 202))
+        db.session.commit()
+    rooms = search(client, floor=2)
+    assert [(r["room_number"], r["floor"]) for r in rooms] == [("201", 2), ("202", 2)]
+
+
+def test_limited_searches_price_occupancy_on_all_free_rooms(app, client):
+    with app.app_context():
+        suite = db.session.scalar(db.select(RoomType).filter_by(name="Suite"))
+        db.session.add(RateRule(room_type=suite, name="Alta ocupación", kind="occupancy", multiplier=1.5, min_occupancy=0.5))
+        db.session.commit()
+    # One free suite out of six would be full occupancy; all six free is none.
+    (room,) = search(client, room_type="Suite", limit=1)
+    assert room["stay_total"] == search(client, room_type="Suite")[0]["stay_total"] == 440.0
+
+
+@pytest.mark.parametrize(
+    "params, error",
+    [
+        ({"guests": "0"}, "guests must be an integer >= 1"),
+        ({"min_price": "cheap"}, "min_price must be a number >= 0"),
+        ({"guests": str(2**63)}, "guests must be an integer >= 1"),
+        ({"floor": "9" * 30}, "floor must be an integer >= 0"),
+        ({"min_price": "nan"}, "min_price must be a number >= 0"),
+        ({"max_price": "inf"}, "max_price must be a number >= 0"),
+        ({"max_price": "1e400"}, "max_price must be a number >= 0"),
+        ({"sort": "stars"}, "sort must be one of: room, price, -price, fit, floor"),
+        ({"limit": "101"}, "limit must be at most 100"),
+    ],
+)
+def test_invalid_filters_are_rejected(client, params, error):
+    response = client.get("/api/rooms/search", query_string={**STAY, **params})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+
+
+@pytest.mark.parametrize(
+    "stay, error",
+    [
+        ({"check_in": "0001-01-02", "check_out": "9999-12-30"}, "stays are limited to 30 nights"),
+        (
+            {"check_in": "9999-12-01", "check_out": "9999-12-03"},
+            "check_in must be within 730 days from today",
+        ),
+    ],
+)
+def test_extreme_stays_are_rejected_without_pricing_them(app, client, stay, error):
+    pricing = app.extensions["pricing"]
+    search(client)  # compile the rate tables
+    windows = {rt_id: (t.start, t.end) for rt_id, t in pricing._tables.items()}
+
+    response = client.get("/api/rooms/search", query_string=stay)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+    assert {rt_id: (t.start, t.end) for rt_id, t in pricing._tables.items()} == windows
+
+
+def test_past_stays_do_not_grow_the_rate_tables(app, client):
+    pricing = app.extensions["pricing"]
+    search(client)
+    sizes = {rt_id: len(t.nightly) for rt_id, t in pricing._tables.items()}
+    rooms = search(client, check_in="2001-01-01", check_out="2001-01-31", room_type="Suite")
+    assert rooms and rooms[0]["stay_total"] == 220.0 * 30
+    assert {rt_id: len(t.nightly) for rt_id, t in pricing._tables.items()} == sizes
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from helynota.booking import SearchFilters
+from helynota.database import db
+from helynota.models import Reservation, Room, User
+from helynota.search_cache import ALL, SearchCache, search_key
+
+D = date(2030, 1, 1)
+
+
+def day(offset):
+    return D + timedelta(days=offset)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lookup_store_and_ttl():
+    clock = FakeClock()
+    cache = SearchCache(ttl=10, clock=clock)
+    key = search_key(day(0), day(2), SearchFilters(room_type="Suite", guests=2))
+
+    value, generation = cache.lookup(key)
+    assert value is None
+    cache.store(key, ["room"], generation)
+    assert cache.lookup(search_key(day(0), day(2), SearchFilters(room_type="Suite", guests=2)))[0] == ["room"]
+    assert cache.lookup(search_key(day(0), day(2), SearchFilters(room_type="Suite")))[0] is None
+
+    clock.now = 11
+    assert cache.lookup(key)[0] is None
+    assert cache.stats() == {
+        "entries": 0, "hits": 1, "misses": 3, "hit_rate": 0.25, "invalidations": 0
+    }
+
+
+def test_invalidate_evicts_only_overlapping_ranges():
+    cache = SearchCache()
+    for check_in, check_out in [(0, 2), (2, 4), (5, 9)]:
+        key = search_key(day(check_in), day(check_out))
+        cache.store(key, [], cache.lookup(key)[1])
+
+    assert cache.invalidate([(day(1), day(3))]) == 2
+    assert cache.lookup(search_key(day(5), day(9)))[0] == []
+    assert cache.invalidate([ALL]) == 1
+
+
+def test_results_computed_across_an_invalidation_are_not_stored():
+    cache = SearchCache()
+    key = search_key(day(0), day(2))
+    _, generation = cache.lookup(key)
+    cache.invalidate([(day(10), day(12))])
+    cache.store(key, ["stale?"], generation)
+    assert cache.lookup(key)[0] is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SearchCache(max_entries=2)
+    keys = [search_key(day(i), day(i + 1)) for i in range(3)]
+    for key in keys:
+        cache.store(key, [], cache.lookup(key)[1])
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(keys[0])[0] is None
+
+
+def search(client, check_in, check_out, room_type="Suite"):
+    response = client.get(
+        "/api/rooms/search",
+        query_string={"check_in": check_in.isoformat(), "check_out": check_out.isoformat(), "room_type": room_type},
+    )
+    assert response.status_code == 200
+    return response.get_json()["count"]
+
+
+def cache_stats(client):
+    return client.get("/api/stats").get_json()["search_cache"]
+
+
+@pytest.fixture()
+def cache(app):
+    return app.extensions["search_cache"]
+
+
+def test_reservation_and_payment_invalidate_overlapping_searches(client, cache, auth_headers):
+    headers = auth_headers(client)
+    suite_id = next(rt["id"] for rt in client.get("/api/room-types").get_json() if rt["name"] == "Suite")
+    check_in, check_out = date.today() + timedelta(days=40), date.today() + timedelta(days=43)
+    later = check_out + timedelta(days=10)
+
+    before = search(client, check_in, check_out)
+    assert search(client, check_in, check_out) == before
+    search(client, later, later + timedelta(days=1))
+    assert cache_stats(client)["hits"] == 1
+
+    reservation = client.post(
+        "/api/reservations",
+        headers=headers,
+        json={"room_type_id": suite_id, "check_in": check_in.isoformat(), "check_out": check_out.isoformat()},
+    ).get_json()
+    assert search(client, check_in, check_out) == before - 1
+    # The non-overlapping range survived the invalidation.
+    hits = cache_stats(client)["hits"]
+    search(client, later, later + timedelta(days=1))
+    assert cache_stats(client)["hits"] == hits + 1
+
+    # A failed payment cancels the reservation and frees the room again.
+    client.post(
+        "/api/payments/simulate",
+        headers=headers,
+        json={"reservation_id": reservation["reservation_id"], "force_failure": True},
+    )
+    assert search(client, check_in, check_out) == before
+
+
+def test_rolled_back_changes_do_not_invalidate(app, client, cache):
+    check_in, check_out = date.today() + timedelta(days=60), date.today() + timedelta(days=62)
+    search(client, check_in, check_out)
+
+    with app.app_context():
+        db.session.add(
+            Reservation(
+                user=db.session.get(User, 1),
+                room=db.session.get(Room, 1),
+                check_in=check_in,
+                check_out=check_out,
+                total_price=1.0,
+            )
+        )
+        db.session.flush()
+        db.session.rollback()
+        assert cache.stats()["entries"] == 1
+
+        room = db.session.get(Room, 2)
+        room.floor = 9
+        db.session.commit()
+
+    # Catalog changes clear everything.
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_can_be_disabled(app_config):
+    from helynota import create_app
+
+    app = create_app({"TESTING": True, "SEARCH_CACHE_ENABLED": False, **app_config})
+    assert "search_cache" not in app.extensions
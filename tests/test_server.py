@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import gc
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from helynota.database import db
+from helynota.server import warm_up
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="needs fork and POSIX signals")
+
+
+@pytest.fixture()
+def app_config(tmp_path):
+    return {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hotel.db'}"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port: int, path: str) -> int:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+        return response.status
+
+
+def _wait_for_workers(process: subprocess.Popen, port: int) -> None:
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        assert process.poll() is None, process.stderr.read()
+        try:
+            if _get(port, "/api/health") == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise AssertionError("server did not start")
+
+
+def test_warm_up_releases_connections_and_freezes_heap(app):
+    warm_up(app)
+    try:
+        assert gc.get_freeze_count() > 0
+        with app.app_context():
+            assert db.engine.pool.checkedout() == 0
+    finally:
+        gc.unfreeze()
+
+
+def test_prefork_server_serves_reloads_and_stops(app, app_config):
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "helynota.server",
+            "--port", str(port),
+            "--workers", "2",
+            "--threads", "2",
+            "--database-uri", app_config["SQLALCHEMY_DATABASE_URI"],
+            "--no-rate-limit",
+        ],
+        cwd=PROJECT_ROOT,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        _wait_for_workers(process, port)
+        check_in = date.today() + timedelta(days=30)
+        search = f"/api/rooms/search?check_in={check_in}&check_out={check_in + timedelta(days=2)}"
+        assert all(_get(port, search) == 200 for _ in range(10))
+
+        process.send_signal(signal.SIGHUP)
+        log = ""
+        while "Reloaded" not in log:
+            log += process.stderr.readline()
+        assert all(_get(port, search) == 200 for _ in range(20))
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
+        log += process.stderr.read()
+        assert log.count("(generation 1)") == 2
+        assert log.count("(generation 2)") == 2
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+from scripts.benchmark_importtime import PROJECT_ROOT, run_once
+
+
+def test_create_app_does_not_import_analytics_dependencies():
+    timings, modules = run_once()
+
+    assert timings["heavy"] == []
+    assert not any(name.strip().startswith("metrics") for _, name in modules)
+
+
+def test_metrics_package_does_not_import_the_web_stack():
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, metrics.sistema_metricas, metrics.servicio_metricas; "
+            "print(sorted(m for m in ('flask', 'sqlalchemy', 'openpyxl') if m in sys.modules))",
+        ],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.strip() == "[]"